@@ -0,0 +1,118 @@
+"""
+Replay synthetic request traces against the in-memory backend, with plain LRU
+eviction and with TinyLFU admission, and report the hit ratio of each.
+
+The zipfian trace draws keys from a skewed popularity distribution, like the
+requests of a typical site. The scan trace interleaves it with scans over keys
+that are requested once and never again, like a crawler walking every page, which
+flush the popular entries out of a plain LRU cache.
+
+Run from the repository root with ``python -m benchmarks.admission``.
+"""
+import argparse
+import itertools
+import random
+import time
+from typing import Callable, Dict, List, Optional
+
+from starlette_cache.backends.admission import BaseAdmissionPolicy, TinyLFU
+from starlette_cache.backends.memory_cache_backend import MemoryCacheBackend
+
+_run_counter = itertools.count()
+
+
+def zipfian(keys: int, length: int, skew: float, rng: random.Random) -> List[str]:
+    weights = itertools.accumulate(1 / rank**skew for rank in range(1, keys + 1))
+    ranks = rng.choices(range(keys), cum_weights=list(weights), k=length)
+    return [f"page-{rank}" for rank in ranks]
+
+
+def scan_heavy(
+    keys: int,
+    length: int,
+    skew: float,
+    rng: random.Random,
+    scan_every: int,
+    scan_length: int,
+) -> List[str]:
+    popular = zipfian(keys, length, skew, rng)
+    trace: List[str] = []
+    scanned = itertools.count()
+    for start in range(0, length, scan_every):
+        end = start + scan_every
+        trace.extend(popular[start:end])
+        trace.extend(f"scan-{next(scanned)}" for _ in range(scan_length))
+    return trace[:length]
+
+
+def replay(
+    trace: List[str],
+    capacity: int,
+    admission: Optional[Callable[[int], BaseAdmissionPolicy]],
+) -> Dict[str, float]:
+    """
+    Look every key of the trace up, storing it on a miss as the cache middleware
+    would.
+    :return: The hit ratio and the number of requests replayed per second.
+    """
+    backend = MemoryCacheBackend(
+        f"benchmark-admission-{next(_run_counter)}",
+        max_entries=capacity,
+        admission=None if admission is None else admission(capacity),
+    )
+    hits = 0
+    start = time.perf_counter()
+    for key in trace:
+        if backend.get(key) is None:
+            backend.set(key, b"")
+        else:
+            hits += 1
+    elapsed = time.perf_counter() - start
+    return {"hit_ratio": hits / len(trace), "requests_per_second": len(trace) / elapsed}
+
+
+POLICIES = {
+    "LRU": None,
+    "TinyLFU": TinyLFU,
+}
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--keys", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=500_000)
+    parser.add_argument(
+        "--capacities", type=int, nargs="+", default=[500, 2_000, 10_000]
+    )
+    parser.add_argument("--skew", type=float, default=0.9)
+    parser.add_argument("--scan-every", type=int, default=5_000)
+    parser.add_argument("--scan-length", type=int, default=5_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    traces = {
+        "zipfian": zipfian(args.keys, args.requests, args.skew, rng),
+        "scan": scan_heavy(
+            args.keys,
+            args.requests,
+            args.skew,
+            rng,
+            args.scan_every,
+            args.scan_length,
+        ),
+    }
+    print(f"{'trace':<9} {'capacity':>9} {'policy':<8} {'hit ratio':>9} {'req/s':>10}")
+    for (trace_name, trace), capacity in itertools.product(
+        traces.items(), args.capacities
+    ):
+        for policy_name, admission in POLICIES.items():
+            result = replay(trace, capacity, admission)
+            print(
+                f"{trace_name:<9} {capacity:>9,} {policy_name:<8} "
+                f"{result['hit_ratio']:>9.1%} {result['requests_per_second']:>10,.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
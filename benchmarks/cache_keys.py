@@ -0,0 +1,94 @@
+"""
+Measure how many cache keys per second the key functions in ``utils`` generate,
+against the previous implementation that quoted the URL and sorted the query
+parameters through an OrderedDict.
+
+Run from the repository root with ``python -m benchmarks.cache_keys``.
+"""
+import argparse
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Callable, List
+from urllib.parse import quote
+
+from starlette.requests import Request
+
+from starlette_cache import utils
+
+
+def _previous_cache_key(request: Request) -> str:
+    url = request.url
+    params = OrderedDict()
+    if url.query:
+        param_list = url.query.lstrip("?").split("&")
+        param_list.sort(key=lambda x: x.split("=")[0])
+        for param_string in param_list:
+            param_key_and_val = param_string.split("=")
+            params[param_key_and_val[0]] = param_key_and_val[1]
+    query = "&".join([f"{key}={value}" for (key, value) in params.items()])
+    repeatable_url = quote(
+        f"{url.scheme}://{url.hostname}/{url.path}{'?' if url.query else ''}{query}"
+    )
+    return hashlib.md5(f"{request.method}.{repeatable_url}".encode("utf-8")).hexdigest()
+
+
+def _uncached_cache_key(request: Request) -> str:
+    utils.normalize_query_string.cache_clear()
+    return utils.get_cache_key(request)
+
+
+KEY_FUNCTIONS = {
+    "previous (md5, quoted)": _previous_cache_key,
+    "get_cache_key, cold memo": _uncached_cache_key,
+    "get_cache_key": utils.get_cache_key,
+    "get_fast_cache_key": utils.get_fast_cache_key,
+}
+
+
+def _requests(count: int) -> List[Request]:
+    # A realistic mix: a few hot query strings and some distinct ones.
+    return [
+        Request(
+            {
+                "type": "http",
+                "method": "GET",
+                "scheme": "http",
+                "server": ("testserver", 80),
+                "root_path": "",
+                "path": f"/items/{i % 100}",
+                "query_string": f"page={i % 5}&sort=name&limit=50".encode(),
+                "headers": [(b"host", b"api.example.com"), (b"accept", b"*/*")],
+            }
+        )
+        for i in range(count)
+    ]
+
+
+def run(key_function: Callable[[Request], str], requests: List[Request]) -> float:
+    """
+    :return: The number of keys generated per second.
+    """
+    # Fresh Request objects every round, so nothing cached on them is reused.
+    start = time.perf_counter()
+    for request in requests:
+        key_function(Request(request.scope))
+    return len(requests) / (time.perf_counter() - start)
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--keys", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    requests = _requests(args.keys)
+    print(f"{'key function':<26} {'keys/s':>12}")
+    baseline = None
+    for name, key_function in KEY_FUNCTIONS.items():
+        rate = run(key_function, requests)
+        baseline = baseline or rate
+        print(f"{name:<26} {rate:>12,.0f} {rate / baseline:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
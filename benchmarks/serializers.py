@@ -0,0 +1,184 @@
+"""
+Measure the latency of cache hits on ``MemoryCacheBackend`` with each serializer,
+for bytes bodies and JSON-able dicts of several sizes, both through direct
+``backend.get`` calls and through the hit path of each middleware, which stores
+whole responses rather than bare values.
+
+The ``pickle-only`` serializer pickles every value, including the responses the
+middlewares store, as every serializer did before they got an encoding of their
+own.
+
+Run from the repository root with ``python -m benchmarks.serializers``.
+"""
+import argparse
+import asyncio
+import pickle
+import time
+from typing import Any, Callable, Dict, List
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from starlette_cache.backends.memory_cache_backend import MemoryCacheBackend
+from starlette_cache.backends.serializers import (
+    BaseSerializer,
+    JSONSerializer,
+    PassThroughSerializer,
+    Payload,
+    PickleSerializer,
+)
+from starlette_cache.middleware.asgi_cache_middleware import ASGICacheMiddleware
+from starlette_cache.middleware.cache_middleware import CacheMiddleware
+
+
+class PickleOnlySerializer(BaseSerializer):
+    def dumps(self, value: Any) -> Payload:
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, data: Payload) -> Any:
+        return pickle.loads(data)
+
+
+SERIALIZERS: Dict[str, BaseSerializer] = {
+    "pickle-only": PickleOnlySerializer(),
+    "pickle": PickleSerializer(),
+    "json": JSONSerializer(),
+    "pass-through": PassThroughSerializer(JSONSerializer()),
+}
+
+_scope = {
+    "type": "http",
+    "method": "GET",
+    "scheme": "http",
+    "server": ("testserver", 80),
+    "path": "/items",
+    "root_path": "",
+    "query_string": b"",
+    "headers": [],
+}
+
+
+def _payloads(size: int) -> Dict[str, Any]:
+    items = max(1, size // 40)
+    return {
+        "bytes": b"x" * size,
+        "dict": {
+            "items": [
+                {"id": i, "name": f"item {i}", "price": i * 1.5} for i in range(items)
+            ]
+        },
+    }
+
+
+def run(call: Callable[[], Any], reads: int) -> float:
+    """
+    :return: The mean latency of a hit in microseconds.
+    """
+    start = time.perf_counter()
+    for _ in range(reads):
+        call()
+    return (time.perf_counter() - start) / reads * 1_000_000
+
+
+def backend_get(backend: MemoryCacheBackend, body: bytes) -> Callable[[], Any]:
+    backend.set("key", body)
+    return lambda: backend.get("key")
+
+
+def cache_middleware_hit(backend: MemoryCacheBackend, body: bytes) -> Callable:
+    """
+    Hits of ``cache_api`` on a sync endpoint returning the body as a ``Response``.
+    """
+    middleware = CacheMiddleware(lambda request, response: Response(body), 300)
+    request = Request(_scope)
+    middleware.call_sync(request, Response(), backend)
+    return lambda: middleware.call_sync(request, Response(), backend)
+
+
+def asgi_middleware_hit(backend: MemoryCacheBackend, body: bytes) -> Callable:
+    """
+    Hits of the ``ASGICacheMiddleware`` on an application sending the body.
+    """
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": body})
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    middleware = ASGICacheMiddleware(app, cache_backend=backend)
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(middleware(dict(_scope), receive, send))
+    # Drive the middleware without the event loop, it never suspends on a hit of
+    # a sync backend.
+    return lambda: middleware(dict(_scope), receive, send).send(None)
+
+
+PATHS = {
+    "backend.get": backend_get,
+    "cache_api": cache_middleware_hit,
+    "ASGI": asgi_middleware_hit,
+}
+
+
+def _hit(call: Callable[[], Any]) -> Callable[[], Any]:
+    def _call() -> None:
+        try:
+            call()
+        except StopIteration:
+            pass
+
+    return _call
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reads", type=int, default=50_000)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100, 10_000, 1_000_000]
+    )
+    args = parser.parse_args(argv)
+
+    names = "".join(f"{name:>14}" for name in SERIALIZERS)
+    print(f"{'payload':<8} {'size':>10} {names}")
+    for size in args.sizes:
+        for kind, value in _payloads(size).items():
+            latencies = []
+            for name, serializer in SERIALIZERS.items():
+                backend = MemoryCacheBackend(
+                    f"bench-serializers-{name}", serializer=serializer
+                )
+                backend.set("key", value)
+                get = backend.get
+                latencies.append(
+                    run(lambda: get("key"), max(100, args.reads * 100 // size))
+                )
+            print(
+                f"{kind:<8} {size:>10,} "
+                + "".join(f"{latency:>12.2f}us" for latency in latencies)
+            )
+
+    print()
+    print(f"{'hit path':<12} {'size':>10} {names}")
+    for size in args.sizes:
+        body = b"x" * size
+        for path, setup in PATHS.items():
+            latencies = []
+            for name, serializer in SERIALIZERS.items():
+                backend = MemoryCacheBackend(
+                    f"bench-serializers-{path}-{name}", serializer=serializer
+                )
+                call = _hit(setup(backend, body))
+                latencies.append(run(call, max(100, args.reads * 100 // size)))
+            print(
+                f"{path:<12} {size:>10,} "
+                + "".join(f"{latency:>12.2f}us" for latency in latencies)
+            )
+
+
+if __name__ == "__main__":
+    main()
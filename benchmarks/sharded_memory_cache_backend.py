@@ -0,0 +1,80 @@
+"""
+Compare the throughput of the single-lock and sharded memory backends as the
+number of threads grows.
+
+Run from the repository root with ``python -m benchmarks.sharded_memory_cache_backend``.
+"""
+import argparse
+import hashlib
+import random
+import threading
+import time
+from typing import Callable, List
+
+from starlette_cache.backends.base_cache_backend import BaseCacheBackend
+from starlette_cache.backends.memory_cache_backend import MemoryCacheBackend
+from starlette_cache.backends.sharded_memory_cache_backend import (
+    ShardedMemoryCacheBackend,
+)
+
+
+def _keys(count: int) -> List[str]:
+    return [hashlib.md5(str(i).encode("utf-8")).hexdigest() for i in range(count)]
+
+
+def _worker(
+    backend: BaseCacheBackend, keys: List[str], operations: int, seed: int
+) -> None:
+    rng = random.Random(seed)
+    for _ in range(operations):
+        key = rng.choice(keys)
+        # Mostly reads, as a response cache sees in production.
+        if rng.random() < 0.9:
+            backend.get(key)
+        else:
+            backend.set(key, b"x" * 256)
+
+
+def run(backend: BaseCacheBackend, threads: int, operations: int) -> float:
+    """
+    Run ``operations`` cache operations on each of ``threads`` threads.
+    :return: The number of operations per second across all threads.
+    """
+    keys = _keys(10_000)
+    for key in keys:
+        backend.set(key, b"x" * 256)
+    workers = [
+        threading.Thread(target=_worker, args=(backend, keys, operations, seed))
+        for seed in range(threads)
+    ]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return threads * operations / (time.perf_counter() - start)
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--operations", type=int, default=50_000)
+    parser.add_argument("--shards", type=int, default=16)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    args = parser.parse_args(argv)
+
+    factories: List[Callable[[int], BaseCacheBackend]] = [
+        lambda threads: MemoryCacheBackend(f"bench-single-{threads}"),
+        lambda threads: ShardedMemoryCacheBackend(
+            f"bench-sharded-{threads}", shards=args.shards
+        ),
+    ]
+    print(f"{'threads':>8} {'single lock ops/s':>20} {'sharded ops/s':>20}")
+    for threads in args.threads:
+        results = [
+            run(factory(threads), threads, args.operations) for factory in factories
+        ]
+        print(f"{threads:>8} {results[0]:>20,.0f} {results[1]:>20,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,470 @@
+"""
+Measure the throughput and p50/p99 latency of the cache on its hot paths: hits and
+misses of ``cache_api`` on async and sync endpoints and of ``ASGICacheMiddleware``,
+driven through a Starlette app in process, the memory backends under thread and
+task concurrency, cache key generation, and hits for a range of payload sizes.
+
+Save a baseline with ``--save baseline.json`` and compare later runs against it
+with ``--baseline baseline.json``. The run exits with status 1 when a scenario's
+throughput dropped by more than ``--threshold``, so it can gate a release.
+
+Run from the repository root with ``python -m benchmarks.suite``.
+"""
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, PlainTextResponse
+from starlette.types import ASGIApp
+
+from starlette_cache import utils
+from starlette_cache.backends.async_memory_cache_backend import AsyncMemoryCacheBackend
+from starlette_cache.backends.base_cache_backend import BaseCacheBackend
+from starlette_cache.backends.memory_cache_backend import MemoryCacheBackend
+from starlette_cache.backends.sharded_memory_cache_backend import (
+    ShardedMemoryCacheBackend,
+)
+from starlette_cache.backends.shared_memory_cache_backend import (
+    SharedMemoryCacheBackend,
+)
+from starlette_cache.decorators.cache import cache_api
+from starlette_cache.middleware.asgi_cache_middleware import ASGICacheMiddleware
+
+Result = Dict[str, float]
+
+# Miss scenarios store a new entry per request, this bounds their memory use.
+MAX_ENTRIES = 10_000
+
+
+def _result(latencies: List[int], elapsed: float) -> Result:
+    latencies.sort()
+    return {
+        "ops_per_sec": len(latencies) / elapsed,
+        "p50_us": latencies[len(latencies) // 2] / 1000,
+        "p99_us": latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)] / 1000,
+    }
+
+
+def measure(operation: Callable[[], Any], operations: int) -> Result:
+    """
+    Call ``operation`` in a loop, timing each call.
+    """
+    clock = time.perf_counter_ns
+    latencies = [0] * operations
+    start = clock()
+    for index in range(operations):
+        before = clock()
+        operation()
+        latencies[index] = clock() - before
+    return _result(latencies, (clock() - start) / 1e9)
+
+
+def measure_threads(
+    operation: Callable[[], Any], operations: int, threads: int
+) -> Result:
+    """
+    Call ``operation`` on ``threads`` threads at once, ``operations`` times in all.
+    """
+    clock = time.perf_counter_ns
+    per_thread = operations // threads
+    latencies: List[List[int]] = [[0] * per_thread for _ in range(threads)]
+    barrier = threading.Barrier(threads + 1)
+
+    def _worker(own: List[int]) -> None:
+        barrier.wait()
+        for index in range(per_thread):
+            before = clock()
+            operation()
+            own[index] = clock() - before
+
+    workers = [threading.Thread(target=_worker, args=(own,)) for own in latencies]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    start = clock()
+    for worker in workers:
+        worker.join()
+    return _result(list(itertools.chain(*latencies)), (clock() - start) / 1e9)
+
+
+async def measure_tasks(
+    operation: Callable[[], Awaitable[Any]], operations: int, tasks: int = 1
+) -> Result:
+    """
+    Await ``operation`` on ``tasks`` tasks at once, ``operations`` times in all.
+    """
+    clock = time.perf_counter_ns
+    per_task = operations // tasks
+    latencies: List[List[int]] = [[0] * per_task for _ in range(tasks)]
+
+    async def _worker(own: List[int]) -> None:
+        for index in range(per_task):
+            before = clock()
+            await operation()
+            own[index] = clock() - before
+
+    start = clock()
+    await asyncio.gather(*(_worker(own) for own in latencies))
+    return _result(list(itertools.chain(*latencies)), (clock() - start) / 1e9)
+
+
+def _scope(path: str, query_string: bytes = b"") -> Dict[str, Any]:
+    return {
+        "type": "http",
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "server": ("testserver", 80),
+        "client": ("127.0.0.1", 50000),
+        "root_path": "",
+        "path": path,
+        "query_string": query_string,
+        "headers": [(b"host", b"testserver"), (b"accept-encoding", b"gzip")],
+    }
+
+
+async def asgi_get(app: ASGIApp, path: str, query_string: bytes = b"") -> int:
+    """
+    Send a GET request to an ASGI app in process.
+    :return: The status code of the response.
+    """
+    status = 0
+
+    async def receive() -> Dict[str, Any]:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Dict[str, Any]) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(_scope(path, query_string), receive, send)
+    return status
+
+
+def _payload(size: int) -> Dict[str, str]:
+    return {"data": "x" * max(0, size - 12)}
+
+
+def cache_api_app(size: int, name: str) -> Starlette:
+    """
+    A Starlette app with an async and a sync endpoint decorated with ``cache_api``,
+    returning a JSON body of about ``size`` bytes.
+    """
+    payload = _payload(size)
+    async_backend = AsyncMemoryCacheBackend(f"{name}-async", max_entries=MAX_ENTRIES)
+    sync_backend = MemoryCacheBackend(f"{name}-sync", max_entries=MAX_ENTRIES)
+
+    @cache_api(300)
+    async def async_items(request: Request, response: Response) -> dict:
+        return payload
+
+    @cache_api(300)
+    def sync_items(request: Request, response: Response) -> dict:
+        return payload
+
+    app = Starlette()
+
+    @app.route("/async")
+    async def async_route(request: Request) -> Response:
+        response = Response()
+        value = await async_items(request, response, async_backend)
+        return JSONResponse(value, headers=dict(response.headers))
+
+    @app.route("/sync")
+    def sync_route(request: Request) -> Response:
+        response = Response()
+        value = sync_items(request, response, sync_backend)
+        return JSONResponse(value, headers=dict(response.headers))
+
+    return app
+
+
+def asgi_middleware_app(size: int, name: str) -> ASGIApp:
+    body = b"x" * size
+    app = Starlette()
+
+    @app.route("/asgi")
+    async def asgi_route(request: Request) -> Response:
+        return PlainTextResponse(body)
+
+    backend = AsyncMemoryCacheBackend(name, max_entries=MAX_ENTRIES)
+    return ASGICacheMiddleware(app, cache_backend=backend)
+
+
+def _http_scenario(
+    app: ASGIApp, path: str, hit: bool, operations: int
+) -> Callable[[], Result]:
+    counter = itertools.count()
+
+    async def _hit() -> None:
+        await asgi_get(app, path, b"page=1")
+
+    async def _miss() -> None:
+        await asgi_get(app, path, b"page=%d" % next(counter))
+
+    async def _run() -> Result:
+        # Warms up the app and, for hits, fills the cache.
+        for _ in range(10):
+            await _hit()
+        return await measure_tasks(_hit if hit else _miss, operations)
+
+    return lambda: asyncio.run(_run())
+
+
+def _keys(count: int) -> List[str]:
+    return [hashlib.md5(str(i).encode("utf-8")).hexdigest() for i in range(count)]
+
+
+def _backend_operation(
+    backend: BaseCacheBackend, keys: List[str], value: bytes
+) -> Callable[[], Any]:
+    # Mostly reads, as a response cache sees in production.
+    rng = random.Random(0)
+
+    def _operation() -> None:
+        key = keys[rng.randrange(len(keys))]
+        if rng.random() < 0.9:
+            backend.get(key)
+        else:
+            backend.set(key, value)
+
+    return _operation
+
+
+def _backend_scenario(
+    backend: BaseCacheBackend, operations: int, threads: int
+) -> Callable[[], Result]:
+    def _run() -> Result:
+        keys, value = _keys(10_000), b"x" * 256
+        for key in keys:
+            backend.set(key, value)
+        return measure_threads(
+            _backend_operation(backend, keys, value), operations, threads
+        )
+
+    return _run
+
+
+def _shared_memory_scenario(operations: int, threads: int) -> Callable[[], Result]:
+    def _run() -> Result:
+        with tempfile.TemporaryDirectory() as directory:
+            backend = SharedMemoryCacheBackend(
+                "bench-suite",
+                slots=32_768,
+                slot_size=512,
+                path=os.path.join(directory, "cache"),
+            )
+            try:
+                return _backend_scenario(backend, operations, threads)()
+            finally:
+                backend.close()
+
+    return _run
+
+
+def _async_backend_scenario(operations: int, tasks: int) -> Callable[[], Result]:
+    async def _run() -> Result:
+        backend = AsyncMemoryCacheBackend(f"bench-suite-async-{tasks}")
+        keys, value = _keys(10_000), b"x" * 256
+        for key in keys:
+            await backend.set(key, value)
+        rng = random.Random(0)
+
+        async def _operation() -> None:
+            key = keys[rng.randrange(len(keys))]
+            if rng.random() < 0.9:
+                await backend.get(key)
+            else:
+                await backend.set(key, value)
+
+        return await measure_tasks(_operation, operations, tasks)
+
+    return lambda: asyncio.run(_run())
+
+
+def _key_scenario(
+    key_function: Callable[[Request], str], operations: int
+) -> Callable[[], Result]:
+    scopes = [
+        _scope(f"/items/{i % 100}", f"page={i % 5}&sort=name".encode())
+        for i in range(1000)
+    ]
+    requests = itertools.cycle(scopes)
+
+    def _operation() -> str:
+        return key_function(Request(next(requests)))
+
+    def _run() -> Result:
+        # Warms up the memoized query string normalization.
+        for _ in scopes:
+            _operation()
+        return measure(_operation, operations)
+
+    return _run
+
+
+def scenarios(args: argparse.Namespace) -> List[Tuple[str, Callable[[], Result]]]:
+    """
+    :return: The name and a function running each scenario.
+    """
+    requests, operations = args.requests, args.operations
+    app = cache_api_app(1024, "bench-suite")
+    asgi_app = asgi_middleware_app(1024, "bench-suite-asgi")
+    found: List[Tuple[str, Callable[[], Result]]] = [
+        ("cache_api async hit", _http_scenario(app, "/async", True, requests)),
+        ("cache_api async miss", _http_scenario(app, "/async", False, requests)),
+        ("cache_api sync hit", _http_scenario(app, "/sync", True, requests)),
+        ("cache_api sync miss", _http_scenario(app, "/sync", False, requests)),
+        ("asgi middleware hit", _http_scenario(asgi_app, "/asgi", True, requests)),
+        ("asgi middleware miss", _http_scenario(asgi_app, "/asgi", False, requests)),
+    ]
+    for size in args.sizes:
+        sized = cache_api_app(size, f"bench-suite-{size}")
+        # Fewer requests for large payloads, which take longer to encode.
+        sized_requests = max(100, requests * 1000 // max(size, 1000))
+        found.append(
+            (
+                f"cache_api async hit {size}B",
+                _http_scenario(sized, "/async", True, sized_requests),
+            )
+        )
+    for threads in args.threads:
+        found.append(
+            (
+                f"memory backend {threads} threads",
+                _backend_scenario(
+                    MemoryCacheBackend(f"bench-suite-memory-{threads}"),
+                    operations,
+                    threads,
+                ),
+            )
+        )
+        found.append(
+            (
+                f"sharded backend {threads} threads",
+                _backend_scenario(
+                    ShardedMemoryCacheBackend(f"bench-suite-sharded-{threads}"),
+                    operations,
+                    threads,
+                ),
+            )
+        )
+        found.append(
+            (
+                f"shared memory backend {threads} threads",
+                _shared_memory_scenario(operations, threads),
+            )
+        )
+    for tasks in args.tasks:
+        found.append(
+            (
+                f"async memory backend {tasks} tasks",
+                _async_backend_scenario(operations, tasks),
+            )
+        )
+    found.append(("get_cache_key", _key_scenario(utils.get_cache_key, operations)))
+    found.append(
+        ("get_fast_cache_key", _key_scenario(utils.get_fast_cache_key, operations))
+    )
+    return [
+        (name, run)
+        for name, run in found
+        if not args.filter or any(pattern in name for pattern in args.filter)
+    ]
+
+
+def compare(
+    results: Dict[str, Result], baseline: Dict[str, Result]
+) -> Dict[str, Optional[float]]:
+    """
+    :return: The relative change in throughput of each scenario from the baseline,
+    or None for scenarios missing from it.
+    """
+    changes: Dict[str, Optional[float]] = {}
+    for name, result in results.items():
+        before = baseline.get(name)
+        changes[name] = (
+            None
+            if before is None
+            else result["ops_per_sec"] / before["ops_per_sec"] - 1
+        )
+    return changes
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--requests", type=int, default=5_000)
+    parser.add_argument("--operations", type=int, default=100_000)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100, 10_000, 1_000_000]
+    )
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--tasks", type=int, nargs="+", default=[1, 64])
+    parser.add_argument(
+        "--filter", nargs="+", help="Only run scenarios containing one of these."
+    )
+    parser.add_argument("--save", help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", help="Compare against this JSON file.")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="The drop in throughput reported as a regression, 0.1 for 10%%.",
+    )
+    args = parser.parse_args(argv)
+
+    baseline: Dict[str, Result] = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results: Dict[str, Result] = {}
+    regressions = []
+    print(
+        f"{'scenario':<34} {'ops/s':>12} {'p50':>10} {'p99':>10}"
+        + (f" {'vs baseline':>12}" if baseline else "")
+    )
+    for name, run in scenarios(args):
+        result = results[name] = run()
+        line = (
+            f"{name:<34} {result['ops_per_sec']:>12,.0f} "
+            f"{result['p50_us']:>8.1f}us {result['p99_us']:>8.1f}us"
+        )
+        if baseline:
+            change = compare({name: result}, baseline)[name]
+            if change is None:
+                line += f" {'new':>12}"
+            else:
+                line += f" {change:>+11.1%}"
+                if change < -args.threshold:
+                    line += "  REGRESSION"
+                    regressions.append(name)
+        print(line, flush=True)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if regressions:
+        print(
+            f"{len(regressions)} scenario(s) regressed by more than {args.threshold:.0%}"
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
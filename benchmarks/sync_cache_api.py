@@ -0,0 +1,71 @@
+"""
+Compare cache hits on a sync endpoint decorated with ``cache_api`` when the
+middleware is driven through ``asyncio.run`` per request, as it used to be,
+against the synchronous fast path.
+
+Run from the repository root with ``python -m benchmarks.sync_cache_api``.
+"""
+import argparse
+import asyncio
+import time
+from typing import Callable, List
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from starlette_cache.backends.memory_cache_backend import MemoryCacheBackend
+from starlette_cache.decorators.cache import cache_api
+from starlette_cache.middleware.cache_middleware import CacheMiddleware
+
+
+def _request() -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "scheme": "http",
+            "server": ("testserver", 80),
+            "path": "/items",
+            "query_string": b"b=2&a=1",
+            "headers": [],
+        }
+    )
+
+
+def _endpoint(request: Request, response: Response) -> dict:
+    return {"items": list(range(10))}
+
+
+def run(call: Callable[[], object], requests: int) -> float:
+    """
+    :return: The number of requests per second.
+    """
+    start = time.perf_counter()
+    for _ in range(requests):
+        call()
+    return requests / (time.perf_counter() - start)
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20_000)
+    args = parser.parse_args(argv)
+
+    backend = MemoryCacheBackend("bench-sync-cache-api")
+    request, response = _request(), Response()
+    middleware = CacheMiddleware(_endpoint, 300)
+    endpoint = cache_api(300)(_endpoint)
+    endpoint(request, response, backend)
+
+    before = run(
+        lambda: asyncio.run(middleware(request, response, backend)), args.requests
+    )
+    after = run(lambda: endpoint(request, response, backend), args.requests)
+    print(f"{'path':<24} {'requests/s':>12}")
+    print(f"{'asyncio.run per request':<24} {before:>12,.0f}")
+    print(f"{'synchronous fast path':<24} {after:>12,.0f}")
+    print(f"speedup: {after / before:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
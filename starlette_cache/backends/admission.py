@@ -0,0 +1,121 @@
+from typing import List, Optional
+
+_HASH_MASK = (1 << 64) - 1
+# Counters saturate at the largest value a 4 bit counter holds, as in TinyLFU.
+_MAX_COUNT = 15
+# Maps every counter value to half of it, so the whole sketch decays in one call.
+_HALVE = bytes(count >> 1 for count in range(256))
+
+
+class BaseAdmissionPolicy:
+    """
+    Decides whether a new entry is worth evicting another one for. The in-memory
+    backends consult their policy only once they are full, when storing a new key
+    would evict the least recently used entry.
+
+    Policies are not thread safe, the backends call them while holding their lock.
+    """
+
+    def record(self, key: str) -> None:
+        """
+        Called on every lookup of a key, whether it was found or not.
+        """
+
+    def admit(self, candidate: str, victim: str) -> bool:
+        """
+        :param candidate: The key about to be stored.
+        :param victim: The least recently used key, which would be evicted for it.
+        :return: Whether to store the candidate. Rejected candidates are not stored
+        and the victim is kept.
+        """
+        return True
+
+
+class CountMinSketch:
+    """
+    Estimates how often keys were seen in a fixed amount of memory: ``depth`` rows
+    of ``width`` saturating byte counters, each row indexed by a different hash of
+    the key. The estimate is the smallest of the key's counters, so it can only
+    overestimate, by the number of collisions in its least collided row.
+
+    Every ``sample_size`` increments all counters are halved, so the estimates
+    follow the recent popularity of keys rather than their all-time popularity.
+    """
+
+    def __init__(self, width: int, depth: int = 4, sample_size: Optional[int] = None):
+        """
+        :param width: The number of counters per row, rounded up to a power of two.
+        :param depth: The number of rows.
+        :param sample_size: The number of increments between two halvings. Defaults
+        to ten times the width.
+        """
+        self.width = 1 << max(0, width - 1).bit_length()
+        self.depth = depth
+        self.sample_size = sample_size or 10 * self.width
+        self.additions = 0
+        self.table = bytearray(self.width * self.depth)
+        self.__mask = self.width - 1
+
+    def __indexes(self, key: str) -> List[int]:
+        # Double hashing: the rows use h1 + i * h2, with h2 odd so that the rows
+        # differ whenever the width is a power of two.
+        key_hash = hash(key) & _HASH_MASK
+        first, second = key_hash & 0xFFFFFFFF, (key_hash >> 32) | 1
+        return [
+            row * self.width + ((first + row * second) & self.__mask)
+            for row in range(self.depth)
+        ]
+
+    def increment(self, key: str) -> None:
+        # Conservative update: only the counters holding the estimate are raised,
+        # which keeps collisions from inflating the other ones.
+        indexes = self.__indexes(key)
+        table = self.table
+        estimate = min(table[index] for index in indexes)
+        if estimate < _MAX_COUNT:
+            for index in indexes:
+                if table[index] == estimate:
+                    table[index] = estimate + 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self.reset()
+
+    def estimate(self, key: str) -> int:
+        table = self.table
+        return min(table[index] for index in self.__indexes(key))
+
+    def reset(self) -> None:
+        """
+        Halve every counter.
+        """
+        self.table = bytearray(self.table.translate(_HALVE))
+        self.additions //= 2
+
+
+class TinyLFU(BaseAdmissionPolicy):
+    """
+    The TinyLFU admission policy: a new key only replaces the least recently used
+    entry if it was looked up more often recently, according to a count-min sketch
+    of the lookups.
+
+    Keys seen once, like those of a scan over rarely requested pages, then no longer
+    flush the popular entries out of the cache.
+    """
+
+    def __init__(self, capacity: int, depth: int = 4, sample_factor: int = 10):
+        """
+        :param capacity: The number of entries the cache is expected to hold. The
+        sketch takes ``depth`` to twice ``depth`` bytes per entry.
+        :param depth: The number of rows of the sketch.
+        :param sample_factor: How many lookups per entry of capacity the counters
+        are halved after.
+        """
+        self.sketch = CountMinSketch(
+            capacity, depth=depth, sample_size=sample_factor * max(1, capacity)
+        )
+
+    def record(self, key: str) -> None:
+        self.sketch.increment(key)
+
+    def admit(self, candidate: str, victim: str) -> bool:
+        return self.sketch.estimate(candidate) > self.sketch.estimate(victim)
@@ -1,66 +1,395 @@
+import asyncio
+import itertools
+import logging
 import pickle
-import time
-import collections
 import threading
-from typing import Any, Optional
+import time
+from concurrent.futures import Executor
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
 
+from starlette_cache.backends import snapshot
+from starlette_cache.backends.admission import BaseAdmissionPolicy
 from starlette_cache.backends.base_async_cache_backend import BaseAsyncCacheBackend
+from starlette_cache.backends.memory_store import MemoryStore
+from starlette_cache.backends.serializers import (
+    BaseSerializer,
+    Payload,
+    PickleSerializer,
+)
 
-_caches = {}
-_expire_info = {}
+_stores = {}
 _locks = {}
+_sweepers = {}
+_snapshotters = {}
+
+logger = logging.getLogger(__name__)
 
 
 class AsyncMemoryCacheBackend(BaseAsyncCacheBackend[str, Any]):
+    """
+    An in-memory cache backend for use on the event loop.
+
+    The store is only ever touched between awaits, so every operation is atomic
+    with respect to the other tasks on the loop. It is also used from other threads,
+    e.g. by sync endpoints running their own event loop, so it is still locked, but
+    the lock is never held across an await and is uncontended on a single loop.
+    """
+
     DEFAULT_TTL = 300
     pickle_protocol = pickle.HIGHEST_PROTOCOL
 
-    def __init__(self, name: str):
-        self.__cache = _caches.setdefault(name, collections.OrderedDict())
-        self.__expirations = _expire_info.setdefault(name, {})
+    def __init__(
+        self,
+        name: str,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        offload_threshold: Optional[int] = None,
+        executor: Optional[Executor] = None,
+        serializer: Optional[BaseSerializer] = None,
+        admission: Optional[BaseAdmissionPolicy] = None,
+    ):
+        """
+        Create an in-memory cache backend for use on the event loop.
+        :param name: The name of the cache. Backends with the same name share entries.
+        :param max_entries: The maximum number of entries to keep before evicting
+        the least recently used ones. It is shared by the backends with the same
+        name. By default the number of entries is unbounded.
+        :param max_bytes: The maximum total size of the serialized entries to keep
+        before evicting the least recently used ones. It is shared by the backends
+        with the same name. By default the size is unbounded.
+        :param offload_threshold: The payload size in bytes above which
+        serialization runs in ``executor`` instead of on the event loop. If no
+        threshold is passed, all serialization runs on the event loop.
+        :param executor: The executor used for offloaded serialization. Defaults to
+        the event loop's default executor.
+        :param serializer: How values are serialized. Defaults to pickle.
+        :param admission: Decides whether new entries may evict the least recently
+        used one once the cache is full, e.g. ``TinyLFU``. It is shared by the
+        backends with the same name. By default every new entry is stored.
+        """
+        self.__name = name
+        self.__store = _stores.setdefault(name, MemoryStore())
         self.__lock = _locks.setdefault(name, threading.Lock())
+        if admission is not None:
+            self.__store.admission = admission
+        if max_entries is not None:
+            self.__store.max_entries = max_entries
+        if max_bytes is not None:
+            self.__store.max_bytes = max_bytes
+        self.offload_threshold = offload_threshold
+        self.executor = executor
+        self.serializer = serializer or PickleSerializer(self.pickle_protocol)
 
     async def get(self, key: str, default: Any = None) -> Optional[Any]:
         with self.__lock:
-            if await self.__has_expired(key):
-                await self.delete(key)
+            now = time.time()
+            self.__store.record(key)
+            if self.__store.has_expired(key, now):
+                self.__store.delete(key)
+                return default
+            if self.__store.staleness(key, now) is not None:
                 return default
-            pickled = self.__cache[key]
-            self.__cache.move_to_end(key, last=False)
-        return pickle.loads(pickled)
+            data = self.__store.get(key)
+        return await self._loads(data)
+
+    async def get_soft(
+        self, key: str, default: Any = None
+    ) -> Tuple[Optional[Any], Optional[float]]:
+        with self.__lock:
+            now = time.time()
+            self.__store.record(key)
+            if self.__store.has_expired(key, now):
+                self.__store.delete(key)
+                return default, None
+            data = self.__store.get(key)
+            staleness = self.__store.staleness(key, now)
+        return await self._loads(data), staleness
+
+    async def get_with_ttl(
+        self, key: str, default: Any = None
+    ) -> Tuple[Optional[Any], Optional[float]]:
+        with self.__lock:
+            now = time.time()
+            self.__store.record(key)
+            if self.__store.has_expired(key, now):
+                self.__store.delete(key)
+                return default, None
+            if self.__store.staleness(key, now) is not None:
+                return default, None
+            data = self.__store.get(key)
+            ttl = self.__store.time_to_live(key, now)
+        return await self._loads(data), ttl
+
+    async def _loads(self, data: Payload) -> Any:
+        if self.__should_offload(len(data)):
+            return await asyncio.get_event_loop().run_in_executor(
+                self.executor, self.serializer.loads, data
+            )
+        return self.serializer.loads(data)
 
     async def set(self, key: str, value: Any, ttl: int = DEFAULT_TTL) -> None:
+        data = await self._dumps(key, value)
         with self.__lock:
-            await self._set(key, value, ttl)
+            self._set(key, data, ttl)
+
+    async def set_soft(
+        self, key: str, value: Any, soft_ttl: int, hard_ttl: int
+    ) -> None:
+        data = await self._dumps(key, value)
+        with self.__lock:
+            self._set(key, data, hard_ttl, soft_ttl)
 
     @staticmethod
-    async def __get_expiration(ttl: int) -> float:
+    def __get_expiration(ttl: int) -> float:
         return time.time() + ttl
 
-    async def _set(self, key: str, value: Any, ttl: int) -> None:
-        pickled = pickle.dumps(value, self.pickle_protocol)
-        expiration = await self.__get_expiration(ttl)
-        self.__cache[key] = pickled
-        self.__cache.move_to_end(key, last=False)
-        self.__expirations[key] = expiration
+    async def _dumps(self, key: str, value: Any) -> Payload:
+        # The serialized size is unknown until the value is serialized, so estimate
+        # it from the value, but only as far as needed to tell it is large.
+        if self.offload_threshold is None:
+            estimate = 0
+        else:
+            estimate = _estimate_size(value, self.offload_threshold)
+        if self.__should_offload(estimate):
+            return await asyncio.get_event_loop().run_in_executor(
+                self.executor, self.serializer.dumps, value
+            )
+        return self.serializer.dumps(value)
+
+    def __should_offload(self, size: int) -> bool:
+        return self.offload_threshold is not None and size > self.offload_threshold
+
+    def _set(
+        self, key: str, data: Payload, ttl: int, soft_ttl: Optional[int] = None
+    ) -> bool:
+        """
+        :return: Whether the entry was stored, rather than being too large or
+        rejected by the admission policy.
+        """
+        if not self.__store.fits(len(data)):
+            self.__store.delete(key)
+            return False
+        if not self.__store.admits(key, len(data)):
+            return False
+        soft_expiration = None if soft_ttl is None else self.__get_expiration(soft_ttl)
+        self.__store.set(key, data, self.__get_expiration(ttl), soft_expiration)
+        self.__store.evict()
+        return True
 
     async def add(self, key: str, value: Any, ttl: int = DEFAULT_TTL) -> bool:
+        data = await self._dumps(key, value)
         with self.__lock:
-            if await self.__has_expired(key):
-                await self._set(key, value, ttl)
+            now = time.time()
+            if (
+                self.__store.has_expired(key, now)
+                or self.__store.staleness(key, now) is not None
+            ):
+                self._set(key, data, ttl)
                 return True
             return False
 
     async def delete(self, key: str) -> None:
-        try:
-            del self.__cache[key]
-        except KeyError:
-            pass
-        try:
-            del self.__expirations[key]
-        except KeyError:
-            pass
-
-    async def __has_expired(self, key):
-        exp = self.__expirations.get(key, -1)
-        return exp is not None and exp <= time.time()
+        with self.__lock:
+            self.__store.delete(key)
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        found = {}
+        with self.__lock:
+            now = time.time()
+            for key in keys:
+                self.__store.record(key)
+                if self.__store.has_expired(key, now):
+                    self.__store.delete(key)
+                elif self.__store.staleness(key, now) is None:
+                    found[key] = self.__store.get(key)
+        return {key: await self._loads(data) for key, data in found.items()}
+
+    async def set_many(self, values: Mapping[str, Any], ttl: int = DEFAULT_TTL) -> None:
+        payloads = {key: await self._dumps(key, value) for key, value in values.items()}
+        with self.__lock:
+            for key, data in payloads.items():
+                self._set(key, data, ttl)
+
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        with self.__lock:
+            for key in keys:
+                self.__store.delete(key)
+
+    async def tag(self, key: str, tags: Iterable[str]) -> None:
+        with self.__lock:
+            self.__store.tag(key, tags)
+
+    async def invalidate_tag(self, tag: str) -> List[str]:
+        with self.__lock:
+            return self.__store.invalidate_tag(tag)
+
+    def stats(self) -> Dict[str, int]:
+        with self.__lock:
+            return self.__store.stats()
+
+    async def dump(self, path: str) -> int:
+        """
+        Write the entries that have not expired, with their remaining time to live,
+        to a snapshot file, e.g. on shutdown, so ``load`` can warm a restarted
+        process with them. The file is written in ``executor``.
+        :return: The number of entries written.
+        """
+        now = time.time()
+        with self.__lock:
+            records = self.__store.snapshot(now)
+        return await asyncio.get_event_loop().run_in_executor(
+            self.executor, snapshot.write, path, records, now
+        )
+
+    async def load(self, path: str, batch_size: int = 1000) -> int:
+        """
+        Load the entries of a snapshot written by ``dump`` that have not expired
+        since. The snapshot is read in ``executor`` one batch at a time, and each
+        batch is stored between awaits, so requests are served while it loads.
+        Entries set since the process started are kept. A missing snapshot loads
+        nothing.
+        :param batch_size: The maximum number of entries to read at a time.
+        :return: The number of entries loaded.
+        """
+        loop = asyncio.get_event_loop()
+        batches = snapshot.read_batches(path, time.time(), batch_size)
+        loaded = 0
+        while True:
+            batch = await loop.run_in_executor(self.executor, next, batches, None)
+            if batch is None:
+                return loaded
+            with self.__lock:
+                now = time.time()
+                for key, data, ttl, soft_ttl, tags in batch:
+                    if not self.__store.has_expired(key, now):
+                        continue
+                    if self._set(key, data, ttl, soft_ttl):
+                        self.__store.tag(key, tags)
+                        loaded += 1
+
+    def start_snapshots(self, path: str, interval: float = 60.0) -> None:
+        """
+        Start a task on the running event loop that dumps this cache to ``path``
+        periodically. Only one runs per cache name.
+        :param path: The snapshot file.
+        :param interval: The number of seconds to wait between snapshots.
+        """
+        if self.__name not in _snapshotters:
+            task = asyncio.ensure_future(self.__dump_forever(path, interval))
+            _snapshotters[self.__name] = (task, path)
+
+    async def stop_snapshots(self) -> None:
+        """
+        Stop the task started by ``start_snapshots``, and dump the cache one last
+        time, e.g. from an application shutdown handler.
+        """
+        snapshotter = _snapshotters.pop(self.__name, None)
+        if snapshotter is not None:
+            task, path = snapshotter
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            await self.dump(path)
+
+    async def __dump_forever(self, path: str, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.dump(path)
+            except OSError:
+                logger.exception("Failed to write the cache snapshot %s", path)
+
+    def sweep(self, limit: int = 1000) -> int:
+        """
+        Remove up to ``limit`` expired entries that have not been read since they
+        expired.
+        :param limit: The maximum number of expiry index entries to process in one
+        slice.
+        :return: The number of index entries processed.
+        """
+        with self.__lock:
+            return self.__store.sweep(time.time(), limit)
+
+    def start_sweeper(self, interval: float = 1.0, batch_size: int = 1000) -> None:
+        """
+        Start a task on the running event loop that sweeps expired entries from this
+        cache, e.g. from an application startup handler. Only one sweeper runs per
+        cache name.
+        :param interval: The number of seconds to wait between sweeps.
+        :param batch_size: The maximum number of entries to sweep before yielding
+        back to the event loop.
+        """
+        if self.__name not in _sweepers:
+            _sweepers[self.__name] = asyncio.ensure_future(
+                self.__sweep_forever(interval, batch_size)
+            )
+
+    async def stop_sweeper(self) -> None:
+        task = _sweepers.pop(self.__name, None)
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def __sweep_forever(self, interval: float, batch_size: int) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            while self.sweep(batch_size) == batch_size:
+                await asyncio.sleep(0)
+
+
+_done = object()
+# How many objects the size estimate looks at before it gives up on the value as
+# too costly to walk, and so likely to be costly to serialize as well.
+_max_estimated_nodes = 10_000
+
+
+def _estimate_size(value: Any, limit: int) -> int:
+    """
+    Roughly estimate the serialized size of a value from the strings and bytes it
+    holds, walking into containers and object attributes. The walk stops as soon as
+    the estimate exceeds ``limit``, so large values are told apart cheaply. Objects
+    are only counted once, so values that refer to themselves are walked to the end,
+    and values with more than ``_max_estimated_nodes`` objects count as over the
+    limit.
+    """
+    size = 0
+    nodes = 0
+    visited = set()
+    stack = [iter((value,))]
+    while stack and size <= limit:
+        item = next(stack[-1], _done)
+        if item is _done:
+            stack.pop()
+            continue
+        nodes += 1
+        if nodes > _max_estimated_nodes:
+            return limit + 1
+        if isinstance(item, (bytes, bytearray, memoryview, str)):
+            size += len(item)
+            continue
+        # Numbers and other scalars, and the overhead of every container and object.
+        size += 8
+        if isinstance(item, (int, float, bool, complex)) or item is None:
+            continue
+        if id(item) in visited:
+            continue
+        visited.add(id(item))
+        if isinstance(item, dict):
+            stack.append(itertools.chain.from_iterable(item.items()))
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.append(iter(item))
+        else:
+            attributes = getattr(item, "__dict__", None)
+            if attributes:
+                stack.append(iter(attributes.values()))
+            slots = getattr(type(item), "__slots__", ())
+            if isinstance(slots, str):
+                slots = (slots,)
+            if slots:
+                stack.append(getattr(item, slot, None) for slot in slots)
+    return size
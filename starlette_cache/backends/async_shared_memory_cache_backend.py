@@ -0,0 +1,147 @@
+import asyncio
+import functools
+import time
+from concurrent.futures import Executor
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from starlette_cache.backends.base_async_cache_backend import BaseAsyncCacheBackend
+from starlette_cache.backends.serializers import BaseSerializer
+from starlette_cache.backends.shared_memory_cache_backend import (
+    SharedMemoryCacheBackend,
+)
+from starlette_cache.backends.shared_memory_table import Slot
+
+_Result = TypeVar("_Result")
+
+
+class AsyncSharedMemoryCacheBackend(BaseAsyncCacheBackend[str, Any]):
+    """
+    The asynchronous counterpart of ``SharedMemoryCacheBackend``, sharing its
+    entries and its implementation.
+
+    Reads copy entries out of the table on the event loop without locking. Writes,
+    and the rare reads that keep finding their entry being written, have to take the
+    file lock, which may wait for other processes, so they run in ``executor``
+    instead of blocking the event loop.
+    """
+
+    DEFAULT_TTL = 300
+
+    def __init__(
+        self,
+        name: str,
+        slots: int = 4096,
+        slot_size: int = 16384,
+        path: Optional[str] = None,
+        serializer: Optional[BaseSerializer] = None,
+        executor: Optional[Executor] = None,
+    ):
+        """
+        Create a shared-memory cache backend for use on the event loop.
+        :param name: The name of the cache. Backends with the same name share entries,
+        across processes too.
+        :param slots: The number of entries the cache holds.
+        :param slot_size: The size in bytes of a slot, which bounds the size of the
+        serialized entries.
+        :param path: The file the table is mapped from. Defaults to a file named after
+        the cache in ``/dev/shm``, or the temporary directory if there is none.
+        :param serializer: How values are serialized. Defaults to pickle.
+        :param executor: The executor writes run in. Defaults to the event loop's
+        default executor.
+        """
+        self.backend = SharedMemoryCacheBackend(
+            name, slots=slots, slot_size=slot_size, path=path, serializer=serializer
+        )
+        self.path = self.backend.path
+        self.executor = executor
+
+    async def __run(self, function: Callable[..., _Result], *args: Any) -> _Result:
+        return await asyncio.get_event_loop().run_in_executor(
+            self.executor, functools.partial(function, *args)
+        )
+
+    async def __read(self, key: str, now: float) -> Optional[Slot]:
+        found = self.backend._try_read(key, now)
+        if found is False:
+            found = await self.__run(self.backend._read, key, now)
+        return found
+
+    async def get(self, key: str, default: Any = None) -> Optional[Any]:
+        now = time.time()
+        return self.backend._fresh(await self.__read(key, now), now, default)
+
+    async def get_soft(
+        self, key: str, default: Any = None
+    ) -> Tuple[Optional[Any], Optional[float]]:
+        now = time.time()
+        return self.backend._with_staleness(await self.__read(key, now), now, default)
+
+    async def get_with_ttl(
+        self, key: str, default: Any = None
+    ) -> Tuple[Optional[Any], Optional[float]]:
+        now = time.time()
+        return self.backend._with_ttl(await self.__read(key, now), now, default)
+
+    def view(self, key: str) -> "_View":
+        """
+        A read-only view of a copy of the serialized value of a key, e.g. a body
+        stored through ``PassThroughSerializer``.
+
+        Unlike the views of ``SharedMemoryCacheBackend`` it is copied out of the
+        shared memory, so it stays valid across awaits while the entry is written to.
+
+        Usage: ``async with backend.view(key) as body: ...``
+        """
+        return _View(self.__read, key)
+
+    async def set(self, key: str, value: Any, ttl: int = DEFAULT_TTL) -> None:
+        await self.__run(self.backend.set, key, value, ttl)
+
+    async def set_soft(
+        self, key: str, value: Any, soft_ttl: int, hard_ttl: int
+    ) -> None:
+        await self.__run(self.backend.set_soft, key, value, soft_ttl, hard_ttl)
+
+    async def add(self, key: str, value: Any, ttl: int = DEFAULT_TTL) -> bool:
+        return await self.__run(self.backend.add, key, value, ttl)
+
+    async def delete(self, key: str) -> None:
+        await self.__run(self.backend.delete, key)
+
+    async def clear(self) -> None:
+        await self.__run(self.backend.clear)
+
+    def stats(self) -> Dict[str, int]:
+        return self.backend.stats()
+
+    async def close(self) -> None:
+        """
+        Unmap the table, once every backend of this process using it is closed. The
+        entries are kept in the file for the other processes.
+        """
+        self.backend.close()
+
+
+class _View:
+    """
+    The async context manager returned by ``AsyncSharedMemoryCacheBackend.view``,
+    written out rather than through ``contextlib.asynccontextmanager``, which
+    Python 3.6 does not have.
+    """
+
+    def __init__(
+        self, read: Callable[[str, float], Awaitable[Optional[Slot]]], key: str
+    ):
+        self.__read = read
+        self.__key = key
+        self.__data: Optional[memoryview] = None
+
+    async def __aenter__(self) -> Optional[memoryview]:
+        found = await self.__read(self.__key, time.time())
+        if found is not None:
+            self.__data = memoryview(found[0])
+        return self.__data
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        if self.__data is not None:
+            self.__data.release()
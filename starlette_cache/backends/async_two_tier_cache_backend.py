@@ -0,0 +1,160 @@
+import asyncio
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from starlette_cache.backends.async_memory_cache_backend import AsyncMemoryCacheBackend
+from starlette_cache.backends.base_async_cache_backend import BaseAsyncCacheBackend
+
+_missing = object()
+
+
+class AsyncTwoTierCacheBackend(BaseAsyncCacheBackend[str, Any]):
+    """
+    A cache backend that keeps recently used entries of a shared (L2) backend in a
+    small in-process (L1) cache, so most hits never leave the process.
+
+    Entries are kept in L1 for at most ``l1_ttl`` seconds and never longer than
+    they stay fresh in L2, which bounds how long a process can serve an entry
+    changed by another one.
+    """
+
+    DEFAULT_TTL = 300
+
+    def __init__(
+        self,
+        name: str,
+        l2: BaseAsyncCacheBackend,
+        l1_ttl: float = 5,
+        max_entries: Optional[int] = 1024,
+        max_bytes: Optional[int] = None,
+        on_delete: Optional[Callable[[str], Union[None, Awaitable[None]]]] = None,
+    ):
+        """
+        Create a two-tier cache backend.
+        :param name: The name of the in-process cache. Backends with the same name
+        share L1 entries.
+        :param l2: The shared cache backend.
+        :param l1_ttl: The maximum number of seconds an entry is kept in L1.
+        :param max_entries: The maximum number of entries to keep in L1.
+        :param max_bytes: The maximum total size of the pickled entries to keep in L1.
+        :param on_delete: Called with the key after a key is deleted, e.g. to publish
+        it to the other processes so they can ``invalidate`` their L1 entry. It may
+        be a coroutine function.
+        """
+        self.l1 = AsyncMemoryCacheBackend(
+            f"{name}:l1", max_entries=max_entries, max_bytes=max_bytes
+        )
+        self.l2 = l2
+        self.l1_ttl = l1_ttl
+        self.on_delete = on_delete
+
+    def _l1_ttl(self, ttl: Optional[float]) -> float:
+        return self.l1_ttl if ttl is None else min(self.l1_ttl, ttl)
+
+    async def get(self, key: str, default: Any = None) -> Optional[Any]:
+        value, _ = await self.get_with_ttl(key, default)
+        return value
+
+    async def get_with_ttl(
+        self, key: str, default: Any = None
+    ) -> Tuple[Optional[Any], Optional[float]]:
+        value, ttl = await self.l1.get_with_ttl(key, _missing)
+        if value is not _missing:
+            return value, ttl
+        value, ttl = await self.l2.get_with_ttl(key, _missing)
+        if value is _missing:
+            return default, None
+        await self.l1.set(key, value, self._l1_ttl(ttl))
+        return value, ttl
+
+    async def get_soft(
+        self, key: str, default: Any = None
+    ) -> Tuple[Optional[Any], Optional[float]]:
+        value = await self.l1.get(key, _missing)
+        if value is not _missing:
+            return value, None
+        # Stale entries are not copied to L1, they are about to be replaced.
+        return await self.l2.get_soft(key, default)
+
+    async def set(self, key: str, value: Any, ttl: int = DEFAULT_TTL) -> None:
+        await self.l2.set(key, value, ttl)
+        await self.l1.set(key, value, self._l1_ttl(ttl))
+
+    async def set_soft(
+        self, key: str, value: Any, soft_ttl: int, hard_ttl: int
+    ) -> None:
+        await self.l2.set_soft(key, value, soft_ttl, hard_ttl)
+        await self.l1.set(key, value, self._l1_ttl(soft_ttl))
+
+    async def add(self, key: str, value: Any, ttl: int = DEFAULT_TTL) -> bool:
+        if not await self.l2.add(key, value, ttl):
+            return False
+        await self.l1.set(key, value, self._l1_ttl(ttl))
+        return True
+
+    async def delete(self, key: str) -> None:
+        await self.l2.delete(key)
+        await self.l1.delete(key)
+        if self.on_delete is not None:
+            result = self.on_delete(key)
+            if asyncio.iscoroutine(result):
+                await result
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        keys = list(keys)
+        values = await self.l1.get_many(keys)
+        misses = [key for key in keys if key not in values]
+        if misses:
+            # The remaining L2 time to live of these is unknown, so they are not
+            # copied to L1.
+            values.update(await self.l2.get_many(misses))
+        return values
+
+    async def set_many(self, values: Mapping[str, Any], ttl: int = DEFAULT_TTL) -> None:
+        await self.l2.set_many(values, ttl)
+        await self.l1.set_many(values, self._l1_ttl(ttl))
+
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        keys = list(keys)
+        await self.l2.delete_many(keys)
+        await self.l1.delete_many(keys)
+        if self.on_delete is not None:
+            for key in keys:
+                result = self.on_delete(key)
+                if asyncio.iscoroutine(result):
+                    await result
+
+    async def tag(self, key: str, tags: Iterable[str]) -> None:
+        await self.l2.tag(key, tags)
+
+    async def invalidate_tag(self, tag: str) -> List[str]:
+        """
+        Delete every entry with the tag from L2, and the same keys from L1.
+        """
+        keys = await self.l2.invalidate_tag(tag)
+        await self.l1.delete_many(keys)
+        if self.on_delete is not None:
+            for key in keys:
+                result = self.on_delete(key)
+                if asyncio.iscoroutine(result):
+                    await result
+        return keys
+
+    async def invalidate(self, key: str) -> None:
+        """
+        Drop a key from L1 only, e.g. when another process deleted it from L2.
+        """
+        await self.l1.delete(key)
+
+    def stats(self) -> Dict[str, int]:
+        return self.l1.stats()
@@ -1,10 +1,12 @@
 from abc import abstractmethod
 from abc import ABC
-from typing import Optional, Generic, TypeVar
+from typing import Dict, Iterable, List, Mapping, Optional, Generic, Tuple, TypeVar
 
 KeyType = TypeVar("KeyType")
 ValueType = TypeVar("ValueType")
 
+_missing = object()
+
 
 class BaseCacheBackend(ABC, Generic[KeyType, ValueType]):  # pragma: no cover
     @abstractmethod
@@ -30,3 +32,72 @@ class BaseCacheBackend(ABC, Generic[KeyType, ValueType]):  # pragma: no cover
         raise NotImplementedError(
             "Subclasses of BaseCacheBackend need to implement delete"
         )
+
+    def set_soft(
+        self, key: KeyType, value: ValueType, soft_ttl: int, hard_ttl: int
+    ) -> None:
+        """
+        Store a value that is fresh for ``soft_ttl`` seconds, and kept as stale until
+        ``hard_ttl`` seconds. Backends without support for stale entries only keep
+        the value while it is fresh.
+        """
+        self.set(key, value, soft_ttl)
+
+    def get_soft(
+        self, key: KeyType, default: ValueType = None
+    ) -> Tuple[Optional[ValueType], Optional[float]]:
+        """
+        Get a value stored with ``set_soft``, including stale values.
+        :return: The value and the number of seconds it has been stale for, or None if
+        it is still fresh.
+        """
+        return self.get(key, default), None
+
+    def get_with_ttl(
+        self, key: KeyType, default: ValueType = None
+    ) -> Tuple[Optional[ValueType], Optional[float]]:
+        """
+        Get a fresh value together with the number of seconds it stays fresh for.
+        :return: The value and its remaining time to live, or None if the backend
+        cannot tell.
+        """
+        return self.get(key, default), None
+
+    def get_many(self, keys: Iterable[KeyType]) -> Dict[KeyType, ValueType]:
+        """
+        Get several values at once.
+        :return: The values of the keys that are cached, by key.
+        """
+        values = {}
+        for key in keys:
+            value = self.get(key, _missing)
+            if value is not _missing:
+                values[key] = value
+        return values
+
+    def set_many(self, values: Mapping[KeyType, ValueType], ttl: int) -> None:
+        """
+        Store several values with the same time to live at once.
+        """
+        for key, value in values.items():
+            self.set(key, value, ttl)
+
+    def delete_many(self, keys: Iterable[KeyType]) -> None:
+        """
+        Delete several keys at once.
+        """
+        for key in keys:
+            self.delete(key)
+
+    def tag(self, key: KeyType, tags: Iterable[str]) -> None:
+        """
+        Attach tags to a cached entry, so it can be deleted with ``invalidate_tag``.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support tags")
+
+    def invalidate_tag(self, tag: str) -> List[KeyType]:
+        """
+        Delete every entry with the tag.
+        :return: The deleted keys.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support tags")
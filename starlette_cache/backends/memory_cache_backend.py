@@ -1,66 +1,313 @@
+import logging
 import pickle
 import time
-import collections
 import threading
-from typing import Any, Optional
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
 
+from starlette_cache.backends import snapshot
+from starlette_cache.backends.admission import BaseAdmissionPolicy
 from starlette_cache.backends.base_cache_backend import BaseCacheBackend
+from starlette_cache.backends.memory_store import MemoryStore
+from starlette_cache.backends.serializers import (
+    BaseSerializer,
+    Payload,
+    PickleSerializer,
+)
 
-_caches = {}
-_expire_info = {}
+_stores = {}
 _locks = {}
+_sweepers = {}
+_snapshotters = {}
+
+logger = logging.getLogger(__name__)
 
 
 class MemoryCacheBackend(BaseCacheBackend[str, Any]):
     DEFAULT_TTL = 300
     pickle_protocol = pickle.HIGHEST_PROTOCOL
 
-    def __init__(self, name: str):
-        self.__cache = _caches.setdefault(name, collections.OrderedDict())
-        self.__expirations = _expire_info.setdefault(name, {})
+    def __init__(
+        self,
+        name: str,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        serializer: Optional[BaseSerializer] = None,
+        admission: Optional[BaseAdmissionPolicy] = None,
+    ):
+        """
+        Create an in-memory cache backend.
+        :param name: The name of the cache. Backends with the same name share entries.
+        :param max_entries: The maximum number of entries to keep before evicting
+        the least recently used ones. It is shared by the backends with the same
+        name. By default the number of entries is unbounded.
+        :param max_bytes: The maximum total size of the serialized entries to keep
+        before evicting the least recently used ones. It is shared by the backends
+        with the same name. By default the size is unbounded.
+        :param serializer: How values are serialized. Defaults to pickle.
+        :param admission: Decides whether new entries may evict the least recently
+        used one once the cache is full, e.g. ``TinyLFU``. It is shared by the
+        backends with the same name. By default every new entry is stored.
+        """
+        self.__name = name
+        self.__store = _stores.setdefault(name, MemoryStore())
         self.__lock = _locks.setdefault(name, threading.Lock())
+        if admission is not None:
+            self.__store.admission = admission
+        if max_entries is not None:
+            self.__store.max_entries = max_entries
+        if max_bytes is not None:
+            self.__store.max_bytes = max_bytes
+        self.serializer = serializer or PickleSerializer(self.pickle_protocol)
 
     def get(self, key: str, default: Any = None) -> Optional[Any]:
         with self.__lock:
-            if self.__has_expired(key):
-                self.delete(key)
+            now = time.time()
+            self.__store.record(key)
+            if self.__store.has_expired(key, now):
+                self.__store.delete(key)
+                return default
+            if self.__store.staleness(key, now) is not None:
                 return default
-            pickled = self.__cache[key]
-            self.__cache.move_to_end(key, last=False)
-        return pickle.loads(pickled)
+            data = self.__store.get(key)
+        return self.serializer.loads(data)
+
+    def get_soft(
+        self, key: str, default: Any = None
+    ) -> Tuple[Optional[Any], Optional[float]]:
+        with self.__lock:
+            now = time.time()
+            self.__store.record(key)
+            if self.__store.has_expired(key, now):
+                self.__store.delete(key)
+                return default, None
+            data = self.__store.get(key)
+            staleness = self.__store.staleness(key, now)
+        return self.serializer.loads(data), staleness
+
+    def get_with_ttl(
+        self, key: str, default: Any = None
+    ) -> Tuple[Optional[Any], Optional[float]]:
+        with self.__lock:
+            now = time.time()
+            self.__store.record(key)
+            if self.__store.has_expired(key, now):
+                self.__store.delete(key)
+                return default, None
+            if self.__store.staleness(key, now) is not None:
+                return default, None
+            data = self.__store.get(key)
+            ttl = self.__store.time_to_live(key, now)
+        return self.serializer.loads(data), ttl
 
     def set(self, key: str, value: Any, ttl: int = DEFAULT_TTL) -> None:
+        data = self.serializer.dumps(value)
         with self.__lock:
-            self._set(key, value, ttl)
+            self._set(key, data, ttl)
+
+    def set_soft(self, key: str, value: Any, soft_ttl: int, hard_ttl: int) -> None:
+        data = self.serializer.dumps(value)
+        with self.__lock:
+            self._set(key, data, hard_ttl, soft_ttl)
 
     @staticmethod
     def __get_expiration(ttl: int) -> float:
         return time.time() + ttl
 
-    def _set(self, key: str, value: Any, ttl: int) -> None:
-        pickled = pickle.dumps(value, self.pickle_protocol)
-        expiration = self.__get_expiration(ttl)
-        self.__cache[key] = pickled
-        self.__cache.move_to_end(key, last=False)
-        self.__expirations[key] = expiration
+    def _set(
+        self, key: str, data: Payload, ttl: int, soft_ttl: Optional[int] = None
+    ) -> bool:
+        """
+        :return: Whether the entry was stored, rather than being too large or
+        rejected by the admission policy.
+        """
+        if not self.__store.fits(len(data)):
+            self.__store.delete(key)
+            return False
+        if not self.__store.admits(key, len(data)):
+            return False
+        soft_expiration = None if soft_ttl is None else self.__get_expiration(soft_ttl)
+        self.__store.set(key, data, self.__get_expiration(ttl), soft_expiration)
+        self.__store.evict()
+        return True
 
     def add(self, key: str, value: Any, ttl: int = DEFAULT_TTL) -> bool:
+        data = self.serializer.dumps(value)
         with self.__lock:
-            if self.__has_expired(key):
-                self._set(key, value, ttl)
+            now = time.time()
+            if (
+                self.__store.has_expired(key, now)
+                or self.__store.staleness(key, now) is not None
+            ):
+                self._set(key, data, ttl)
                 return True
             return False
 
     def delete(self, key: str) -> None:
-        try:
-            del self.__cache[key]
-        except KeyError:
-            pass
-        try:
-            del self.__expirations[key]
-        except KeyError:
-            pass
-
-    def __has_expired(self, key):
-        exp = self.__expirations.get(key, -1)
-        return exp is not None and exp <= time.time()
+        with self.__lock:
+            self.__store.delete(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        found = {}
+        with self.__lock:
+            now = time.time()
+            for key in keys:
+                self.__store.record(key)
+                if self.__store.has_expired(key, now):
+                    self.__store.delete(key)
+                elif self.__store.staleness(key, now) is None:
+                    found[key] = self.__store.get(key)
+        return {key: self.serializer.loads(data) for key, data in found.items()}
+
+    def set_many(self, values: Mapping[str, Any], ttl: int = DEFAULT_TTL) -> None:
+        payloads = {key: self.serializer.dumps(value) for key, value in values.items()}
+        with self.__lock:
+            for key, data in payloads.items():
+                self._set(key, data, ttl)
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        with self.__lock:
+            for key in keys:
+                self.__store.delete(key)
+
+    def tag(self, key: str, tags: Iterable[str]) -> None:
+        with self.__lock:
+            self.__store.tag(key, tags)
+
+    def invalidate_tag(self, tag: str) -> List[str]:
+        with self.__lock:
+            return self.__store.invalidate_tag(tag)
+
+    def stats(self) -> Dict[str, int]:
+        with self.__lock:
+            return self.__store.stats()
+
+    def dump(self, path: str) -> int:
+        """
+        Write the entries that have not expired, with their remaining time to live,
+        to a snapshot file, e.g. on shutdown, so ``load`` can warm a restarted
+        process with them.
+        :return: The number of entries written.
+        """
+        now = time.time()
+        return snapshot.write(path, self._snapshot(now), now)
+
+    def _snapshot(self, now: float) -> List[snapshot.Record]:
+        # Only the references are copied under the lock, the file is written
+        # without holding it.
+        with self.__lock:
+            return self.__store.snapshot(now)
+
+    def load(self, path: str, batch_size: int = 1000) -> int:
+        """
+        Load the entries of a snapshot written by ``dump`` that have not expired
+        since, streaming it in batches so requests are served while it loads.
+        Entries set since the process started are kept. A missing snapshot loads
+        nothing.
+        :param batch_size: The maximum number of entries to load per lock
+        acquisition.
+        :return: The number of entries loaded.
+        """
+        loaded = 0
+        for batch in snapshot.read_batches(path, time.time(), batch_size):
+            loaded += self._restore(batch)
+        return loaded
+
+    def _restore(self, records: Iterable[snapshot.Record]) -> int:
+        restored = 0
+        with self.__lock:
+            now = time.time()
+            for key, data, ttl, soft_ttl, tags in records:
+                if not self.__store.has_expired(key, now):
+                    continue
+                if self._set(key, data, ttl, soft_ttl):
+                    self.__store.tag(key, tags)
+                    restored += 1
+        return restored
+
+    def start_snapshots(self, path: str, interval: float = 60.0) -> None:
+        """
+        Start a daemon thread that dumps this cache to ``path`` periodically. Only
+        one runs per cache name.
+        :param path: The snapshot file.
+        :param interval: The number of seconds to wait between snapshots.
+        """
+        with self.__lock:
+            if self.__name in _snapshotters:
+                return
+            stop = threading.Event()
+            thread = threading.Thread(
+                target=self.__dump_forever,
+                args=(stop, path, interval),
+                name=f"starlette-cache-snapshots-{self.__name}",
+                daemon=True,
+            )
+            _snapshotters[self.__name] = (thread, stop, path)
+        thread.start()
+
+    def stop_snapshots(self) -> None:
+        """
+        Stop the thread started by ``start_snapshots``, and dump the cache one last
+        time, e.g. from an application shutdown handler.
+        """
+        with self.__lock:
+            snapshotter = _snapshotters.pop(self.__name, None)
+        if snapshotter is not None:
+            thread, stop, path = snapshotter
+            stop.set()
+            thread.join()
+            self.dump(path)
+
+    def __dump_forever(self, stop: threading.Event, path: str, interval: float) -> None:
+        while not stop.wait(interval):
+            try:
+                self.dump(path)
+            except OSError:
+                logger.exception("Failed to write the cache snapshot %s", path)
+
+    def sweep(self, limit: int = 1000) -> int:
+        """
+        Remove up to ``limit`` expired entries that have not been read since they
+        expired.
+        :param limit: The maximum number of expiry index entries to process while
+        holding the lock.
+        :return: The number of index entries processed.
+        """
+        with self.__lock:
+            return self.__store.sweep(time.time(), limit)
+
+    def start_sweeper(self, interval: float = 1.0, batch_size: int = 1000) -> None:
+        """
+        Start a daemon thread that sweeps expired entries from this cache. Only one
+        sweeper runs per cache name.
+        :param interval: The number of seconds to wait between sweeps.
+        :param batch_size: The maximum number of entries to sweep per lock
+        acquisition, so requests are never blocked for long.
+        """
+        with self.__lock:
+            if self.__name in _sweepers:
+                return
+            stop = threading.Event()
+            thread = threading.Thread(
+                target=self.__sweep_forever,
+                args=(stop, interval, batch_size),
+                name=f"starlette-cache-sweeper-{self.__name}",
+                daemon=True,
+            )
+            _sweepers[self.__name] = (thread, stop)
+        thread.start()
+
+    def stop_sweeper(self) -> None:
+        with self.__lock:
+            sweeper = _sweepers.pop(self.__name, None)
+        if sweeper is not None:
+            thread, stop = sweeper
+            stop.set()
+            thread.join()
+
+    def __sweep_forever(
+        self, stop: threading.Event, interval: float, batch_size: int
+    ) -> None:
+        while not stop.wait(interval):
+            while self.sweep(batch_size) == batch_size and not stop.is_set():
+                # Give request threads a chance at the lock between batches.
+                time.sleep(0)
@@ -0,0 +1,230 @@
+import collections
+import heapq
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from starlette_cache.backends.admission import BaseAdmissionPolicy
+
+
+class MemoryStore:
+    """
+    The storage shared by the in-memory cache backends.
+
+    Entries are kept in most recently used order, so the least recently used
+    entry is always at the end of the ordered dict. The store does no locking of
+    its own, callers are responsible for serializing access to it.
+    """
+
+    def __init__(self) -> None:
+        self.entries: "collections.OrderedDict[str, bytes]" = collections.OrderedDict()
+        self.expirations: Dict[str, float] = {}
+        self.soft_expirations: Dict[str, float] = {}
+        self.expiry_index: List[Tuple[float, str]] = []
+        self.size: int = 0
+        self.evictions: int = 0
+        self.tags: Dict[str, Set[str]] = {}
+        self.key_tags: Dict[str, Set[str]] = {}
+        self.admission: Optional[BaseAdmissionPolicy] = None
+        self.rejections: int = 0
+        self.max_entries: Optional[int] = None
+        self.max_bytes: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: str) -> bytes:
+        data = self.entries[key]
+        self.entries.move_to_end(key, last=False)
+        return data
+
+    def size_of(self, key: str) -> int:
+        return len(self.entries.get(key, b""))
+
+    def set(
+        self,
+        key: str,
+        data: bytes,
+        expiration: float,
+        soft_expiration: Optional[float] = None,
+    ) -> None:
+        previous = self.entries.get(key)
+        if previous is not None:
+            self.size -= len(previous)
+        self.entries[key] = data
+        self.entries.move_to_end(key, last=False)
+        self.expirations[key] = expiration
+        if soft_expiration is None:
+            self.soft_expirations.pop(key, None)
+        else:
+            self.soft_expirations[key] = soft_expiration
+        self.size += len(data)
+        heapq.heappush(self.expiry_index, (expiration, key))
+        if len(self.expiry_index) > 2 * len(self.expirations) + 64:
+            self.__rebuild_expiry_index()
+
+    def delete(self, key: str) -> None:
+        data = self.entries.pop(key, None)
+        self.expirations.pop(key, None)
+        self.soft_expirations.pop(key, None)
+        if data is not None:
+            self.size -= len(data)
+        self.__untag(key)
+
+    def tag(self, key: str, tags: Iterable[str]) -> None:
+        """
+        Add a stored entry to the index of each of the tags. The entry stays tagged
+        until it is deleted, even when it is overwritten.
+        """
+        if key not in self.entries:
+            return
+        key_tags = self.key_tags.setdefault(key, set())
+        for tag in tags:
+            key_tags.add(tag)
+            self.tags.setdefault(tag, set()).add(key)
+
+    def invalidate_tag(self, tag: str) -> List[str]:
+        """
+        Delete every entry with the tag.
+        :return: The deleted keys.
+        """
+        keys = list(self.tags.pop(tag, ()))
+        for key in keys:
+            self.delete(key)
+        return keys
+
+    def __untag(self, key: str) -> None:
+        for tag in self.key_tags.pop(key, ()):
+            keys = self.tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tags[tag]
+
+    def has_expired(self, key: str, now: float) -> bool:
+        exp = self.expirations.get(key, -1)
+        return exp is not None and exp <= now
+
+    def staleness(self, key: str, now: float) -> Optional[float]:
+        """
+        :return: The number of seconds the entry has been past its soft expiration, or
+        None if it is still fresh.
+        """
+        soft_expiration = self.soft_expirations.get(key)
+        if soft_expiration is None or now < soft_expiration:
+            return None
+        return now - soft_expiration
+
+    def time_to_live(self, key: str, now: float) -> float:
+        """
+        :return: The number of seconds until the entry is no longer fresh.
+        """
+        expiration = self.soft_expirations.get(key, self.expirations[key])
+        return expiration - now
+
+    def sweep(self, now: float, limit: int) -> int:
+        """
+        Remove entries that have expired by ``now``, in expiration order.
+        :param now: The current time.
+        :param limit: The maximum number of expiry index entries to process.
+        :return: The number of index entries processed. When this equals ``limit``
+        there may be more expired entries left to sweep.
+        """
+        processed = 0
+        while (
+            processed < limit and self.expiry_index and self.expiry_index[0][0] <= now
+        ):
+            expiration, key = heapq.heappop(self.expiry_index)
+            # Overwritten and deleted keys leave stale index entries behind.
+            if self.expirations.get(key) == expiration:
+                self.delete(key)
+            processed += 1
+        return processed
+
+    def __rebuild_expiry_index(self) -> None:
+        self.expiry_index = [(exp, key) for key, exp in self.expirations.items()]
+        heapq.heapify(self.expiry_index)
+
+    def record(self, key: str) -> None:
+        """
+        Count a lookup of a key towards its admission, if the store has a policy.
+        """
+        if self.admission is not None:
+            self.admission.record(key)
+
+    def admits(self, key: str, size: int) -> bool:
+        """
+        Ask the admission policy whether a key is worth evicting the least recently
+        used entry for. Keys already stored and keys that fit without evicting
+        anything are always admitted.
+        :param size: The size of the payload about to be stored.
+        :return: Whether to store the key.
+        """
+        if self.admission is None or not self.entries or key in self.entries:
+            return True
+        if (self.max_entries is None or len(self.entries) < self.max_entries) and (
+            self.max_bytes is None or self.size + size <= self.max_bytes
+        ):
+            return True
+        if self.admission.admit(key, next(reversed(self.entries))):
+            return True
+        self.rejections += 1
+        return False
+
+    def fits(self, size: int) -> bool:
+        """
+        :return: Whether a payload of ``size`` bytes can be stored at all.
+        """
+        return self.max_bytes is None or size <= self.max_bytes
+
+    def evict(self) -> int:
+        """
+        Evict least recently used entries until the store is within its limits.
+        :return: The number of evicted entries.
+        """
+        evicted = 0
+        while self.entries and (
+            (self.max_entries is not None and len(self.entries) > self.max_entries)
+            or (self.max_bytes is not None and self.size > self.max_bytes)
+        ):
+            key, data = self.entries.popitem()
+            self.expirations.pop(key, None)
+            self.soft_expirations.pop(key, None)
+            self.size -= len(data)
+            self.__untag(key)
+            evicted += 1
+        self.evictions += evicted
+        return evicted
+
+    def snapshot(
+        self, now: float
+    ) -> List[Tuple[str, bytes, float, Optional[float], List[str]]]:
+        """
+        The entries that have not expired by ``now``, least recently used first.
+        :return: The key, payload, remaining time to live, remaining soft time to
+        live and tags of each entry.
+        """
+        records = []
+        for key in reversed(self.entries):
+            expiration = self.expirations[key]
+            if expiration <= now:
+                continue
+            soft_expiration = self.soft_expirations.get(key)
+            records.append(
+                (
+                    key,
+                    self.entries[key],
+                    expiration - now,
+                    None if soft_expiration is None else soft_expiration - now,
+                    list(self.key_tags.get(key, ())),
+                )
+            )
+        return records
+
+    def stats(self) -> Dict[str, int]:
+        stats = {
+            "entries": len(self.entries),
+            "bytes": self.size,
+            "evictions": self.evictions,
+        }
+        if self.admission is not None:
+            stats["rejections"] = self.rejections
+        return stats
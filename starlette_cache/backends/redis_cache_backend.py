@@ -0,0 +1,260 @@
+import asyncio
+import pickle
+import struct
+import time
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+try:
+    import aioredis
+except ImportError:  # pragma: no cover
+    aioredis = None
+
+from starlette_cache.backends.base_async_cache_backend import BaseAsyncCacheBackend
+
+# Every stored value starts with the time it goes stale, or 0 if it is only ever
+# fresh, so stale values can be told apart without a second round trip.
+_header = struct.Struct("!d")
+_header_size = _header.size
+
+# Adds KEYS[1] to the tag sets in the other KEYS, and makes every set live at least
+# as long as the key, so the sets expire once all of their keys have.
+_TAG_SCRIPT = """
+local ttl = redis.call("PTTL", KEYS[1])
+if ttl == -2 then
+    return 0
+end
+for index = 2, #KEYS do
+    redis.call("SADD", KEYS[index], KEYS[1])
+    if ttl == -1 then
+        redis.call("PERSIST", KEYS[index])
+    elseif redis.call("PTTL", KEYS[index]) < ttl then
+        redis.call("PEXPIRE", KEYS[index], ttl)
+    end
+end
+return 1
+"""
+
+
+class RedisCacheBackend(BaseAsyncCacheBackend[str, Any]):
+    """
+    A cache backend that stores entries in Redis, so they are shared by every
+    process using the same server.
+
+    Expiration is left to the server, and operations on multiple keys are sent in a
+    single round trip.
+    """
+
+    DEFAULT_TTL = 300
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(
+        self,
+        address: str = "redis://localhost",
+        redis: Any = None,
+        key_prefix: str = "",
+        minsize: int = 1,
+        maxsize: int = 10,
+    ):
+        """
+        Create a Redis cache backend.
+        :param address: The address of the Redis server, used to create a connection
+        pool on first use.
+        :param redis: An existing ``aioredis`` client or pool to use instead of
+        creating one. It is not closed by ``close``.
+        :param key_prefix: A prefix added to every key, to share a Redis database
+        between caches.
+        :param minsize: The minimum number of pooled connections.
+        :param maxsize: The maximum number of pooled connections.
+        """
+        if redis is None and aioredis is None:
+            raise RuntimeError(
+                "The Redis cache backend requires aioredis, install the redis extra."
+            )
+        self.address = address
+        self.key_prefix = key_prefix
+        self.minsize = minsize
+        self.maxsize = maxsize
+        self.__redis = redis
+        self.__owns_redis = redis is None
+        self.__connecting: Optional[asyncio.Future] = None
+
+    async def _redis(self) -> Any:
+        if self.__redis is None:
+            # Requests arriving while the pool is created wait for the same pool.
+            if self.__connecting is None:
+                self.__connecting = asyncio.ensure_future(
+                    aioredis.create_redis_pool(
+                        self.address, minsize=self.minsize, maxsize=self.maxsize
+                    )
+                )
+            try:
+                self.__redis = await self.__connecting
+            except Exception:
+                self.__connecting = None
+                raise
+        return self.__redis
+
+    async def close(self) -> None:
+        """
+        Close the connection pool, if it was created by this backend.
+        """
+        if self.__owns_redis and self.__redis is not None:
+            redis, self.__redis, self.__connecting = self.__redis, None, None
+            redis.close()
+            await redis.wait_closed()
+
+    def _key(self, key: str) -> str:
+        return f"{self.key_prefix}{key}"
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.key_prefix}tag:{tag}"
+
+    def _dumps(self, value: Any, soft_expiration: float = 0.0) -> bytes:
+        return _header.pack(soft_expiration) + pickle.dumps(value, self.pickle_protocol)
+
+    @staticmethod
+    def _loads(data: bytes) -> Tuple[Any, float]:
+        (soft_expiration,) = _header.unpack_from(data)
+        return pickle.loads(memoryview(data)[_header_size:]), soft_expiration
+
+    @staticmethod
+    def _milliseconds(ttl: float) -> int:
+        return max(1, int(ttl * 1000))
+
+    async def get(self, key: str, default: Any = None) -> Optional[Any]:
+        value, staleness = await self.get_soft(key, default)
+        return default if staleness is not None else value
+
+    async def get_soft(
+        self, key: str, default: Any = None
+    ) -> Tuple[Optional[Any], Optional[float]]:
+        redis = await self._redis()
+        data = await redis.get(self._key(key))
+        if data is None:
+            return default, None
+        value, soft_expiration = self._loads(data)
+        now = time.time()
+        if soft_expiration and soft_expiration <= now:
+            return value, now - soft_expiration
+        return value, None
+
+    async def get_with_ttl(
+        self, key: str, default: Any = None
+    ) -> Tuple[Optional[Any], Optional[float]]:
+        redis = await self._redis()
+        pipeline = redis.pipeline()
+        pipeline.get(self._key(key))
+        pipeline.pttl(self._key(key))
+        data, pttl = await pipeline.execute()
+        if data is None:
+            return default, None
+        value, soft_expiration = self._loads(data)
+        now = time.time()
+        if soft_expiration and soft_expiration <= now:
+            return default, None
+        # PTTL is negative for keys without an expiry.
+        ttl = pttl / 1000 if pttl >= 0 else None
+        if soft_expiration:
+            ttl = soft_expiration - now
+        return value, ttl
+
+    async def set(self, key: str, value: Any, ttl: int = DEFAULT_TTL) -> None:
+        redis = await self._redis()
+        if ttl <= 0:
+            await redis.delete(self._key(key))
+            return
+        await redis.set(
+            self._key(key), self._dumps(value), pexpire=self._milliseconds(ttl)
+        )
+
+    async def set_soft(
+        self, key: str, value: Any, soft_ttl: int, hard_ttl: int
+    ) -> None:
+        redis = await self._redis()
+        if hard_ttl <= 0:
+            await redis.delete(self._key(key))
+            return
+        await redis.set(
+            self._key(key),
+            self._dumps(value, time.time() + soft_ttl),
+            pexpire=self._milliseconds(hard_ttl),
+        )
+
+    async def add(self, key: str, value: Any, ttl: int = DEFAULT_TTL) -> bool:
+        redis = await self._redis()
+        return bool(
+            await redis.set(
+                self._key(key),
+                self._dumps(value),
+                pexpire=self._milliseconds(ttl),
+                exist=redis.SET_IF_NOT_EXIST,
+            )
+        )
+
+    async def delete(self, key: str) -> None:
+        redis = await self._redis()
+        await redis.delete(self._key(key))
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        redis = await self._redis()
+        values = await redis.mget(*(self._key(key) for key in keys))
+        now = time.time()
+        found = {}
+        for key, data in zip(keys, values):
+            if data is None:
+                continue
+            value, soft_expiration = self._loads(data)
+            if not soft_expiration or soft_expiration > now:
+                found[key] = value
+        return found
+
+    async def set_many(self, values: Mapping[str, Any], ttl: int = DEFAULT_TTL) -> None:
+        if not values:
+            return
+        redis = await self._redis()
+        if ttl <= 0:
+            await self.delete_many(values)
+            return
+        pipeline = redis.pipeline()
+        for key, value in values.items():
+            pipeline.set(
+                self._key(key), self._dumps(value), pexpire=self._milliseconds(ttl)
+            )
+        await pipeline.execute()
+
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        keys = [self._key(key) for key in keys]
+        if keys:
+            redis = await self._redis()
+            await redis.delete(*keys)
+
+    async def tag(self, key: str, tags: Iterable[str]) -> None:
+        """
+        Add a key to the Redis set of each tag, in a single script. Each set expires
+        with the longest lived of its keys, unless ``invalidate_tag`` removes it
+        first. Keys that do not exist are not tagged.
+        """
+        tag_keys = [self._tag_key(tag) for tag in tags]
+        if not tag_keys:
+            return
+        redis = await self._redis()
+        await redis.eval(_TAG_SCRIPT, keys=[self._key(key), *tag_keys])
+
+    async def invalidate_tag(self, tag: str) -> List[str]:
+        redis = await self._redis()
+        # Read and drop the set atomically, so keys tagged meanwhile start a new set.
+        transaction = redis.multi_exec()
+        transaction.smembers(self._tag_key(tag))
+        transaction.delete(self._tag_key(tag))
+        members, _ = await transaction.execute()
+        if not members:
+            return []
+        await redis.delete(*members)
+        prefix = len(self.key_prefix)
+        return [
+            (member.decode() if isinstance(member, bytes) else member)[prefix:]
+            for member in members
+        ]
@@ -0,0 +1,181 @@
+import json
+import pickle
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Tuple, Type, Union
+
+Payload = Union[bytes, memoryview]
+
+# The first byte of the payloads of an ``EncodedValue``. Pickles since protocol 2
+# start with the PROTO opcode, 0x80, and JSON documents with a printable character.
+_ENCODED = 0x01
+_encoded_types: Dict[int, Type["EncodedValue"]] = {}
+
+
+class EncodedValue:
+    """
+    A value with a compact bytes encoding of its own, e.g. the responses cached by
+    the middlewares: a small header followed by their raw body. The serializers
+    store the encoding as it is instead of pickling the value, so reading it back
+    costs little more than copying the body.
+
+    Subclasses set an ``encoding_tag`` byte of their own, which the payloads start
+    with after the ``_ENCODED`` marker.
+    """
+
+    __slots__ = ()
+    encoding_tag = 0
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        _encoded_types[cls.encoding_tag] = cls
+
+    def encode(self) -> Optional[Tuple[bytes, Payload]]:
+        """
+        :return: The header and the body of the encoding, or None if the value
+        cannot be encoded and has to be pickled instead.
+        """
+        raise NotImplementedError("Subclasses of EncodedValue need to implement encode")
+
+    @classmethod
+    def decode(cls, data: memoryview) -> "EncodedValue":
+        """
+        :param data: The header followed by the body, as returned by ``encode``.
+        """
+        raise NotImplementedError("Subclasses of EncodedValue need to implement decode")
+
+
+def _encode(value: Any) -> Optional[bytes]:
+    if not isinstance(value, EncodedValue):
+        return None
+    encoded = value.encode()
+    if encoded is None:
+        return None
+    header, body = encoded
+    return b"".join((bytes((_ENCODED, value.encoding_tag)), header, body))
+
+
+def _decode(data: Payload) -> Any:
+    with memoryview(data) as view:
+        encoded_type = _encoded_types.get(view[1])
+        if encoded_type is None:
+            raise ValueError(f"Unknown encoded value type {view[1]}.")
+        return encoded_type.decode(view[2:])
+
+
+class BaseSerializer(ABC):  # pragma: no cover
+    """
+    Turns cached values into the payloads stored by the in-memory backends, and
+    back.
+    """
+
+    @abstractmethod
+    def dumps(self, value: Any) -> Payload:
+        raise NotImplementedError(
+            "Subclasses of BaseSerializer need to implement dumps"
+        )
+
+    @abstractmethod
+    def loads(self, data: Payload) -> Any:
+        raise NotImplementedError(
+            "Subclasses of BaseSerializer need to implement loads"
+        )
+
+
+class PickleSerializer(BaseSerializer):
+    """
+    Serializes any picklable value. This is the default.
+    """
+
+    def __init__(self, protocol: int = pickle.HIGHEST_PROTOCOL):
+        self.protocol = protocol
+
+    def dumps(self, value: Any) -> Payload:
+        encoded = _encode(value)
+        if encoded is not None:
+            return encoded
+        return pickle.dumps(value, self.protocol)
+
+    def loads(self, data: Payload) -> Any:
+        if data[0] == _ENCODED:
+            return _decode(data)
+        return pickle.loads(data)
+
+
+class JSONSerializer(BaseSerializer):
+    """
+    Serializes strings, numbers and dicts and lists of them as compact JSON, which
+    is smaller and faster to load than pickle. Values that would not come back
+    unchanged from JSON, e.g. tuples or dicts with non-string keys, are pickled.
+    """
+
+    def __init__(self, protocol: int = pickle.HIGHEST_PROTOCOL):
+        self.protocol = protocol
+        self.__encoder = json.JSONEncoder(
+            ensure_ascii=False, separators=(",", ":"), check_circular=False
+        )
+
+    def dumps(self, value: Any) -> Payload:
+        if _is_exact_json(value):
+            return self.__encoder.encode(value).encode("utf-8")
+        encoded = _encode(value)
+        if encoded is not None:
+            return encoded
+        return pickle.dumps(value, self.protocol)
+
+    def loads(self, data: Payload) -> Any:
+        # Pickles since protocol 2 start with the PROTO opcode, which is never the
+        # first byte of a JSON document.
+        if data[0] == 0x80:
+            return pickle.loads(data)
+        if data[0] == _ENCODED:
+            return _decode(data)
+        return json.loads(bytes(data) if isinstance(data, memoryview) else data)
+
+
+class PassThroughSerializer(BaseSerializer):
+    """
+    Stores ``bytes`` and ``memoryview`` values as they are, without serializing or
+    copying them, and hands other values to ``fallback``, which stores the responses
+    cached by the middlewares in their own encoding, see ``EncodedValue``.
+
+    Only the in-memory backends can store the raw payloads, since they are told
+    apart from serialized ones by being a ``memoryview``. Bytes-like values are read
+    back as ``bytes`` when they were stored as a whole ``bytes`` object, and as a
+    read-only ``memoryview`` otherwise.
+    """
+
+    def __init__(self, fallback: Optional[BaseSerializer] = None):
+        self.fallback = fallback or PickleSerializer()
+
+    def dumps(self, value: Any) -> Payload:
+        if isinstance(value, bytes):
+            return memoryview(value)
+        if isinstance(value, memoryview) and value.readonly and value.c_contiguous:
+            return value.cast("B")
+        if isinstance(value, (bytearray, memoryview)):
+            # Writable or scattered buffers are copied, so later changes to them do
+            # not leak into the cache.
+            return memoryview(bytes(value))
+        payload = self.fallback.dumps(value)
+        return bytes(payload) if isinstance(payload, memoryview) else payload
+
+    def loads(self, data: Payload) -> Any:
+        if isinstance(data, memoryview):
+            obj = data.obj
+            if type(obj) is bytes and data.nbytes == len(obj):
+                return obj
+            return data
+        return self.fallback.loads(data)
+
+
+def _is_exact_json(value: Any) -> bool:
+    value_type = type(value)
+    if value_type in (str, int, float, bool) or value is None:
+        return True
+    if value_type is list:
+        return all(_is_exact_json(item) for item in value)
+    if value_type is dict:
+        return all(
+            type(key) is str and _is_exact_json(item) for key, item in value.items()
+        )
+    return False
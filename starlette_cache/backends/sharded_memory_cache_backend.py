@@ -0,0 +1,247 @@
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from starlette_cache.backends import snapshot
+from starlette_cache.backends.admission import BaseAdmissionPolicy
+from starlette_cache.backends.base_cache_backend import BaseCacheBackend
+from starlette_cache.backends.memory_cache_backend import MemoryCacheBackend
+from starlette_cache.backends.serializers import BaseSerializer
+
+_sweepers = {}
+_snapshotters = {}
+
+logger = logging.getLogger(__name__)
+
+
+class ShardedMemoryCacheBackend(BaseCacheBackend[str, Any]):
+    """
+    An in-memory cache backend that spreads keys across independently locked
+    shards, so threads working on different keys rarely contend for a lock.
+
+    Each shard is a ``MemoryCacheBackend`` with its own LRU order, expiry index and
+    lock. Limits are split evenly across the shards.
+    """
+
+    DEFAULT_TTL = 300
+
+    def __init__(
+        self,
+        name: str,
+        shards: int = 16,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        serializer: Optional[BaseSerializer] = None,
+        admission: Optional[Callable[[], BaseAdmissionPolicy]] = None,
+    ):
+        """
+        Create a sharded in-memory cache backend.
+        :param name: The name of the cache. Backends with the same name and number of
+        shards share entries.
+        :param shards: The number of independently locked shards.
+        :param max_entries: The maximum number of entries to keep across all shards.
+        :param max_bytes: The maximum total size of the serialized entries to keep
+        across all shards.
+        :param serializer: How values are serialized. Defaults to pickle.
+        :param admission: Creates the admission policy of each shard, e.g.
+        ``functools.partial(TinyLFU, max_entries // shards)``. Shards are locked
+        independently, so they cannot share a policy.
+        """
+        if shards < 1:
+            raise ValueError("A sharded cache needs at least one shard.")
+        self.__name = name
+        self.__shards: List[MemoryCacheBackend] = [
+            MemoryCacheBackend(
+                f"{name}:shard-{index}",
+                max_entries=self.__split(max_entries, shards),
+                max_bytes=self.__split(max_bytes, shards),
+                serializer=serializer,
+                admission=None if admission is None else admission(),
+            )
+            for index in range(shards)
+        ]
+
+    @staticmethod
+    def __split(limit: Optional[int], shards: int) -> Optional[int]:
+        if limit is None:
+            return None
+        return max(1, -(-limit // shards))
+
+    def _shard(self, key: str) -> MemoryCacheBackend:
+        # Keys from utils.get_cache_key are hex digests, so their leading digits are
+        # already uniformly distributed.
+        try:
+            index = int(key[:8], 16)
+        except ValueError:
+            index = hash(key)
+        return self.__shards[index % len(self.__shards)]
+
+    def get(self, key: str, default: Any = None) -> Optional[Any]:
+        return self._shard(key).get(key, default)
+
+    def set(self, key: str, value: Any, ttl: int = DEFAULT_TTL) -> None:
+        self._shard(key).set(key, value, ttl)
+
+    def get_soft(
+        self, key: str, default: Any = None
+    ) -> Tuple[Optional[Any], Optional[float]]:
+        return self._shard(key).get_soft(key, default)
+
+    def get_with_ttl(
+        self, key: str, default: Any = None
+    ) -> Tuple[Optional[Any], Optional[float]]:
+        return self._shard(key).get_with_ttl(key, default)
+
+    def set_soft(self, key: str, value: Any, soft_ttl: int, hard_ttl: int) -> None:
+        self._shard(key).set_soft(key, value, soft_ttl, hard_ttl)
+
+    def add(self, key: str, value: Any, ttl: int = DEFAULT_TTL) -> bool:
+        return self._shard(key).add(key, value, ttl)
+
+    def delete(self, key: str) -> None:
+        self._shard(key).delete(key)
+
+    def _group(self, keys: Iterable[str]) -> Dict[MemoryCacheBackend, List[str]]:
+        groups: Dict[MemoryCacheBackend, List[str]] = {}
+        for key in keys:
+            groups.setdefault(self._shard(key), []).append(key)
+        return groups
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        values = {}
+        for shard, group in self._group(keys).items():
+            values.update(shard.get_many(group))
+        return values
+
+    def set_many(self, values: Mapping[str, Any], ttl: int = DEFAULT_TTL) -> None:
+        for shard, group in self._group(values).items():
+            shard.set_many({key: values[key] for key in group}, ttl)
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        for shard, group in self._group(keys).items():
+            shard.delete_many(group)
+
+    def tag(self, key: str, tags: Iterable[str]) -> None:
+        self._shard(key).tag(key, tags)
+
+    def invalidate_tag(self, tag: str) -> List[str]:
+        keys = []
+        for shard in self.__shards:
+            keys.extend(shard.invalidate_tag(tag))
+        return keys
+
+    def stats(self) -> Dict[str, int]:
+        totals: Dict[str, int] = {}
+        for shard in self.__shards:
+            for stat, value in shard.stats().items():
+                totals[stat] = totals.get(stat, 0) + value
+        return totals
+
+    def dump(self, path: str) -> int:
+        """
+        Write the entries of every shard that have not expired, with their remaining
+        time to live, to one snapshot file. See ``MemoryCacheBackend.dump``.
+        :return: The number of entries written.
+        """
+        now = time.time()
+        records = itertools.chain.from_iterable(
+            shard._snapshot(now) for shard in self.__shards
+        )
+        return snapshot.write(path, records, now)
+
+    def load(self, path: str, batch_size: int = 1000) -> int:
+        """
+        Load the entries of a snapshot that have not expired since into their
+        shards. The snapshot may come from a backend with another number of shards,
+        or from a ``MemoryCacheBackend``. See ``MemoryCacheBackend.load``.
+        :return: The number of entries loaded.
+        """
+        loaded = 0
+        for batch in snapshot.read_batches(path, time.time(), batch_size):
+            shards: Dict[MemoryCacheBackend, List[snapshot.Record]] = {}
+            for record in batch:
+                shards.setdefault(self._shard(record[0]), []).append(record)
+            for shard, records in shards.items():
+                loaded += shard._restore(records)
+        return loaded
+
+    def start_snapshots(self, path: str, interval: float = 60.0) -> None:
+        """
+        Start a daemon thread that dumps every shard to ``path`` periodically.
+        :param path: The snapshot file.
+        :param interval: The number of seconds to wait between snapshots.
+        """
+        if self.__name in _snapshotters:
+            return
+        stop = threading.Event()
+        thread = threading.Thread(
+            target=self.__dump_forever,
+            args=(stop, path, interval),
+            name=f"starlette-cache-snapshots-{self.__name}",
+            daemon=True,
+        )
+        _snapshotters[self.__name] = (thread, stop, path)
+        thread.start()
+
+    def stop_snapshots(self) -> None:
+        """
+        Stop the thread started by ``start_snapshots``, and dump the cache one last
+        time.
+        """
+        snapshotter = _snapshotters.pop(self.__name, None)
+        if snapshotter is not None:
+            thread, stop, path = snapshotter
+            stop.set()
+            thread.join()
+            self.dump(path)
+
+    def __dump_forever(self, stop: threading.Event, path: str, interval: float) -> None:
+        while not stop.wait(interval):
+            try:
+                self.dump(path)
+            except OSError:
+                logger.exception("Failed to write the cache snapshot %s", path)
+
+    def sweep(self, limit: int = 1000) -> int:
+        """
+        Remove up to ``limit`` expired entries from each shard.
+        :param limit: The maximum number of expiry index entries to process per shard.
+        :return: The number of index entries processed.
+        """
+        return sum(shard.sweep(limit) for shard in self.__shards)
+
+    def start_sweeper(self, interval: float = 1.0, batch_size: int = 1000) -> None:
+        """
+        Start a single daemon thread that sweeps expired entries from every shard.
+        :param interval: The number of seconds to wait between sweeps.
+        :param batch_size: The maximum number of entries to sweep per lock
+        acquisition.
+        """
+        if self.__name in _sweepers:
+            return
+        stop = threading.Event()
+        thread = threading.Thread(
+            target=self.__sweep_forever,
+            args=(stop, interval, batch_size),
+            name=f"starlette-cache-sweeper-{self.__name}",
+            daemon=True,
+        )
+        _sweepers[self.__name] = (thread, stop)
+        thread.start()
+
+    def stop_sweeper(self) -> None:
+        sweeper = _sweepers.pop(self.__name, None)
+        if sweeper is not None:
+            thread, stop = sweeper
+            stop.set()
+            thread.join()
+
+    def __sweep_forever(
+        self, stop: threading.Event, interval: float, batch_size: int
+    ) -> None:
+        while not stop.wait(interval):
+            for shard in self.__shards:
+                while shard.sweep(batch_size) == batch_size and not stop.is_set():
+                    time.sleep(0)
@@ -0,0 +1,178 @@
+import contextlib
+import os
+import pickle
+import tempfile
+import time
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+
+from starlette_cache.backends.base_cache_backend import BaseCacheBackend
+from starlette_cache.backends.serializers import (
+    BaseSerializer,
+    Payload,
+    PickleSerializer,
+)
+from starlette_cache.backends.shared_memory_table import SharedMemoryTable, Slot
+
+# Set on payloads the serializer passed through unserialized, see
+# ``PassThroughSerializer``.
+RAW = 1
+
+
+def default_path(name: str) -> str:
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, f"starlette-cache-{name}")
+
+
+class SharedMemoryCacheBackend(BaseCacheBackend[str, Any]):
+    """
+    A cache backend shared by every process on the host, e.g. the workers of a
+    uvicorn or gunicorn server, through a fixed-size hash table in a memory-mapped
+    file. Entries are computed and stored once per host instead of once per worker.
+
+    Each entry takes one slot of ``slot_size`` bytes, values that do not fit in a
+    slot together with their key are not cached. See ``SharedMemoryTable`` for how
+    entries are placed and evicted.
+    """
+
+    DEFAULT_TTL = 300
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(
+        self,
+        name: str,
+        slots: int = 4096,
+        slot_size: int = 16384,
+        path: Optional[str] = None,
+        serializer: Optional[BaseSerializer] = None,
+    ):
+        """
+        Create a shared-memory cache backend.
+        :param name: The name of the cache. Backends with the same name share entries,
+        across processes too.
+        :param slots: The number of entries the cache holds.
+        :param slot_size: The size in bytes of a slot, which bounds the size of the
+        serialized entries.
+        :param path: The file the table is mapped from. Defaults to a file named after
+        the cache in ``/dev/shm``, or the temporary directory if there is none.
+        :param serializer: How values are serialized. Defaults to pickle.
+        """
+        self.path = path or default_path(name)
+        self.__table = SharedMemoryTable.open(self.path, slots, slot_size)
+        self.__closed = False
+        self.serializer = serializer or PickleSerializer(self.pickle_protocol)
+
+    def get(self, key: str, default: Any = None) -> Optional[Any]:
+        now = time.time()
+        return self._fresh(self._read(key, now), now, default)
+
+    def get_soft(
+        self, key: str, default: Any = None
+    ) -> Tuple[Optional[Any], Optional[float]]:
+        now = time.time()
+        return self._with_staleness(self._read(key, now), now, default)
+
+    def get_with_ttl(
+        self, key: str, default: Any = None
+    ) -> Tuple[Optional[Any], Optional[float]]:
+        now = time.time()
+        return self._with_ttl(self._read(key, now), now, default)
+
+    def _read(self, key: str, now: float) -> Optional[Slot]:
+        return self.__table.get(key.encode("utf-8"), now)
+
+    def _try_read(self, key: str, now: float) -> Union[Slot, None, bool]:
+        """
+        Read a key without waiting for writers, see ``SharedMemoryTable.try_get``.
+        """
+        return self.__table.try_get(key.encode("utf-8"), now)
+
+    # The following turn what was read from the table into what the backends return,
+    # so the async backend can read the table its own way.
+
+    def _fresh(self, found: Optional[Slot], now: float, default: Any) -> Any:
+        if found is None:
+            return default
+        data, flags, _, soft_expiration = found
+        if soft_expiration is not None and soft_expiration <= now:
+            return default
+        return self.__loads(data, flags)
+
+    def _with_staleness(
+        self, found: Optional[Slot], now: float, default: Any
+    ) -> Tuple[Optional[Any], Optional[float]]:
+        if found is None:
+            return default, None
+        data, flags, _, soft_expiration = found
+        if soft_expiration is not None and soft_expiration <= now:
+            return self.__loads(data, flags), now - soft_expiration
+        return self.__loads(data, flags), None
+
+    def _with_ttl(
+        self, found: Optional[Slot], now: float, default: Any
+    ) -> Tuple[Optional[Any], Optional[float]]:
+        if found is None:
+            return default, None
+        data, flags, expiration, soft_expiration = found
+        expiration = expiration if soft_expiration is None else soft_expiration
+        if expiration <= now:
+            return default, None
+        return self.__loads(data, flags), expiration - now
+
+    @contextlib.contextmanager
+    def view(self, key: str) -> Iterator[Optional[memoryview]]:
+        """
+        A read-only view of the serialized value of a key in the shared memory, e.g.
+        a body stored through ``PassThroughSerializer``, which can be sent without
+        copying it. Writers are not held off while the view is open: if the entry is
+        written to meanwhile, what was read from the view may be torn, and closing
+        the view raises a ``RuntimeError``. Keep it short, and do not use the view
+        once it is closed.
+
+        Usage: ``with backend.view(key) as body: ...``
+        """
+        with self.__table.view(key.encode("utf-8"), time.time()) as found:
+            yield None if found is None else found[0]
+
+    def __loads(self, data: bytes, flags: int) -> Any:
+        return self.serializer.loads(memoryview(data) if flags & RAW else data)
+
+    def __dumps(self, value: Any) -> Tuple[Payload, int]:
+        data = self.serializer.dumps(value)
+        return data, RAW if isinstance(data, memoryview) else 0
+
+    def set(self, key: str, value: Any, ttl: int = DEFAULT_TTL) -> None:
+        data, flags = self.__dumps(value)
+        now = time.time()
+        self.__table.set(key.encode("utf-8"), data, flags, now + ttl, None, now)
+
+    def set_soft(self, key: str, value: Any, soft_ttl: int, hard_ttl: int) -> None:
+        data, flags = self.__dumps(value)
+        now = time.time()
+        self.__table.set(
+            key.encode("utf-8"), data, flags, now + hard_ttl, now + soft_ttl, now
+        )
+
+    def add(self, key: str, value: Any, ttl: int = DEFAULT_TTL) -> bool:
+        data, flags = self.__dumps(value)
+        now = time.time()
+        return self.__table.set(
+            key.encode("utf-8"), data, flags, now + ttl, None, now, only_if_missing=True
+        )
+
+    def delete(self, key: str) -> None:
+        self.__table.delete(key.encode("utf-8"))
+
+    def clear(self) -> None:
+        self.__table.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return self.__table.stats(time.time())
+
+    def close(self) -> None:
+        """
+        Unmap the table, once every backend of this process using it is closed. The
+        entries are kept in the file for the other processes.
+        """
+        if not self.__closed:
+            self.__closed = True
+            self.__table.close()
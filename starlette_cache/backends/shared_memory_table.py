@@ -0,0 +1,423 @@
+import contextlib
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+_tables: Dict[str, "SharedMemoryTable"] = {}
+_tables_lock = threading.Lock()
+
+# magic, version, slots, slot size, evictions
+_table_header = struct.Struct("<8sIIQQ")
+# sequence, key hash, expiration, soft expiration, key length, value length, flags
+_slot_header = struct.Struct("<QQddIIB7x")
+_sequence = struct.Struct("<Q")
+_MAGIC = b"SCSHMTBL"
+_VERSION = 1
+_HEADER_SIZE = 64
+# Readers that keep seeing a slot being written fall back to taking the lock.
+_OPTIMISTIC_READS = 16
+
+Slot = Tuple[bytes, int, float, Optional[float]]
+
+
+class SharedMemoryTable:
+    """
+    A fixed-size hash table in a memory-mapped file, shared by every process on the
+    host that opens the same path.
+
+    The file holds ``slots`` slots of ``slot_size`` bytes, each holding one key and
+    its payload with their own expiration. A key lives in one of the ``probes``
+    slots following its hash. When those are all taken by live entries, the one
+    closest to expiring is evicted.
+
+    Writers hold an exclusive ``flock`` on the file, plus a thread lock within the
+    process. Readers do not lock: every slot has a sequence number that is odd while
+    it is being written, and a read is retried if it changed while the slot was
+    copied. Views into the file, which are not copied, do not hold writers off
+    either: the sequence number is checked again when they are closed.
+    """
+
+    def __init__(self, path: str, slots: int, slot_size: int, probes: int = 8):
+        if slot_size <= _slot_header.size:
+            raise ValueError(f"slot_size must be larger than {_slot_header.size}")
+        self.path = path
+        self.slots = slots
+        self.slot_size = slot_size
+        self.capacity = slot_size - _slot_header.size
+        self.probes = min(probes, slots)
+        self.users = 1
+        self.__size = _HEADER_SIZE + slots * slot_size
+        self.__open()
+
+    @classmethod
+    def open(cls, path: str, slots: int, slot_size: int) -> "SharedMemoryTable":
+        """
+        Get the table for a path, so the backends of one process share a mapping.
+        Every call needs a matching ``close``.
+        """
+        with _tables_lock:
+            table = _tables.get(path)
+            if table is None:
+                table = _tables[path] = cls(path, slots, slot_size)
+                return table
+            if (table.slots, table.slot_size) != (slots, slot_size):
+                raise ValueError(
+                    f"{path} is already open with {table.slots} slots of "
+                    f"{table.slot_size} bytes"
+                )
+            table.users += 1
+            return table
+
+    def __open(self) -> None:
+        self.__pid = os.getpid()
+        self.__fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        self.__thread_lock = threading.Lock()
+        self.__readers = 0
+        self.__readers_changed = threading.Condition(self.__thread_lock)
+        fcntl.flock(self.__fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self.__fd).st_size == 0:
+                os.ftruncate(self.__fd, self.__size)
+                header = _table_header.pack(
+                    _MAGIC, _VERSION, self.slots, self.slot_size, 0
+                )
+                os.pwrite(self.__fd, header, 0)
+            magic, version, slots, slot_size, _ = _table_header.unpack(
+                os.pread(self.__fd, _table_header.size, 0)
+            )
+            if (magic, version, slots, slot_size) != (
+                _MAGIC,
+                _VERSION,
+                self.slots,
+                self.slot_size,
+            ):
+                raise ValueError(
+                    f"{self.path} holds a table with {slots} slots of {slot_size} "
+                    f"bytes, not {self.slots} of {self.slot_size}"
+                )
+        except BaseException:
+            os.close(self.__fd)
+            raise
+        finally:
+            with contextlib.suppress(OSError):
+                fcntl.flock(self.__fd, fcntl.LOCK_UN)
+        self.__map = mmap.mmap(self.__fd, self.__size)
+        # Views are handed out from a read-only mapping, so they cannot be written to.
+        self.__read_only_map = mmap.mmap(
+            self.__fd, self.__size, access=mmap.ACCESS_READ
+        )
+
+    def __reopen_after_fork(self) -> None:
+        # A forked child shares its parent's open file description, and with it the
+        # parent's flock, so it needs a descriptor of its own.
+        if os.getpid() != self.__pid:
+            self.__close()
+            self.__open()
+
+    @contextlib.contextmanager
+    def __write_lock(self) -> Iterator[None]:
+        self.__reopen_after_fork()
+        with self.__readers_changed:
+            # Views in this process share the process's flock, so wait for them
+            # before converting it to an exclusive one.
+            self.__readers_changed.wait_for(lambda: self.__readers == 0)
+            fcntl.flock(self.__fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self.__fd, fcntl.LOCK_UN)
+
+    @contextlib.contextmanager
+    def __read_lock(self) -> Iterator[None]:
+        self.__reopen_after_fork()
+        with self.__readers_changed:
+            if self.__readers == 0:
+                fcntl.flock(self.__fd, fcntl.LOCK_SH)
+            self.__readers += 1
+        try:
+            yield
+        finally:
+            with self.__readers_changed:
+                self.__readers -= 1
+                if self.__readers == 0:
+                    fcntl.flock(self.__fd, fcntl.LOCK_UN)
+                    self.__readers_changed.notify_all()
+
+    @staticmethod
+    def hash(key: bytes) -> int:
+        # Zero marks empty slots.
+        return (
+            int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little") | 1
+        )
+
+    def __offset(self, index: int) -> int:
+        return _HEADER_SIZE + index * self.slot_size
+
+    def __window(self, key_hash: int) -> Iterator[int]:
+        start = key_hash % self.slots
+        for probe in range(self.probes):
+            yield self.__offset((start + probe) % self.slots)
+
+    def __find(self, key: bytes, key_hash: int) -> Optional[int]:
+        for offset in self.__window(key_hash):
+            header = _slot_header.unpack_from(self.__map, offset)
+            if header[1] == key_hash and header[4] == len(key):
+                start = offset + _slot_header.size
+                end = start + len(key)
+                if self.__map[start:end] == key:
+                    return offset
+        return None
+
+    def get(self, key: bytes, now: float) -> Optional[Slot]:
+        """
+        Copy the payload of a key out of the table.
+        :return: The payload, its flags, expiration and soft expiration, or None if
+        the key is missing or expired.
+        """
+        found = self.try_get(key, now)
+        if found is not False:
+            return found
+        with self.__read_lock():
+            return self.__read(key, self.hash(key), now)
+
+    def try_get(self, key: bytes, now: float) -> Union[Slot, None, bool]:
+        """
+        Like ``get``, but never wait for a writer.
+        :return: The same as ``get``, or False if the key's slots kept being written
+        to while they were read.
+        """
+        key_hash = self.hash(key)
+        for _ in range(_OPTIMISTIC_READS):
+            found = self.__read(key, key_hash, now)
+            if found is not False:
+                return found
+        return False
+
+    def __read(self, key: bytes, key_hash: int, now: float):
+        for offset in self.__window(key_hash):
+            sequence = _sequence.unpack_from(self.__map, offset)[0]
+            if sequence & 1:
+                return False
+            header = _slot_header.unpack_from(self.__map, offset)
+            (_, slot_hash, expiration, soft, key_length, value_length, flags) = header
+            if slot_hash != key_hash or key_length != len(key):
+                continue
+            start = offset + _slot_header.size
+            middle = start + key_length
+            end = middle + value_length
+            stored_key, data = self.__map[start:middle], self.__map[middle:end]
+            if _sequence.unpack_from(self.__map, offset)[0] != sequence:
+                return False
+            if stored_key != key:
+                continue
+            if expiration <= now:
+                return None
+            return data, flags, expiration, soft or None
+        return None
+
+    @contextlib.contextmanager
+    def view(
+        self, key: bytes, now: float
+    ) -> Iterator[Optional[Tuple[memoryview, int]]]:
+        """
+        A read-only view of the payload of a key in the shared memory, without
+        copying it. Writers do not wait for the view, so the payload may be written
+        to while it is open, in which case closing the view raises a
+        ``RuntimeError``. If the slot keeps being written to, the view is of a copy.
+        :return: The view and the flags of the payload, or None if the key is
+        missing or expired.
+        """
+        self.__reopen_after_fork()
+        key_hash = self.hash(key)
+        for _ in range(_OPTIMISTIC_READS):
+            found = self.__locate(key, key_hash, now)
+            if found is not False:
+                break
+        else:
+            copied = self.get(key, now)
+            if copied is None:
+                yield None
+                return
+            with memoryview(copied[0]) as data:
+                yield data, copied[1]
+            return
+        if found is None:
+            yield None
+            return
+        offset, sequence, start, end, flags = found
+        with memoryview(self.__read_only_map) as mapping:
+            with mapping[start:end] as data:
+                yield data, flags
+        if _sequence.unpack_from(self.__map, offset)[0] != sequence:
+            raise RuntimeError(
+                f"The entry of {key!r} was written to while it was viewed."
+            )
+
+    def __locate(
+        self, key: bytes, key_hash: int, now: float
+    ) -> Union[Tuple[int, int, int, int, int], None, bool]:
+        """
+        Find the payload of a key the way ``__read`` does, without copying it.
+        :return: The offset and sequence number of its slot, the start and end of the
+        payload and its flags, None if the key is missing or expired, or False if a
+        slot was being written to.
+        """
+        for offset in self.__window(key_hash):
+            sequence = _sequence.unpack_from(self.__map, offset)[0]
+            if sequence & 1:
+                return False
+            header = _slot_header.unpack_from(self.__map, offset)
+            (_, slot_hash, expiration, _, key_length, value_length, flags) = header
+            if slot_hash != key_hash or key_length != len(key):
+                continue
+            start = offset + _slot_header.size
+            middle = start + key_length
+            matches = self.__map[start:middle] == key
+            if _sequence.unpack_from(self.__map, offset)[0] != sequence:
+                return False
+            if not matches:
+                continue
+            if expiration <= now:
+                return None
+            return offset, sequence, middle, middle + value_length, flags
+        return None
+
+    def set(
+        self,
+        key: bytes,
+        data: bytes,
+        flags: int,
+        expiration: float,
+        soft_expiration: Optional[float],
+        now: float,
+        only_if_missing: bool = False,
+    ) -> bool:
+        """
+        Store a payload, evicting the entry closest to expiring in its probe window
+        if there is no free slot.
+        :param only_if_missing: Only store the payload if the key has no fresh entry.
+        :return: Whether the payload was stored. Payloads too large for a slot are
+        not, and any previous entry of the key is deleted.
+        """
+        key_hash = self.hash(key)
+        if len(key) + len(data) > self.capacity:
+            self.delete(key)
+            return False
+        with self.__write_lock():
+            offset = self.__find(key, key_hash)
+            if offset is not None and only_if_missing:
+                _, _, expiration_at, soft, _, _, _ = _slot_header.unpack_from(
+                    self.__map, offset
+                )
+                if now < (soft or expiration_at):
+                    return False
+            if offset is None:
+                offset = self.__free_slot(key_hash, now)
+            self.__write(
+                offset, key_hash, key, data, flags, expiration, soft_expiration or 0.0
+            )
+            return True
+
+    def __free_slot(self, key_hash: int, now: float) -> int:
+        victim, victim_expiration = None, None
+        for offset in self.__window(key_hash):
+            _, slot_hash, expiration, _, _, _, _ = _slot_header.unpack_from(
+                self.__map, offset
+            )
+            if slot_hash == 0 or expiration <= now:
+                return offset
+            if victim is None or expiration < victim_expiration:
+                victim, victim_expiration = offset, expiration
+        magic, version, slots, slot_size, evictions = _table_header.unpack_from(
+            self.__map, 0
+        )
+        _table_header.pack_into(
+            self.__map, 0, magic, version, slots, slot_size, evictions + 1
+        )
+        return victim
+
+    def __write(
+        self,
+        offset: int,
+        key_hash: int,
+        key: bytes,
+        data: bytes,
+        flags: int,
+        expiration: float,
+        soft_expiration: float,
+    ) -> None:
+        sequence = _sequence.unpack_from(self.__map, offset)[0]
+        _sequence.pack_into(self.__map, offset, sequence + 1)
+        start = offset + _slot_header.size
+        middle = start + len(key)
+        end = middle + len(data)
+        self.__map[start:middle] = key
+        self.__map[middle:end] = data
+        _slot_header.pack_into(
+            self.__map,
+            offset,
+            sequence + 1,
+            key_hash,
+            expiration,
+            soft_expiration,
+            len(key),
+            len(data),
+            flags,
+        )
+        _sequence.pack_into(self.__map, offset, sequence + 2)
+
+    def delete(self, key: bytes) -> None:
+        with self.__write_lock():
+            offset = self.__find(key, self.hash(key))
+            if offset is not None:
+                self.__write(offset, 0, b"", b"", 0, 0.0, 0.0)
+
+    def clear(self) -> None:
+        with self.__write_lock():
+            for index in range(self.slots):
+                offset = self.__offset(index)
+                if _slot_header.unpack_from(self.__map, offset)[1]:
+                    self.__write(offset, 0, b"", b"", 0, 0.0, 0.0)
+
+    def stats(self, now: float) -> Dict[str, int]:
+        entries, size = 0, 0
+        for index in range(self.slots):
+            (
+                _,
+                slot_hash,
+                expiration,
+                _,
+                key_length,
+                value_length,
+                _,
+            ) = _slot_header.unpack_from(self.__map, self.__offset(index))
+            if slot_hash and expiration > now:
+                entries += 1
+                size += value_length
+        return {
+            "entries": entries,
+            "bytes": size,
+            "evictions": _table_header.unpack_from(self.__map, 0)[4],
+            "slots": self.slots,
+        }
+
+    def close(self) -> None:
+        """
+        Unmap the table once every user opened through ``open`` closed it.
+        """
+        with _tables_lock:
+            self.users -= 1
+            if self.users > 0:
+                return
+            if _tables.get(self.path) is self:
+                del _tables[self.path]
+        self.__close()
+
+    def __close(self) -> None:
+        self.__read_only_map.close()
+        self.__map.close()
+        os.close(self.__fd)
@@ -0,0 +1,124 @@
+import math
+import os
+import struct
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple
+
+from starlette_cache.backends.serializers import Payload
+
+# magic, version, time of the snapshot
+_header = struct.Struct("<8sId")
+# flags, key length, value length, time to live, soft time to live, tag count
+_record = struct.Struct("<BIIddH")
+_tag_length = struct.Struct("<H")
+_MAGIC = b"SCSNAP\x00\x00"
+_VERSION = 1
+# Set on values the serializer passed through as a ``memoryview``.
+_RAW = 1
+
+Record = Tuple[str, Payload, float, Optional[float], List[str]]
+
+
+def write(path: str, records: Iterable[Record], now: float) -> int:
+    """
+    Write a snapshot of cache entries: a header followed by one record per entry.
+    Any previous snapshot is replaced at once, so a crash never leaves a partial
+    snapshot behind.
+    :param path: The file to write.
+    :param records: The key, serialized value, remaining time to live, remaining soft
+    time to live and tags of each entry.
+    :param now: The time the remaining times to live were taken at.
+    :return: The number of entries written.
+    """
+    temporary = f"{path}.{os.getpid()}.tmp"
+    written = 0
+    try:
+        with open(temporary, "wb") as f:
+            f.write(_header.pack(_MAGIC, _VERSION, now))
+            for key, data, ttl, soft_ttl, tags in records:
+                _write_record(f, key, data, ttl, soft_ttl, tags)
+                written += 1
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+    return written
+
+
+def _write_record(
+    f: BinaryIO,
+    key: str,
+    data: Payload,
+    ttl: float,
+    soft_ttl: Optional[float],
+    tags: List[str],
+) -> None:
+    encoded_key = key.encode("utf-8")
+    flags = _RAW if isinstance(data, memoryview) else 0
+    soft_ttl = math.nan if soft_ttl is None else soft_ttl
+    f.write(_record.pack(flags, len(encoded_key), len(data), ttl, soft_ttl, len(tags)))
+    f.write(encoded_key)
+    f.write(data)
+    for tag in tags:
+        encoded_tag = tag.encode("utf-8")
+        f.write(_tag_length.pack(len(encoded_tag)))
+        f.write(encoded_tag)
+
+
+def read(path: str, now: float) -> Iterator[Record]:
+    """
+    Stream the entries of a snapshot that are still alive, with their remaining
+    times to live as of ``now``. A missing snapshot has no entries.
+    :raises ValueError: If the file is not a snapshot.
+    """
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return
+    with f:
+        header = f.read(_header.size)
+        if len(header) < _header.size:
+            raise ValueError(f"{path} is not a cache snapshot")
+        magic, version, taken_at = _header.unpack(header)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{path} is not a cache snapshot")
+        elapsed = max(0.0, now - taken_at)
+        while True:
+            header = f.read(_record.size)
+            if len(header) < _record.size:
+                return
+            flags, key_length, value_length, ttl, soft_ttl, tag_count = _record.unpack(
+                header
+            )
+            key = f.read(key_length).decode("utf-8")
+            data = f.read(value_length)
+            tags = [
+                f.read(_tag_length.unpack(f.read(_tag_length.size))[0]).decode("utf-8")
+                for _ in range(tag_count)
+            ]
+            ttl -= elapsed
+            if ttl <= 0:
+                continue
+            yield (
+                key,
+                memoryview(data) if flags & _RAW else data,
+                ttl,
+                None if math.isnan(soft_ttl) else soft_ttl - elapsed,
+                tags,
+            )
+
+
+def read_batches(path: str, now: float, batch_size: int) -> Iterator[List[Record]]:
+    """
+    Stream the live entries of a snapshot in batches of up to ``batch_size``.
+    """
+    batch: List[Record] = []
+    for record in read(path, now):
+        batch.append(record)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,139 @@
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from starlette_cache.backends.base_cache_backend import BaseCacheBackend
+from starlette_cache.backends.memory_cache_backend import MemoryCacheBackend
+
+_missing = object()
+
+
+class TwoTierCacheBackend(BaseCacheBackend[str, Any]):
+    """
+    A cache backend that keeps recently used entries of a shared (L2) backend in a
+    small in-process (L1) cache, so most hits never leave the process.
+
+    Entries are kept in L1 for at most ``l1_ttl`` seconds and never longer than
+    they stay fresh in L2, which bounds how long a process can serve an entry
+    changed by another one.
+    """
+
+    DEFAULT_TTL = 300
+
+    def __init__(
+        self,
+        name: str,
+        l2: BaseCacheBackend,
+        l1_ttl: float = 5,
+        max_entries: Optional[int] = 1024,
+        max_bytes: Optional[int] = None,
+        on_delete: Optional[Callable[[str], None]] = None,
+    ):
+        """
+        Create a two-tier cache backend.
+        :param name: The name of the in-process cache. Backends with the same name
+        share L1 entries.
+        :param l2: The shared cache backend.
+        :param l1_ttl: The maximum number of seconds an entry is kept in L1.
+        :param max_entries: The maximum number of entries to keep in L1.
+        :param max_bytes: The maximum total size of the pickled entries to keep in L1.
+        :param on_delete: Called with the key after a key is deleted, e.g. to publish
+        it to the other processes so they can ``invalidate`` their L1 entry.
+        """
+        self.l1 = MemoryCacheBackend(
+            f"{name}:l1", max_entries=max_entries, max_bytes=max_bytes
+        )
+        self.l2 = l2
+        self.l1_ttl = l1_ttl
+        self.on_delete = on_delete
+
+    def _l1_ttl(self, ttl: Optional[float]) -> float:
+        return self.l1_ttl if ttl is None else min(self.l1_ttl, ttl)
+
+    def get(self, key: str, default: Any = None) -> Optional[Any]:
+        value, _ = self.get_with_ttl(key, default)
+        return value
+
+    def get_with_ttl(
+        self, key: str, default: Any = None
+    ) -> Tuple[Optional[Any], Optional[float]]:
+        value, ttl = self.l1.get_with_ttl(key, _missing)
+        if value is not _missing:
+            return value, ttl
+        value, ttl = self.l2.get_with_ttl(key, _missing)
+        if value is _missing:
+            return default, None
+        self.l1.set(key, value, self._l1_ttl(ttl))
+        return value, ttl
+
+    def get_soft(
+        self, key: str, default: Any = None
+    ) -> Tuple[Optional[Any], Optional[float]]:
+        value = self.l1.get(key, _missing)
+        if value is not _missing:
+            return value, None
+        # Stale entries are not copied to L1, they are about to be replaced.
+        return self.l2.get_soft(key, default)
+
+    def set(self, key: str, value: Any, ttl: int = DEFAULT_TTL) -> None:
+        self.l2.set(key, value, ttl)
+        self.l1.set(key, value, self._l1_ttl(ttl))
+
+    def set_soft(self, key: str, value: Any, soft_ttl: int, hard_ttl: int) -> None:
+        self.l2.set_soft(key, value, soft_ttl, hard_ttl)
+        self.l1.set(key, value, self._l1_ttl(soft_ttl))
+
+    def add(self, key: str, value: Any, ttl: int = DEFAULT_TTL) -> bool:
+        if not self.l2.add(key, value, ttl):
+            return False
+        self.l1.set(key, value, self._l1_ttl(ttl))
+        return True
+
+    def delete(self, key: str) -> None:
+        self.l2.delete(key)
+        self.l1.delete(key)
+        if self.on_delete is not None:
+            self.on_delete(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        keys = list(keys)
+        values = self.l1.get_many(keys)
+        misses = [key for key in keys if key not in values]
+        if misses:
+            # The remaining L2 time to live of these is unknown, so they are not
+            # copied to L1.
+            values.update(self.l2.get_many(misses))
+        return values
+
+    def set_many(self, values: Mapping[str, Any], ttl: int = DEFAULT_TTL) -> None:
+        self.l2.set_many(values, ttl)
+        self.l1.set_many(values, self._l1_ttl(ttl))
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        keys = list(keys)
+        self.l2.delete_many(keys)
+        self.l1.delete_many(keys)
+        if self.on_delete is not None:
+            for key in keys:
+                self.on_delete(key)
+
+    def tag(self, key: str, tags: Iterable[str]) -> None:
+        self.l2.tag(key, tags)
+
+    def invalidate_tag(self, tag: str) -> List[str]:
+        """
+        Delete every entry with the tag from L2, and the same keys from L1.
+        """
+        keys = self.l2.invalidate_tag(tag)
+        self.l1.delete_many(keys)
+        if self.on_delete is not None:
+            for key in keys:
+                self.on_delete(key)
+        return keys
+
+    def invalidate(self, key: str) -> None:
+        """
+        Drop a key from L1 only, e.g. when another process deleted it from L2.
+        """
+        self.l1.delete(key)
+
+    def stats(self) -> Dict[str, int]:
+        return self.l1.stats()
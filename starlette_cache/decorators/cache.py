@@ -1,11 +1,12 @@
 import asyncio
 import inspect
 from functools import wraps
-from typing import Callable, Optional, Any
+from typing import Callable, Iterable, Optional, Any, Union
 
 from starlette.requests import Request
 from starlette.responses import Response
 
+from starlette_cache import metrics
 from starlette_cache.backends.base_async_cache_backend import BaseAsyncCacheBackend
 from starlette_cache.backends.base_cache_backend import BaseCacheBackend
 from starlette_cache.middleware.cache_middleware import CacheMiddleware
@@ -14,6 +15,15 @@ from starlette_cache.middleware.cache_middleware import CacheMiddleware
 def cache_api(
     cache_ttl: int,
     key_function: Optional[Callable] = None,
+    single_flight: bool = True,
+    lock_timeout: Optional[float] = None,
+    stale_while_revalidate: int = 0,
+    stale_if_error: int = 0,
+    private: bool = False,
+    tag_function: Optional[Callable[[Request], Iterable[str]]] = None,
+    hooks: Optional[metrics.CacheHooks] = None,
+    max_stream_size: Optional[int] = 16 * 1024 * 1024,
+    stream_segment_size: int = 64 * 1024,
 ):
     def _decorator(endpoint):
         endpoint_type = None
@@ -36,7 +46,20 @@ def cache_api(
         if endpoint_type == "websocket":
             raise NotImplementedError("Websockets aren't supported yet.")
         elif asyncio.iscoroutinefunction(endpoint):
-            middleware = CacheMiddleware(endpoint, cache_ttl, key_function)
+            middleware = CacheMiddleware(
+                endpoint,
+                cache_ttl,
+                key_function,
+                single_flight=single_flight,
+                lock_timeout=lock_timeout,
+                stale_while_revalidate=stale_while_revalidate,
+                stale_if_error=stale_if_error,
+                private=private,
+                tag_function=tag_function,
+                hooks=hooks,
+                max_stream_size=max_stream_size,
+                stream_segment_size=stream_segment_size,
+            )
 
             @wraps(endpoint)
             async def _wrapped_api(
@@ -53,18 +76,35 @@ def cache_api(
             return _wrapped_api
 
         else:
-            middleware = CacheMiddleware(endpoint, cache_ttl, key_function)
+            middleware = CacheMiddleware(
+                endpoint,
+                cache_ttl,
+                key_function,
+                single_flight=single_flight,
+                lock_timeout=lock_timeout,
+                stale_while_revalidate=stale_while_revalidate,
+                stale_if_error=stale_if_error,
+                private=private,
+                tag_function=tag_function,
+                hooks=hooks,
+                max_stream_size=max_stream_size,
+                stream_segment_size=stream_segment_size,
+            )
 
             @wraps(endpoint)
             def _wrapped_sync_api(
                 request: Request,
                 response: Response,
-                cache_backend: BaseCacheBackend,
+                cache_backend: Union[BaseCacheBackend, BaseAsyncCacheBackend],
                 *args: Any,
                 **kwargs: Any,
             ):
-                return asyncio.run(
-                    middleware(request, response, cache_backend, *args, **kwargs)
+                if isinstance(cache_backend, BaseAsyncCacheBackend):
+                    return asyncio.run(
+                        middleware(request, response, cache_backend, *args, **kwargs)
+                    )
+                return middleware.call_sync(
+                    request, response, cache_backend, *args, **kwargs
                 )
 
             return _wrapped_sync_api
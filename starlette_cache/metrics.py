@@ -0,0 +1,268 @@
+import bisect
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+HIT = "HIT"
+MISS = "MISS"
+STALE = "STALE"
+
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+)
+
+
+class CacheHooks:
+    """
+    The instrumentation interface of the cache middleware. Subclasses override the
+    events they are interested in, the defaults do nothing.
+
+    The middleware skips timing altogether when it is not given any hooks.
+    """
+
+    def on_lookup(self, route: str, backend: str, result: str, seconds: float) -> None:
+        """
+        Called after a cached response was looked up.
+        :param route: The name of the cached endpoint.
+        :param backend: The name of the cache backend.
+        :param result: ``HIT``, ``MISS`` or ``STALE``.
+        :param seconds: How long the lookup took.
+        """
+
+    def on_store(
+        self, route: str, backend: str, size: Optional[int], seconds: float
+    ) -> None:
+        """
+        Called after a response was stored.
+        :param route: The name of the cached endpoint.
+        :param backend: The name of the cache backend.
+        :param size: The size in bytes of the response, if it is bytes or a string.
+        :param seconds: How long storing the response took.
+        """
+
+
+class Histogram:
+    """
+    A latency histogram with fixed bucket bounds, in the shape Prometheus expects.
+    """
+
+    __slots__ = ("bounds", "counts", "count", "sum")
+
+    def __init__(self, bounds: Iterable[float] = DEFAULT_BUCKETS):
+        self.bounds: Tuple[float, ...] = tuple(bounds)
+        self.counts: List[int] = [0] * (len(self.bounds) + 1)
+        self.count: int = 0
+        self.sum: float = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def merge(self, other: "Histogram") -> None:
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.count += other.count
+        self.sum += other.sum
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """
+        :return: The cumulative count of each bucket, labelled by its upper bound.
+        """
+        buckets, total = [], 0
+        for bound, count in zip((*map(repr, self.bounds), "+Inf"), self.counts):
+            total += count
+            buckets.append((bound, total))
+        return buckets
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        :return: The upper bound of the bucket holding the ``q`` quantile, or None if
+        nothing was observed.
+        """
+        if not self.count:
+            return None
+        rank, total = q * self.count, 0
+        for bound, count in zip(self.bounds, self.counts):
+            total += count
+            if total >= rank:
+                return bound
+        return float("inf")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+        }
+
+
+class CacheMetrics(CacheHooks):
+    """
+    Counts lookups by result and records lookup and store latencies per route and
+    cache backend. The entries, bytes, evictions and admission rejections of the
+    backends passed to ``watch`` are read from their ``stats`` when the metrics are,
+    so the backends pay nothing for them.
+
+    Expose the metrics in the Prometheus text format with
+    ``app.add_route("/metrics", metrics.endpoint)``.
+    """
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets: Tuple[float, ...] = tuple(buckets)
+        self.results: Dict[Tuple[str, str, str], int] = {}
+        self.stored_bytes: Dict[Tuple[str, str], int] = {}
+        self.latencies: Dict[Tuple[str, str, str], Histogram] = {}
+        self.backends: Dict[str, Any] = {}
+        self.__lock = threading.Lock()
+
+    def watch(self, name: str, backend: Any) -> None:
+        """
+        Include the ``stats`` of a cache backend in the metrics.
+        :param name: The name to label the backend's metrics with.
+        :param backend: A cache backend with a ``stats`` method.
+        """
+        self.backends[name] = backend
+
+    def on_lookup(self, route: str, backend: str, result: str, seconds: float) -> None:
+        with self.__lock:
+            key = (route, backend, result)
+            self.results[key] = self.results.get(key, 0) + 1
+            self.__histogram(route, backend, "get").observe(seconds)
+
+    def on_store(
+        self, route: str, backend: str, size: Optional[int], seconds: float
+    ) -> None:
+        with self.__lock:
+            if size is not None:
+                key = (route, backend)
+                self.stored_bytes[key] = self.stored_bytes.get(key, 0) + size
+            self.__histogram(route, backend, "set").observe(seconds)
+
+    def __histogram(self, route: str, backend: str, operation: str) -> Histogram:
+        key = (route, backend, operation)
+        histogram = self.latencies.get(key)
+        if histogram is None:
+            histogram = self.latencies[key] = Histogram(self.buckets)
+        return histogram
+
+    def stats(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        :return: The lookup results, stored bytes and latencies, summed per route
+        and per backend, along with the ``stats`` of the watched backends.
+        """
+        stats: Dict[str, Dict[str, Dict[str, Any]]] = {"routes": {}, "backends": {}}
+        with self.__lock:
+            for (route, backend, result), count in self.results.items():
+                for group, name in (("routes", route), ("backends", backend)):
+                    totals = self.__totals(stats[group], name)
+                    totals[result.lower()] += count
+            for (route, backend), size in self.stored_bytes.items():
+                for group, name in (("routes", route), ("backends", backend)):
+                    self.__totals(stats[group], name)["stored_bytes"] += size
+            latencies: Dict[Tuple[str, str, str], Histogram] = {}
+            for (route, backend, operation), histogram in self.latencies.items():
+                for group, name in (("routes", route), ("backends", backend)):
+                    self.__totals(stats[group], name)
+                    merged = latencies.setdefault(
+                        (group, name, operation), Histogram(self.buckets)
+                    )
+                    merged.merge(histogram)
+        for (group, name, operation), histogram in latencies.items():
+            stats[group][name][f"{operation}_seconds"] = histogram.to_dict()
+        for name, backend in self.backends.items():
+            self.__totals(stats["backends"], name).update(backend.stats())
+        return stats
+
+    @staticmethod
+    def __totals(group: Dict[str, Dict[str, Any]], name: str) -> Dict[str, Any]:
+        totals = group.get(name)
+        if totals is None:
+            totals = group[name] = {"hit": 0, "miss": 0, "stale": 0, "stored_bytes": 0}
+        return totals
+
+    def prometheus_text(self) -> str:
+        """
+        :return: The metrics in the Prometheus text exposition format.
+        """
+        lines = [
+            "# HELP starlette_cache_lookups_total Cache lookups by result.",
+            "# TYPE starlette_cache_lookups_total counter",
+        ]
+        with self.__lock:
+            for (route, backend, result), count in sorted(self.results.items()):
+                labels = _labels(route=route, backend=backend, result=result.lower())
+                lines.append(f"starlette_cache_lookups_total{{{labels}}} {count}")
+            lines.append(
+                "# HELP starlette_cache_stored_bytes_total Bytes of responses stored."
+            )
+            lines.append("# TYPE starlette_cache_stored_bytes_total counter")
+            for (route, backend), size in sorted(self.stored_bytes.items()):
+                labels = _labels(route=route, backend=backend)
+                lines.append(f"starlette_cache_stored_bytes_total{{{labels}}} {size}")
+            lines.append(
+                "# HELP starlette_cache_operation_seconds Latency of cache operations."
+            )
+            lines.append("# TYPE starlette_cache_operation_seconds histogram")
+            for (route, backend, operation), histogram in sorted(
+                self.latencies.items()
+            ):
+                labels = _labels(route=route, backend=backend, operation=operation)
+                for bound, count in histogram.cumulative():
+                    lines.append(
+                        "starlette_cache_operation_seconds_bucket"
+                        f'{{{labels},le="{bound}"}} {count}'
+                    )
+                lines.append(
+                    f"starlette_cache_operation_seconds_sum{{{labels}}} {histogram.sum}"
+                )
+                lines.append(
+                    f"starlette_cache_operation_seconds_count{{{labels}}} "
+                    f"{histogram.count}"
+                )
+        backend_stats = {
+            name: backend.stats() for name, backend in self.backends.items()
+        }
+        for stat, kind in (
+            ("entries", "gauge"),
+            ("bytes", "gauge"),
+            ("evictions", "counter"),
+            ("rejections", "counter"),
+        ):
+            metric = f"starlette_cache_backend_{stat}"
+            if kind == "counter":
+                metric += "_total"
+            lines.append(f"# TYPE {metric} {kind}")
+            for name, values in sorted(backend_stats.items()):
+                if stat in values:
+                    lines.append(f"{metric}{{{_labels(backend=name)}}} {values[stat]}")
+        return "\n".join(lines) + "\n"
+
+    async def endpoint(self, request: Request) -> Response:
+        """
+        A Starlette endpoint serving the metrics to Prometheus.
+        """
+        return Response(self.prometheus_text(), media_type="text/plain; version=0.0.4")
+
+
+def _labels(**labels: str) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
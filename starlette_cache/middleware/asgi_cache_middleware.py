@@ -0,0 +1,432 @@
+import gzip
+import time
+import zlib
+from email.utils import formatdate
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from starlette.datastructures import Headers
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from starlette_cache import metrics, utils
+from starlette_cache.backends.base_async_cache_backend import BaseAsyncCacheBackend
+from starlette_cache.backends.base_cache_backend import BaseCacheBackend
+from starlette_cache.middleware.cached_response import CachedResponse
+
+_Codec = Tuple[Callable[[bytes, int], bytes], Callable[[bytes], bytes]]
+
+
+class ASGICacheMiddleware:
+    """
+    An ASGI middleware that caches the status, headers and body of responses and
+    replays them on later requests, without calling the application at all.
+
+    Responses with a Vary header are stored per value of the request headers it
+    lists. The Vary header of each path is recorded the first time a response to it
+    is stored, so the following requests to the path are looked up by those headers.
+
+    As a shared cache, it does not serve cached responses to requests with an
+    Authorization header, and only stores the responses to them that are explicitly
+    ``public`` or have an ``s-maxage``.
+
+    Usage: ``app.add_middleware(ASGICacheMiddleware, cache_backend=backend)``
+    """
+
+    cacheable_methods = {"GET", "HEAD"}
+    cacheable_status_codes = {200, 203, 204, 300, 301, 404, 405, 410, 414, 501}
+    not_modified_headers = {
+        b"age",
+        b"cache-control",
+        b"content-location",
+        b"date",
+        b"etag",
+        b"expires",
+        b"last-modified",
+        b"vary",
+    }
+    codecs: Dict[str, _Codec] = {
+        "gzip": (gzip.compress, gzip.decompress),
+        "deflate": (zlib.compress, zlib.decompress),
+    }
+    max_vary_paths = 4096
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        cache_backend: Union[BaseCacheBackend, BaseAsyncCacheBackend],
+        cache_ttl: int = 300,
+        key_function: Optional[Callable[[Request], str]] = None,
+        private: bool = False,
+        tag_function: Optional[Callable[[Request], Iterable[str]]] = None,
+        compression: Optional[str] = None,
+        compression_min_size: int = 1024,
+        compression_level: int = 6,
+        max_body_size: Optional[int] = 16 * 1024 * 1024,
+        hooks: Optional[metrics.CacheHooks] = None,
+    ) -> None:
+        """
+        Create an instance of the ASGI cache middleware.
+        :param app: The ASGI application wrapped by this middleware.
+        :param cache_backend: The cache backend used to store responses.
+        :param cache_ttl: The time to live for the response in seconds.
+        :param key_function: An optional function to generate the cache_key
+        from the starlette Request object.
+        :param private: Whether responses without a Cache-Control header of their own
+        may only be cached by the client, rather than by shared caches as well. Such
+        responses are marked private and not stored by the middleware either.
+        :param tag_function: An optional function to generate tags for the cached
+        response from the starlette Request object, so it can be deleted together
+        with other responses through the backend's ``invalidate_tag``.
+        :param compression: The content coding to store bodies with, ``gzip`` or
+        ``deflate``. Compressed bodies are sent as they are to clients accepting the
+        coding, and decompressed for the others. Bodies are stored uncompressed if
+        not set.
+        :param compression_min_size: The minimum size in bytes of the bodies to
+        compress.
+        :param compression_level: The compression level, from 1 (fastest) to 9
+        (smallest).
+        :param max_body_size: The size in bytes above which responses are not cached.
+        Streamed responses stop being recorded as soon as they grow past it, and are
+        only passed on from then on. Responses of any size are cached if None.
+        :param hooks: Optional instrumentation hooks, e.g. a ``CacheMetrics``, called
+        with the result and latency of every lookup and store.
+        """
+        if compression is not None and compression not in self.codecs:
+            raise ValueError(f"Unsupported compression {compression!r}.")
+        self.app: ASGIApp = app
+        self.cache_backend: Union[
+            BaseCacheBackend, BaseAsyncCacheBackend
+        ] = cache_backend
+        self.ttl: int = cache_ttl
+        self.key_func: Callable[[Request], str] = key_function or utils.get_cache_key
+        self.tag_func: Optional[Callable[[Request], Iterable[str]]] = tag_function
+        self.compression: Optional[str] = compression
+        self.compression_min_size: int = compression_min_size
+        self.compression_level: int = compression_level
+        self.max_body_size: Optional[int] = max_body_size
+        self.private: bool = private
+        self.hooks: Optional[metrics.CacheHooks] = hooks
+        self.route: str = getattr(app, "__name__", None) or type(app).__name__
+        self.cache_control: bytes = (
+            f"max-age={cache_ttl}, {'private' if private else 'public'}".encode(
+                "latin-1"
+            )
+        )
+        self.vary_by_path: Dict[str, Tuple[str, ...]] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in self.cacheable_methods:
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        authorized = "authorization" in request.headers
+        base_key = cache_key = self.key_func(request)
+        vary = self.vary_by_path.get(self.__path(scope))
+        if vary:
+            cache_key = utils.get_vary_cache_key(base_key, request.headers, vary)
+        cached = None
+        if not authorized:
+            started = time.perf_counter() if self.hooks is not None else 0.0
+            if isinstance(self.cache_backend, BaseAsyncCacheBackend):
+                cached = await self.cache_backend.get(cache_key)
+            else:
+                cached = self.cache_backend.get(cache_key)
+            self.__observe_lookup(
+                metrics.MISS if cached is None else metrics.HIT, started
+            )
+        if cached is not None:
+            await self.replay(cached, scope, send)
+            return
+
+        await self.call_and_store(base_key, scope, receive, send, authorized)
+
+    async def replay(
+        self,
+        cached: CachedResponse,
+        scope: Scope,
+        send: Send,
+        uncompressed_body: Optional[bytes] = None,
+        cache_status: str = metrics.HIT,
+    ) -> None:
+        """
+        Send a cached response, or an empty 304 Not Modified response if the
+        request's validators match it. The stored body is sent as is, without
+        copying it, unless it is compressed and the client does not accept that.
+        :param cached: The cached response.
+        :param scope: The ASGI scope.
+        :param send: The ASGI send callable.
+        :param uncompressed_body: The body before it was compressed, if it is still
+        at hand, to save decompressing it.
+        :param cache_status: The X-Cache header, ``HIT`` unless the response was just
+        stored.
+        """
+        request_headers = Headers(scope=scope)
+        headers, body, etag = cached.headers, cached.body, cached.etag
+        if cached.encoding is not None:
+            accept_encoding = request_headers.get("accept-encoding", "")
+            if utils.accepts_encoding(accept_encoding, cached.encoding):
+                headers, etag = self.encoded_headers(cached)
+            elif uncompressed_body is not None:
+                body = uncompressed_body
+            else:
+                body = self.codecs[cached.encoding][1](body)
+        age = 0 if cached.stored_at is None else int(time.time() - cached.stored_at)
+        headers = headers + [
+            (b"age", str(max(0, age)).encode("latin-1")),
+            (b"x-cache", cache_status.encode("latin-1")),
+        ]
+        if cached.status_code == 200 and utils.is_not_modified(
+            request_headers, etag, cached.stored_at
+        ):
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 304,
+                    "headers": [
+                        (name, value)
+                        for name, value in headers
+                        if name in self.not_modified_headers
+                    ],
+                }
+            )
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await send(
+            {
+                "type": "http.response.start",
+                "status": cached.status_code,
+                "headers": headers,
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+    def encoded_headers(
+        self, cached: CachedResponse
+    ) -> Tuple[List[Tuple[bytes, bytes]], Optional[str]]:
+        """
+        The headers of the compressed representation of a cached response, with its
+        own Content-Length and ETag.
+        :return: The headers and the ETag.
+        """
+        etag = cached.etag
+        if etag is not None and etag.endswith('"'):
+            etag = f'{etag[:-1]}-{cached.encoding}"'
+        headers = [
+            (name, value)
+            for name, value in cached.headers
+            if name not in (b"content-length", b"etag")
+        ]
+        headers.append((b"content-encoding", cached.encoding.encode("latin-1")))
+        headers.append((b"content-length", str(len(cached.body)).encode("latin-1")))
+        if etag is not None:
+            headers.append((b"etag", etag.encode("latin-1")))
+        return headers, etag
+
+    async def call_and_store(
+        self,
+        cache_key: str,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+        authorized: bool = False,
+    ) -> None:
+        """
+        Call the application, passing its messages through to the client while
+        recording them, and store the response if it can be cached. The response is
+        stored under a key including the request headers listed in its Vary header.
+        :param cache_key: The key of the request, ignoring its headers.
+        :param scope: The ASGI scope.
+        :param receive: The ASGI receive callable.
+        :param send: The ASGI send callable.
+        :param authorized: Whether the request has an Authorization header.
+        """
+        start: Optional[Message] = None
+        chunks: List[bytes] = []
+        size = 0
+        complete = abandoned = False
+        cached: Optional[CachedResponse] = None
+
+        async def _send(message: Message) -> None:
+            nonlocal start, size, complete, abandoned, cached
+            if message["type"] == "http.response.start":
+                # Hold the start message back until the body arrives, so the
+                # validators can be added to it when the body comes in one message.
+                start = message
+                return
+            if message["type"] == "http.response.body":
+                body = message.get("body", b"")
+                more_body = message.get("more_body", False)
+                if (
+                    not chunks
+                    and not abandoned
+                    and not more_body
+                    and self.__fits(len(body))
+                    and self.is_cacheable(start, authorized)
+                ):
+                    cached = self.create_cached_response(start, [body])
+                    chunks.append(body)
+                    await self.replay(cached, scope, send, body, metrics.MISS)
+                    return
+                if not chunks and not abandoned:
+                    headers = list(start.get("headers", []))
+                    if self.private and "cache-control" not in Headers(raw=headers):
+                        headers.append((b"cache-control", self.cache_control))
+                    headers.append((b"x-cache", metrics.MISS.encode("latin-1")))
+                    await send({**start, "headers": headers})
+                size += len(body)
+                if abandoned or not self.__fits(size):
+                    # Too large to cache, so stop holding on to the body.
+                    abandoned = True
+                    chunks.clear()
+                else:
+                    chunks.append(body)
+                complete = not more_body
+            await send(message)
+
+        await self.app(scope, receive, _send)
+
+        if (
+            cached is None
+            and complete
+            and not abandoned
+            and self.is_cacheable(start, authorized)
+        ):
+            cached = self.create_cached_response(start, chunks)
+        if cached is None:
+            return
+        # The Vary header as sent by the application, without the Accept-Encoding
+        # added for compression, which is handled when the response is replayed.
+        vary = utils.get_vary_headers(
+            Headers(raw=start.get("headers", [])).get("vary", "")
+        )
+        self.record_vary(self.__path(scope), vary)
+        request = Request(scope)
+        if vary:
+            cache_key = utils.get_vary_cache_key(cache_key, request.headers, vary)
+        tags = list(self.tag_func(request)) if self.tag_func else None
+        started = time.perf_counter() if self.hooks is not None else 0.0
+        if isinstance(self.cache_backend, BaseAsyncCacheBackend):
+            await self.cache_backend.set(cache_key, cached, self.ttl)
+            if tags:
+                await self.cache_backend.tag(cache_key, tags)
+        else:
+            self.cache_backend.set(cache_key, cached, self.ttl)
+            if tags:
+                self.cache_backend.tag(cache_key, tags)
+        self.__observe_store(cached, started)
+
+    def record_vary(self, path: str, vary: Tuple[str, ...]) -> None:
+        """
+        Record the request headers the responses to a path vary on, forgetting the
+        oldest path once ``max_vary_paths`` are recorded.
+        :param path: The path of the request.
+        :param vary: The lower cased names of the headers.
+        """
+        if not vary:
+            self.vary_by_path.pop(path, None)
+            return
+        if (
+            path not in self.vary_by_path
+            and len(self.vary_by_path) >= self.max_vary_paths
+        ):
+            del self.vary_by_path[next(iter(self.vary_by_path))]
+        self.vary_by_path[path] = vary
+
+    def __observe_lookup(self, result: str, started: float) -> None:
+        if self.hooks is not None:
+            self.hooks.on_lookup(
+                self.route,
+                type(self.cache_backend).__name__,
+                result,
+                time.perf_counter() - started,
+            )
+
+    def __observe_store(self, cached: CachedResponse, started: float) -> None:
+        if self.hooks is not None:
+            self.hooks.on_store(
+                self.route,
+                type(self.cache_backend).__name__,
+                len(cached.body),
+                time.perf_counter() - started,
+            )
+
+    def __fits(self, size: int) -> bool:
+        return self.max_body_size is None or size <= self.max_body_size
+
+    @staticmethod
+    def __path(scope: Scope) -> str:
+        return scope.get("root_path", "") + scope["path"]
+
+    def create_cached_response(
+        self, start: Message, chunks: List[bytes]
+    ) -> CachedResponse:
+        """
+        Create the cached response for a response sent by the application, adding
+        ETag, Last-Modified and Cache-Control headers unless it set them itself.
+        :param start: The ``http.response.start`` message of the response.
+        :param chunks: The body of the response, as sent by the application.
+        """
+        # Only join when the application streamed the body, a single chunk is stored
+        # as the same bytes object it was sent as.
+        body = chunks[0] if len(chunks) == 1 else b"".join(chunks)
+        headers = list(start.get("headers", []))
+        existing = Headers(raw=headers)
+        etag = existing.get("etag") or utils.get_etag(body)
+        stored_at = time.time()
+        if "etag" not in existing:
+            headers.append((b"etag", etag.encode("latin-1")))
+        if "last-modified" not in existing:
+            last_modified = formatdate(stored_at, usegmt=True)
+            headers.append((b"last-modified", last_modified.encode("latin-1")))
+        if "cache-control" not in existing:
+            headers.append((b"cache-control", self.cache_control))
+        encoding = None
+        if (
+            self.compression is not None
+            and len(body) >= self.compression_min_size
+            and "content-encoding" not in existing
+        ):
+            compress = self.codecs[self.compression][0]
+            compressed = compress(body, self.compression_level)
+            if len(compressed) < len(body):
+                body, encoding = compressed, self.compression
+                headers = self.__vary_on_accept_encoding(headers)
+        return CachedResponse(start["status"], headers, body, etag, stored_at, encoding)
+
+    @staticmethod
+    def __vary_on_accept_encoding(
+        headers: List[Tuple[bytes, bytes]]
+    ) -> List[Tuple[bytes, bytes]]:
+        for index, (name, value) in enumerate(headers):
+            if name == b"vary":
+                if b"accept-encoding" not in value.lower():
+                    headers[index] = (name, value + b", Accept-Encoding")
+                return headers
+        headers.append((b"vary", b"Accept-Encoding"))
+        return headers
+
+    def is_cacheable(self, start: Message, authorized: bool = False) -> bool:
+        """
+        Whether a response can be shared with other clients, based on its status code
+        and headers.
+        :param start: The ``http.response.start`` message of the response.
+        :param authorized: Whether the request had an Authorization header, in which
+        case the response is only shared if it explicitly allows it.
+        """
+        if start["status"] not in self.cacheable_status_codes:
+            return False
+        headers = Headers(raw=start.get("headers", []))
+        if "set-cookie" in headers or "*" in utils.get_vary_headers(
+            headers.get("vary", "")
+        ):
+            return False
+        if "cache-control" not in headers:
+            # The middleware marks these private itself when ``private`` is set.
+            return not self.private and not authorized
+        cache_control = headers["cache-control"].lower()
+        if "no-store" in cache_control or "private" in cache_control:
+            return False
+        return (
+            not authorized or "public" in cache_control or "s-maxage" in cache_control
+        )
@@ -0,0 +1,98 @@
+import math
+import struct
+import time
+from typing import Any, Optional, Tuple
+
+from starlette.responses import Response
+
+from starlette_cache import utils
+from starlette_cache.backends.serializers import EncodedValue
+from starlette_cache.middleware.cached_response import pack_headers, unpack_headers
+
+# kind of value, stored at, ETag length
+_entry_header = struct.Struct("<BdH")
+# status code, number of headers
+_response_header = struct.Struct("<HI")
+_BYTES = 0
+_RESPONSE = 1
+
+
+class CacheEntry(EncodedValue):
+    """
+    A value cached by the ``CacheMiddleware``, together with the validators used to
+    answer conditional requests for it.
+
+    Entries of bytes, or of plain responses with a body and no background task, are
+    encoded as their validators, status code and headers followed by the body. They
+    come back as a ``Response`` rather than the subclass they were stored as, which
+    only differed in how the body was rendered.
+    """
+
+    __slots__ = ("value", "etag", "stored_at")
+    encoding_tag = 2
+
+    def __init__(
+        self, value: Any, etag: Optional[str] = None, stored_at: Optional[float] = None
+    ) -> None:
+        self.value: Any = value
+        self.etag: Optional[str] = etag
+        self.stored_at: Optional[float] = stored_at
+
+    @classmethod
+    def for_value(cls, value: Any) -> "CacheEntry":
+        """
+        Create an entry for a value returned by an application, with a strong ETag
+        computed from its body if it is a response with a body or bytes. Other
+        values have no body to derive one from and are left without an ETag.
+        """
+        body = getattr(value, "body", None) if isinstance(value, Response) else value
+        etag = None
+        if isinstance(body, (bytes, bytearray, memoryview)):
+            etag = utils.get_etag(body)
+        return cls(value, etag, time.time())
+
+    @classmethod
+    def wrap(cls, cached: Any) -> Optional["CacheEntry"]:
+        """
+        Wrap values cached without an entry, e.g. by older versions of the middleware.
+        """
+        if cached is None or isinstance(cached, CacheEntry):
+            return cached
+        return cls(cached)
+
+    def encode(self) -> Optional[Tuple[bytes, bytes]]:
+        value = self.value
+        if type(value) is bytes:
+            kind, body, response_header = _BYTES, value, b""
+        elif (
+            isinstance(value, Response)
+            and type(getattr(value, "body", None)) is bytes
+            and value.background is None
+        ):
+            kind, body = _RESPONSE, value.body
+            response_header = _response_header.pack(
+                value.status_code, len(value.raw_headers)
+            ) + pack_headers(value.raw_headers)
+        else:
+            return None
+        etag = (self.etag or "").encode("latin-1")
+        stored_at = math.nan if self.stored_at is None else self.stored_at
+        header = _entry_header.pack(kind, stored_at, len(etag))
+        return b"".join((header, etag, response_header)), body
+
+    @classmethod
+    def decode(cls, data: memoryview) -> "CacheEntry":
+        kind, stored_at, etag_length = _entry_header.unpack_from(data)
+        etag_start = _entry_header.size
+        offset = etag_start + etag_length
+        etag = bytes(data[etag_start:offset]).decode("latin-1") or None
+        stored_at = None if math.isnan(stored_at) else stored_at
+        if kind == _BYTES:
+            return cls(bytes(data[offset:]), etag, stored_at)
+        status_code, header_count = _response_header.unpack_from(data, offset)
+        headers, offset = unpack_headers(
+            data, offset + _response_header.size, header_count
+        )
+        response = Response(bytes(data[offset:]), status_code)
+        response.raw_headers = headers
+        return cls(response, etag, stored_at)
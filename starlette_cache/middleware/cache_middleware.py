@@ -1,15 +1,38 @@
 import asyncio
-from typing import Callable, Optional, Union, Any
+import concurrent.futures
+import hashlib
+import logging
+import math
+import threading
+import time
+import uuid
+from email.utils import formatdate
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
 from starlette.datastructures import MutableHeaders
 from starlette.requests import Request
-from starlette.responses import Response
+from starlette.responses import Response, StreamingResponse
 
 from starlette.types import ASGIApp
 
-from starlette_cache import utils
+from starlette_cache import metrics, utils
 from starlette_cache.backends.base_async_cache_backend import BaseAsyncCacheBackend
 from starlette_cache.backends.base_cache_backend import BaseCacheBackend
+from starlette_cache.middleware.cache_entry import CacheEntry
+from starlette_cache.middleware.cached_stream import CachedStream, segment_key
+
+logger = logging.getLogger(__name__)
 
 
 class CacheMiddleware:
@@ -18,6 +41,16 @@ class CacheMiddleware:
         app: Union[ASGIApp, Callable],
         cache_ttl: int = 300,
         key_function: Optional[Callable[[Request], str]] = None,
+        single_flight: bool = True,
+        lock_timeout: Optional[float] = None,
+        lock_poll_interval: float = 0.05,
+        stale_while_revalidate: int = 0,
+        stale_if_error: int = 0,
+        private: bool = False,
+        tag_function: Optional[Callable[[Request], Iterable[str]]] = None,
+        hooks: Optional[metrics.CacheHooks] = None,
+        max_stream_size: Optional[int] = 16 * 1024 * 1024,
+        stream_segment_size: int = 64 * 1024,
     ) -> None:
         """
         Create an instance of the cache middleware.
@@ -27,11 +60,56 @@ class CacheMiddleware:
         :param cache_ttl: The time to live for the response in seconds.
         :param key_function: An optional function to generate the cache_key
         from the starlette Request object.
+        :param single_flight: Whether concurrent misses for the same key in this
+        process should wait for a single call to the application instead of each
+        calling it.
+        :param lock_timeout: If set, the caller computing a response also takes a lock
+        in the cache backend through ``add``, so misses in other processes wait for
+        it too. Waiters give up and call the application themselves after this many
+        seconds.
+        :param lock_poll_interval: How often, in seconds, waiters on a backend lock
+        check whether the response has been cached.
+        :param stale_while_revalidate: For how many seconds after it expires a cached
+        response is still returned, while it is refreshed in the background.
+        :param stale_if_error: For how many seconds after it expires a cached response
+        is returned if the application raises an exception.
+        :param private: Whether responses may only be cached by the client, rather
+        than by shared caches as well.
+        :param tag_function: An optional function to generate tags for the cached
+        response from the starlette Request object, so it can be deleted together
+        with other responses through the backend's ``invalidate_tag``.
+        :param hooks: Optional instrumentation hooks, e.g. a ``CacheMetrics``, called
+        with the result and latency of every lookup and store.
+        :param max_stream_size: The size in bytes above which the body of a
+        ``StreamingResponse`` is no longer cached. The response is still streamed to
+        the client in full. Streams of any size are cached if None.
+        :param stream_segment_size: The size in bytes of the segments the body of a
+        ``StreamingResponse`` is stored in. At most one segment per response is held
+        in memory while it is streamed.
         """
         self.app: Union[ASGIApp, Callable] = app
         self.ttl: int = cache_ttl
         self.key_func: Callable[[Request], str] = key_function or utils.get_cache_key
-        self.request: Optional[Request] = None
+        self.single_flight: bool = single_flight
+        self.lock_timeout: Optional[float] = lock_timeout
+        self.lock_poll_interval: float = lock_poll_interval
+        self._in_flight: Dict[str, concurrent.futures.Future] = {}
+        self._in_flight_lock = threading.Lock()
+        self.stale_while_revalidate: int = stale_while_revalidate
+        self.stale_if_error: int = stale_if_error
+        self._revalidating: Set[str] = set()
+        # The background revalidations, referenced until they finish so their tasks
+        # are not garbage collected while pending.
+        self._revalidations: Set[
+            Union[asyncio.Future, concurrent.futures.Future]
+        ] = set()
+        self._revalidation_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.private: bool = private
+        self.tag_func: Optional[Callable[[Request], Iterable[str]]] = tag_function
+        self.hooks: Optional[metrics.CacheHooks] = hooks
+        self.route: str = getattr(app, "__name__", None) or type(app).__name__
+        self.max_stream_size: Optional[int] = max_stream_size
+        self.stream_segment_size: int = stream_segment_size
 
     async def __call__(
         self,
@@ -39,7 +117,7 @@ class CacheMiddleware:
         response: Response,
         cache_backend: Union[BaseCacheBackend, BaseAsyncCacheBackend],
         *args,
-        **kwargs
+        **kwargs,
     ) -> Any:
         """
         The wrapper for the ASGI application that handles caching requests and responses.
@@ -50,59 +128,762 @@ class CacheMiddleware:
         :param kwargs: Keyword arguments passed to the application.
         :return: The Starlette response.
         """
-        self.request = request
-        self.request.state.update_cache = False
         if cache_backend:
-            if self.request.method in {"GET", "HEAD"}:
-                cache_key = self.key_func(self.request)
-                if isinstance(cache_backend, BaseAsyncCacheBackend):
-                    message = await cache_backend.get(cache_key)
-                else:
-                    message = cache_backend.get(cache_key)
-                if message:
-                    return message
-                else:
-                    self.request.state.update_cache = True
+            if request.method in {"GET", "HEAD"}:
+                cache_key = self.key_func(request)
+                started = time.perf_counter() if self.hooks is not None else 0.0
+                entry, staleness = await self._get(cache_backend, cache_key)
+                if entry is not None and staleness is None:
+                    self._observe_lookup(cache_backend, metrics.HIT, started)
+                    return self.build_response(entry, request, response, metrics.HIT)
+                if entry is not None and staleness <= self.stale_while_revalidate:
+                    self._observe_lookup(cache_backend, metrics.STALE, started)
+                    self._revalidate_in_background(
+                        cache_key, request, cache_backend, *args, **kwargs
+                    )
+                    return self.build_response(entry, request, response, metrics.STALE)
+                self._observe_lookup(cache_backend, metrics.MISS, started)
+                try:
+                    if self.single_flight:
+                        fresh_entry = await self._coalesce(
+                            cache_key, request, response, cache_backend, *args, **kwargs
+                        )
+                    else:
+                        fresh_entry = await self._call_locked(
+                            cache_key, request, response, cache_backend, *args, **kwargs
+                        )
+                except Exception:
+                    if entry is not None and staleness <= self.stale_if_error:
+                        return self.build_response(
+                            entry, request, response, metrics.STALE
+                        )
+                    raise
+                return self.build_response(fresh_entry, request, response, metrics.MISS)
+        entry = await self._call_app(
+            None, request, response, cache_backend, *args, **kwargs
+        )
+        return self.build_response(entry, request, response)
+
+    async def _get(
+        self,
+        cache_backend: Union[BaseCacheBackend, BaseAsyncCacheBackend],
+        cache_key: str,
+    ) -> Tuple[Optional[CacheEntry], Optional[float]]:
+        """
+        Get a cached response, including stale ones if serving stale responses is
+        enabled.
+        :return: The cache entry and the number of seconds it has been stale for, or
+        None if it is still fresh.
+        """
+        if not isinstance(cache_backend, BaseAsyncCacheBackend):
+            return self._get_sync(cache_backend, cache_key)
+        if self.stale_while_revalidate or self.stale_if_error:
+            cached, staleness = await cache_backend.get_soft(cache_key)
+        else:
+            cached, staleness = await cache_backend.get(cache_key), None
+        entry = self._open_stream(cache_key, CacheEntry.wrap(cached), cache_backend)
+        return entry, staleness
+
+    async def _store(
+        self,
+        cache_backend: Union[BaseCacheBackend, BaseAsyncCacheBackend],
+        cache_key: str,
+        entry: CacheEntry,
+        tags: Iterable[str] = (),
+        age: int = 0,
+    ) -> None:
+        """
+        :param age: The number of seconds taken off the time to live of the entry,
+        for entries whose parts were stored that long ago.
+        """
+        if not isinstance(cache_backend, BaseAsyncCacheBackend):
+            return self._store_sync(cache_backend, cache_key, entry, tags, age)
+        started = time.perf_counter() if self.hooks is not None else 0.0
+        ttl = self.ttl - age
+        stale_ttl = max(self.stale_while_revalidate, self.stale_if_error)
+        if ttl + stale_ttl <= 0:
+            return
+        if stale_ttl:
+            await cache_backend.set_soft(cache_key, entry, ttl, ttl + stale_ttl)
+        else:
+            await cache_backend.set(cache_key, entry, ttl)
+        if tags:
+            await cache_backend.tag(cache_key, tags)
+        self._observe_store(cache_backend, entry, started)
+
+    def _revalidate_in_background(
+        self,
+        cache_key: str,
+        request: Request,
+        cache_backend: Union[BaseCacheBackend, BaseAsyncCacheBackend],
+        *args,
+        **kwargs,
+    ) -> None:
+        """
+        Refresh a stale response without holding up the request it was served to. The
+        application is called with a response of its own, as the response of the
+        request is sent before the revalidation completes.
+        """
+        with self._in_flight_lock:
+            if cache_key in self._revalidating:
+                return
+            self._revalidating.add(cache_key)
         if asyncio.iscoroutinefunction(self.app):
-            message = await self.app(
-                request=request, response=response, *args, **kwargs
+            revalidation = asyncio.ensure_future(
+                self._revalidate(
+                    cache_key, request, Response(), cache_backend, *args, **kwargs
+                )
+            )
+        elif isinstance(cache_backend, BaseAsyncCacheBackend):
+            # Sync endpoints may run on an event loop that is closed once they return,
+            # so refresh their responses on a loop of the middleware's own. The async
+            # backend is used from its thread as well, as it already is from the
+            # threads sync endpoints run on.
+            revalidation = asyncio.run_coroutine_threadsafe(
+                self._revalidate(
+                    cache_key, request, Response(), cache_backend, *args, **kwargs
+                ),
+                self._get_revalidation_loop(),
             )
         else:
-            message = self.app(request=request, response=response, *args, **kwargs)
-        return await self.build_response(message, response, cache_backend)
+            revalidation = concurrent.futures.Future()
 
-    async def build_response(
+            def _revalidate_sync() -> None:
+                try:
+                    self._revalidate_sync(
+                        cache_key, request, Response(), cache_backend, *args, **kwargs
+                    )
+                finally:
+                    revalidation.set_result(None)
+
+            threading.Thread(target=_revalidate_sync, daemon=True).start()
+        self._revalidations.add(revalidation)
+        revalidation.add_done_callback(self._revalidations.discard)
+
+    def _get_revalidation_loop(self) -> asyncio.AbstractEventLoop:
+        """
+        The event loop sync endpoints with async backends are revalidated on, run
+        by a daemon thread started on first use.
+        """
+        with self._in_flight_lock:
+            if self._revalidation_loop is None:
+                self._revalidation_loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._revalidation_loop.run_forever, daemon=True
+                ).start()
+            return self._revalidation_loop
+
+    async def _revalidate(
         self,
-        message: Any,
+        cache_key: str,
+        request: Request,
         response: Response,
         cache_backend: Union[BaseCacheBackend, BaseAsyncCacheBackend],
+        *args,
+        **kwargs,
+    ) -> None:
+        try:
+            entry = await self._call_app(
+                cache_key, request, response, cache_backend, *args, **kwargs
+            )
+            await self._drain(entry)
+        except Exception:
+            logger.exception("Failed to revalidate the cached response %s", cache_key)
+        finally:
+            with self._in_flight_lock:
+                self._revalidating.discard(cache_key)
+
+    async def _run_app(
+        self, request: Request, response: Response, *args, **kwargs
+    ) -> Any:
+        if asyncio.iscoroutinefunction(self.app):
+            return await self.app(request=request, response=response, *args, **kwargs)
+        return self.app(request=request, response=response, *args, **kwargs)
+
+    async def _call_app(
+        self,
+        cache_key: Optional[str],
+        request: Request,
+        response: Response,
+        cache_backend: Union[BaseCacheBackend, BaseAsyncCacheBackend],
+        *args,
+        **kwargs,
+    ) -> CacheEntry:
+        """
+        Call the application and store its response under ``cache_key``, unless it
+        is None.
+        """
+        message = await self._run_app(request, response, *args, **kwargs)
+        if request.method not in {"GET", "HEAD"}:
+            return CacheEntry(message)
+        if isinstance(message, StreamingResponse):
+            if cache_key is not None:
+                self._tee(cache_key, message, cache_backend, self.get_tags(request))
+            return CacheEntry(message)
+        entry = CacheEntry.for_value(message)
+        if cache_key is not None:
+            await self._store(cache_backend, cache_key, entry, self.get_tags(request))
+        return entry
+
+    async def _coalesce(
+        self,
+        cache_key: str,
+        request: Request,
+        response: Response,
+        cache_backend: Union[BaseCacheBackend, BaseAsyncCacheBackend],
+        *args,
+        **kwargs,
+    ) -> CacheEntry:
+        """
+        Make sure only one caller per cache key calls the application at a time,
+        the others wait for its result. A concurrent future is used so callers on
+        other threads and event loops, as with sync endpoints, can wait on it too.
+        """
+        future, is_leader = self._join_flight(cache_key)
+        if not is_leader:
+            entry = await asyncio.shield(asyncio.wrap_future(future))
+            if isinstance(entry.value, StreamingResponse):
+                # A stream can only be sent once, so it cannot be shared.
+                return await self._call_app(
+                    None, request, response, cache_backend, *args, **kwargs
+                )
+            return entry
+        try:
+            entry = await self._call_locked(
+                cache_key, request, response, cache_backend, *args, **kwargs
+            )
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(entry)
+            return entry
+        finally:
+            self._leave_flight(cache_key)
+
+    def _join_flight(self, cache_key: str) -> Tuple[concurrent.futures.Future, bool]:
+        """
+        :return: The future for the in-flight call for the key, and whether the caller
+        is the one that has to make it.
+        """
+        with self._in_flight_lock:
+            future = self._in_flight.get(cache_key)
+            if future is not None:
+                return future, False
+            future = self._in_flight[cache_key] = concurrent.futures.Future()
+            return future, True
+
+    def _leave_flight(self, cache_key: str) -> None:
+        with self._in_flight_lock:
+            del self._in_flight[cache_key]
+
+    async def _call_locked(
+        self,
+        cache_key: str,
+        request: Request,
+        response: Response,
+        cache_backend: Union[BaseCacheBackend, BaseAsyncCacheBackend],
+        *args,
+        **kwargs,
+    ) -> CacheEntry:
+        """
+        Call the application while holding a lock in the cache backend, if
+        ``lock_timeout`` is set. If another process holds the lock, wait for it to
+        cache the response instead.
+        """
+        if self.lock_timeout is None:
+            return await self._call_app(
+                cache_key, request, response, cache_backend, *args, **kwargs
+            )
+        lock_key, lock_ttl = f"{cache_key}.lock", math.ceil(self.lock_timeout)
+        if isinstance(cache_backend, BaseAsyncCacheBackend):
+            acquired = await cache_backend.add(lock_key, True, lock_ttl)
+        else:
+            acquired = cache_backend.add(lock_key, True, lock_ttl)
+        if acquired:
+            try:
+                return await self._call_app(
+                    cache_key, request, response, cache_backend, *args, **kwargs
+                )
+            finally:
+                if isinstance(cache_backend, BaseAsyncCacheBackend):
+                    await cache_backend.delete(lock_key)
+                else:
+                    cache_backend.delete(lock_key)
+        entry = await self._wait_for_lock_holder(cache_key, lock_key, cache_backend)
+        if entry is not None:
+            return entry
+        return await self._call_app(
+            cache_key, request, response, cache_backend, *args, **kwargs
+        )
+
+    async def _wait_for_lock_holder(
+        self,
+        cache_key: str,
+        lock_key: str,
+        cache_backend: Union[BaseCacheBackend, BaseAsyncCacheBackend],
+    ) -> Optional[CacheEntry]:
+        """
+        Wait for the holder of ``lock_key`` to cache the response.
+        :return: The cached entry, or None if the lock timed out or was released
+        without a response being cached, e.g. because the application raised or its
+        response could not be cached.
+        """
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.lock_poll_interval)
+            # The holder caches the response before releasing the lock, so the
+            # lock is checked first to not miss a response cached in between.
+            if isinstance(cache_backend, BaseAsyncCacheBackend):
+                released = await cache_backend.get(lock_key) is None
+                cached = await cache_backend.get(cache_key)
+            else:
+                released = cache_backend.get(lock_key) is None
+                cached = cache_backend.get(cache_key)
+            if cached is not None:
+                return self._open_stream(
+                    cache_key, CacheEntry.wrap(cached), cache_backend
+                )
+            if released:
+                break
+        return None
+
+    def _observe_lookup(
+        self,
+        cache_backend: Union[BaseCacheBackend, BaseAsyncCacheBackend],
+        result: str,
+        started: float,
+    ) -> None:
+        if self.hooks is not None:
+            self.hooks.on_lookup(
+                self.route,
+                type(cache_backend).__name__,
+                result,
+                time.perf_counter() - started,
+            )
+
+    def _observe_store(
+        self,
+        cache_backend: Union[BaseCacheBackend, BaseAsyncCacheBackend],
+        entry: CacheEntry,
+        started: float,
+    ) -> None:
+        if self.hooks is not None:
+            value = entry.value
+            if isinstance(value, CachedStream):
+                size: Optional[int] = value.size
+            else:
+                size = len(value) if isinstance(value, (bytes, str)) else None
+            self.hooks.on_store(
+                self.route,
+                type(cache_backend).__name__,
+                size,
+                time.perf_counter() - started,
+            )
+
+    def _tee(
+        self,
+        cache_key: str,
+        stream: StreamingResponse,
+        cache_backend: Union[BaseCacheBackend, BaseAsyncCacheBackend],
+        tags: Iterable[str],
+    ) -> None:
+        """
+        Store the body of a streamed response while it is sent to the client.
+        """
+        # Taken now, before the caching headers are added to the response.
+        headers = list(stream.raw_headers)
+        stream.body_iterator = self._store_stream(
+            cache_key, stream, stream.body_iterator, headers, cache_backend, tags
+        )
+
+    async def _store_stream(
+        self,
+        cache_key: str,
+        stream: StreamingResponse,
+        chunks: AsyncIterator[Any],
+        headers: List[Tuple[bytes, bytes]],
+        cache_backend: Union[BaseCacheBackend, BaseAsyncCacheBackend],
+        tags: Iterable[str],
+    ) -> AsyncIterator[Any]:
+        """
+        Pass the chunks of a stream on, storing them in segments of about
+        ``stream_segment_size`` bytes as they go. The response itself is stored once
+        the stream ends, so it is never looked up before all of its segments are.
+        Once the stream grows past ``max_stream_size`` its segments are deleted and
+        the rest of it is only passed on.
+        """
+        # Every response gets segment keys of its own, so concurrent streams of the
+        # same cache key never overwrite each other's segments.
+        prefix = f"{cache_key}:{uuid.uuid4().hex}"
+        segment: List[bytes] = []
+        buffered = size = segments = 0
+        digest = hashlib.md5()
+        caching = True
+        # The segments expire counting from when they were stored, so the entry has
+        # to count from when the first one was, or it would outlive them.
+        stream_started = time.time()
+        async for chunk in chunks:
+            yield chunk
+            if not caching:
+                continue
+            if not isinstance(chunk, bytes):
+                chunk = chunk.encode(stream.charset)
+            size += len(chunk)
+            if self.max_stream_size is not None and size > self.max_stream_size:
+                caching, segment = False, []
+                await self._delete_segments(cache_backend, prefix, segments)
+                continue
+            digest.update(chunk)
+            segment.append(chunk)
+            buffered += len(chunk)
+            if buffered >= self.stream_segment_size:
+                key = segment_key(prefix, segments)
+                await self._set_segment(cache_backend, key, b"".join(segment))
+                segment, buffered, segments = [], 0, segments + 1
+        if not caching:
+            return
+        if segment:
+            key = segment_key(prefix, segments)
+            await self._set_segment(cache_backend, key, b"".join(segment))
+            segments += 1
+        cached = CachedStream(stream.status_code, headers, prefix, segments, size)
+        # The same ETag utils.get_etag gives the whole body.
+        etag = f'"{digest.hexdigest()}"'
+        now = time.time()
+        await self._store(
+            cache_backend,
+            cache_key,
+            CacheEntry(cached, etag, now),
+            tags,
+            math.ceil(now - stream_started),
+        )
+
+    async def _set_segment(
+        self,
+        cache_backend: Union[BaseCacheBackend, BaseAsyncCacheBackend],
+        key: str,
+        data: bytes,
+    ) -> None:
+        # Segments are kept as long as stale responses are.
+        ttl = self.ttl + max(self.stale_while_revalidate, self.stale_if_error)
+        if isinstance(cache_backend, BaseAsyncCacheBackend):
+            await cache_backend.set(key, data, ttl)
+        else:
+            cache_backend.set(key, data, ttl)
+
+    @staticmethod
+    async def _delete_segments(
+        cache_backend: Union[BaseCacheBackend, BaseAsyncCacheBackend],
+        prefix: str,
+        segments: int,
+    ) -> None:
+        keys = [segment_key(prefix, index) for index in range(segments)]
+        if isinstance(cache_backend, BaseAsyncCacheBackend):
+            await cache_backend.delete_many(keys)
+        else:
+            cache_backend.delete_many(keys)
+
+    def _open_stream(
+        self,
+        cache_key: str,
+        entry: Optional[CacheEntry],
+        cache_backend: Union[BaseCacheBackend, BaseAsyncCacheBackend],
+    ) -> Optional[CacheEntry]:
+        """
+        Turn a cached stream into a response streaming its segments from the cache
+        backend. Other entries are returned as they are.
+        """
+        if entry is None or not isinstance(entry.value, CachedStream):
+            return entry
+        cached = entry.value
+        stream = StreamingResponse(
+            self._replay_stream(cache_key, cached, cache_backend),
+            status_code=cached.status_code,
+        )
+        stream.raw_headers = list(cached.headers)
+        return CacheEntry(stream, entry.etag, entry.stored_at)
+
+    @staticmethod
+    async def _replay_stream(
+        cache_key: str,
+        cached: CachedStream,
+        cache_backend: Union[BaseCacheBackend, BaseAsyncCacheBackend],
+    ) -> AsyncIterator[bytes]:
+        for key in cached.segment_keys():
+            if isinstance(cache_backend, BaseAsyncCacheBackend):
+                segment = await cache_backend.get(key)
+            else:
+                segment = cache_backend.get(key)
+            if segment is None:
+                # The segment was evicted, so the response cannot be completed. Make
+                # the next request a miss, and abort this one rather than send a
+                # truncated body as if it were whole.
+                if isinstance(cache_backend, BaseAsyncCacheBackend):
+                    await cache_backend.delete(cache_key)
+                else:
+                    cache_backend.delete(cache_key)
+                raise LookupError(
+                    f"Segment {key} of the cached response {cache_key} is missing."
+                )
+            yield segment
+
+    @staticmethod
+    async def _drain(entry: CacheEntry) -> None:
+        # Nothing sends a revalidated stream, so it is consumed here to be stored.
+        if isinstance(entry.value, StreamingResponse):
+            async for _ in entry.value.body_iterator:
+                pass
+
+    def get_tags(self, request: Request) -> Iterable[str]:
+        return list(self.tag_func(request)) if self.tag_func is not None else ()
+
+    def get_headers(self, entry: CacheEntry) -> Dict[str, str]:
+        """
+        The caching headers for a response.
+        :param entry: The cache entry of the response.
+        :return: The Cache-Control header, and the ETag, Last-Modified and Age headers
+        if the entry has validators.
+        """
+        cache_control = [f"max-age={self.ttl}", "private" if self.private else "public"]
+        if self.stale_while_revalidate:
+            cache_control.append(
+                f"stale-while-revalidate={self.stale_while_revalidate}"
+            )
+        if self.stale_if_error:
+            cache_control.append(f"stale-if-error={self.stale_if_error}")
+        headers = {"Cache-Control": ", ".join(cache_control)}
+        if entry.etag is not None:
+            headers["ETag"] = entry.etag
+        if entry.stored_at is not None:
+            headers["Last-Modified"] = formatdate(entry.stored_at, usegmt=True)
+            headers["Age"] = str(max(0, int(time.time() - entry.stored_at)))
+        return headers
+
+    def build_response(
+        self,
+        entry: CacheEntry,
+        request: Request,
+        response: Response,
+        cache_status: Optional[str] = None,
     ) -> Any:
         """
         Builds the response object to return to the caller.
-        :param message: The response from the ASGI application
+        :param entry: The cache entry holding the response from the ASGI application
+        :param request: The Starlette request
         :param response: the response object
-        :param cache_backend: The cache backend used to store responses.
-        :return: The message returned from the ASGI application.
+        :param cache_status: The X-Cache header, ``HIT``, ``MISS`` or ``STALE``, if
+        the response was looked up in the cache.
+        :return: The message returned from the ASGI application, or an empty 304 Not
+        Modified response if the request's validators match the entry.
         """
         headers = MutableHeaders()
 
-        headers["Cache-Control"] = str(self.ttl)
+        headers.update(self.get_headers(entry))
+        if cache_status is not None:
+            headers["X-Cache"] = cache_status
+
+        if request.method in {"GET", "HEAD"} and utils.is_not_modified(
+            request.headers, entry.etag, entry.stored_at
+        ):
+            return Response(status_code=304, headers=dict(headers.items()))
 
         response.headers.update(dict(headers.items()))
+        if isinstance(entry.value, StreamingResponse):
+            # A stream is created per response, so it can carry the headers itself.
+            entry.value.headers.update(dict(headers.items()))
 
-        try:
-            should_update_cache = self.request.state.update_cache
-        except AttributeError:
-            return message
+        return entry.value
+
+    def call_sync(
+        self,
+        request: Request,
+        response: Response,
+        cache_backend: BaseCacheBackend,
+        *args,
+        **kwargs,
+    ) -> Any:
+        """
+        The synchronous counterpart of ``__call__`` for sync applications and cache
+        backends, so they can be cached without running an event loop.
+        :param request: The Starlette request
+        :param response: The Starlette response
+        :param cache_backend: An instance of a subclass of the BaseCacheBackend
+        :param args: Arguments that are passed to the application
+        :param kwargs: Keyword arguments passed to the application.
+        :return: The Starlette response.
+        """
+        if cache_backend:
+            if request.method in {"GET", "HEAD"}:
+                cache_key = self.key_func(request)
+                started = time.perf_counter() if self.hooks is not None else 0.0
+                entry, staleness = self._get_sync(cache_backend, cache_key)
+                if entry is not None and staleness is None:
+                    self._observe_lookup(cache_backend, metrics.HIT, started)
+                    return self.build_response(entry, request, response, metrics.HIT)
+                if entry is not None and staleness <= self.stale_while_revalidate:
+                    self._observe_lookup(cache_backend, metrics.STALE, started)
+                    self._revalidate_in_background(
+                        cache_key, request, cache_backend, *args, **kwargs
+                    )
+                    return self.build_response(entry, request, response, metrics.STALE)
+                self._observe_lookup(cache_backend, metrics.MISS, started)
+                try:
+                    if self.single_flight:
+                        fresh_entry = self._coalesce_sync(
+                            cache_key, request, response, cache_backend, *args, **kwargs
+                        )
+                    else:
+                        fresh_entry = self._call_locked_sync(
+                            cache_key, request, response, cache_backend, *args, **kwargs
+                        )
+                except Exception:
+                    if entry is not None and staleness <= self.stale_if_error:
+                        return self.build_response(
+                            entry, request, response, metrics.STALE
+                        )
+                    raise
+                return self.build_response(fresh_entry, request, response, metrics.MISS)
+        entry = self._call_app_sync(
+            None, request, response, cache_backend, *args, **kwargs
+        )
+        return self.build_response(entry, request, response)
 
-        if not should_update_cache:
-            return message
+    def _get_sync(
+        self, cache_backend: BaseCacheBackend, cache_key: str
+    ) -> Tuple[Optional[CacheEntry], Optional[float]]:
+        if self.stale_while_revalidate or self.stale_if_error:
+            cached, staleness = cache_backend.get_soft(cache_key)
+        else:
+            cached, staleness = cache_backend.get(cache_key), None
+        entry = self._open_stream(cache_key, CacheEntry.wrap(cached), cache_backend)
+        return entry, staleness
 
-        cache_key = self.key_func(self.request)
+    def _store_sync(
+        self,
+        cache_backend: BaseCacheBackend,
+        cache_key: str,
+        entry: CacheEntry,
+        tags: Iterable[str] = (),
+        age: int = 0,
+    ) -> None:
+        started = time.perf_counter() if self.hooks is not None else 0.0
+        ttl = self.ttl - age
+        stale_ttl = max(self.stale_while_revalidate, self.stale_if_error)
+        if ttl + stale_ttl <= 0:
+            return
+        if stale_ttl:
+            cache_backend.set_soft(cache_key, entry, ttl, ttl + stale_ttl)
+        else:
+            cache_backend.set(cache_key, entry, ttl)
+        if tags:
+            cache_backend.tag(cache_key, tags)
+        self._observe_store(cache_backend, entry, started)
 
-        if isinstance(cache_backend, BaseAsyncCacheBackend):
-            await cache_backend.set(cache_key, message, self.ttl)
+    def _revalidate_sync(
+        self,
+        cache_key: str,
+        request: Request,
+        response: Response,
+        cache_backend: BaseCacheBackend,
+        *args,
+        **kwargs,
+    ) -> None:
+        try:
+            entry = self._call_app_sync(
+                cache_key, request, response, cache_backend, *args, **kwargs
+            )
+            if isinstance(entry.value, StreamingResponse):
+                asyncio.run(self._drain(entry))
+        except Exception:
+            logger.exception("Failed to revalidate the cached response %s", cache_key)
+        finally:
+            with self._in_flight_lock:
+                self._revalidating.discard(cache_key)
+
+    def _call_app_sync(
+        self,
+        cache_key: Optional[str],
+        request: Request,
+        response: Response,
+        cache_backend: BaseCacheBackend,
+        *args,
+        **kwargs,
+    ) -> CacheEntry:
+        message = self.app(request=request, response=response, *args, **kwargs)
+        if request.method not in {"GET", "HEAD"}:
+            return CacheEntry(message)
+        if isinstance(message, StreamingResponse):
+            if cache_key is not None:
+                self._tee(cache_key, message, cache_backend, self.get_tags(request))
+            return CacheEntry(message)
+        entry = CacheEntry.for_value(message)
+        if cache_key is not None:
+            self._store_sync(cache_backend, cache_key, entry, self.get_tags(request))
+        return entry
+
+    def _coalesce_sync(
+        self,
+        cache_key: str,
+        request: Request,
+        response: Response,
+        cache_backend: BaseCacheBackend,
+        *args,
+        **kwargs,
+    ) -> CacheEntry:
+        future, is_leader = self._join_flight(cache_key)
+        if not is_leader:
+            entry = future.result()
+            if isinstance(entry.value, StreamingResponse):
+                return self._call_app_sync(
+                    None, request, response, cache_backend, *args, **kwargs
+                )
+            return entry
+        try:
+            entry = self._call_locked_sync(
+                cache_key, request, response, cache_backend, *args, **kwargs
+            )
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
         else:
-            cache_backend.set(cache_key, message, self.ttl)
+            future.set_result(entry)
+            return entry
+        finally:
+            self._leave_flight(cache_key)
 
-        return message
+    def _call_locked_sync(
+        self,
+        cache_key: str,
+        request: Request,
+        response: Response,
+        cache_backend: BaseCacheBackend,
+        *args,
+        **kwargs,
+    ) -> CacheEntry:
+        if self.lock_timeout is None:
+            return self._call_app_sync(
+                cache_key, request, response, cache_backend, *args, **kwargs
+            )
+        lock_key, lock_ttl = f"{cache_key}.lock", math.ceil(self.lock_timeout)
+        if cache_backend.add(lock_key, True, lock_ttl):
+            try:
+                return self._call_app_sync(
+                    cache_key, request, response, cache_backend, *args, **kwargs
+                )
+            finally:
+                cache_backend.delete(lock_key)
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.lock_poll_interval)
+            released = cache_backend.get(lock_key) is None
+            cached = cache_backend.get(cache_key)
+            if cached is not None:
+                return self._open_stream(
+                    cache_key, CacheEntry.wrap(cached), cache_backend
+                )
+            if released:
+                break
+        return self._call_app_sync(
+            cache_key, request, response, cache_backend, *args, **kwargs
+        )
@@ -0,0 +1,105 @@
+import math
+import struct
+from typing import List, Optional, Tuple
+
+from starlette_cache.backends.serializers import EncodedValue
+
+RawHeaders = List[Tuple[bytes, bytes]]
+
+# status code, stored at, ETag length, encoding length, number of headers
+_response_header = struct.Struct("<HdHHI")
+# name length, value length
+_header_lengths = struct.Struct("<HI")
+
+
+class CachedResponse(EncodedValue):
+    """
+    The raw parts of an HTTP response as sent through ASGI, so it can be replayed
+    without calling the application again.
+    """
+
+    __slots__ = ("status_code", "headers", "body", "etag", "stored_at", "encoding")
+    encoding_tag = 1
+
+    def __init__(
+        self,
+        status_code: int,
+        headers: RawHeaders,
+        body: bytes,
+        etag: Optional[str] = None,
+        stored_at: Optional[float] = None,
+        encoding: Optional[str] = None,
+    ) -> None:
+        self.status_code: int = status_code
+        self.headers: RawHeaders = headers
+        self.body: bytes = body
+        self.etag: Optional[str] = etag
+        self.stored_at: Optional[float] = stored_at
+        # The content coding the body is stored with, the headers always describe
+        # the uncompressed body.
+        self.encoding: Optional[str] = encoding
+
+    def encode(self) -> Tuple[bytes, bytes]:
+        etag = (self.etag or "").encode("latin-1")
+        encoding = (self.encoding or "").encode("latin-1")
+        header = _response_header.pack(
+            self.status_code,
+            math.nan if self.stored_at is None else self.stored_at,
+            len(etag),
+            len(encoding),
+            len(self.headers),
+        )
+        return b"".join((header, etag, encoding, pack_headers(self.headers))), self.body
+
+    @classmethod
+    def decode(cls, data: memoryview) -> "CachedResponse":
+        (
+            status_code,
+            stored_at,
+            etag_length,
+            encoding_length,
+            header_count,
+        ) = _response_header.unpack_from(data)
+        etag_start = _response_header.size
+        encoding_start = etag_start + etag_length
+        headers_start = encoding_start + encoding_length
+        etag = bytes(data[etag_start:encoding_start]).decode("latin-1")
+        encoding = bytes(data[encoding_start:headers_start]).decode("latin-1")
+        headers, offset = unpack_headers(data, headers_start, header_count)
+        return cls(
+            status_code,
+            headers,
+            bytes(data[offset:]),
+            etag or None,
+            None if math.isnan(stored_at) else stored_at,
+            encoding or None,
+        )
+
+
+def pack_headers(headers: RawHeaders) -> bytes:
+    """
+    Encode raw headers as the lengths of each name and value followed by them.
+    """
+    parts = []
+    for name, value in headers:
+        parts.append(_header_lengths.pack(len(name), len(value)))
+        parts.append(name)
+        parts.append(value)
+    return b"".join(parts)
+
+
+def unpack_headers(data: memoryview, offset: int, count: int) -> Tuple[RawHeaders, int]:
+    """
+    Decode ``count`` headers encoded by ``pack_headers`` from ``offset`` on.
+    :return: The headers and the offset following them.
+    """
+    headers = []
+    for _ in range(count):
+        name_length, value_length = _header_lengths.unpack_from(data, offset)
+        name_start = offset + _header_lengths.size
+        value_start = name_start + name_length
+        offset = value_start + value_length
+        headers.append(
+            (bytes(data[name_start:value_start]), bytes(data[value_start:offset]))
+        )
+    return headers, offset
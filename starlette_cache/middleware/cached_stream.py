@@ -0,0 +1,32 @@
+from typing import List, Tuple
+
+
+class CachedStream:
+    """
+    A streamed response cached by the ``CacheMiddleware``. Only its status and
+    headers are kept here, the body is stored in segments under keys of their own,
+    so it is never held in memory as a whole.
+    """
+
+    __slots__ = ("status_code", "headers", "prefix", "segments", "size")
+
+    def __init__(
+        self,
+        status_code: int,
+        headers: List[Tuple[bytes, bytes]],
+        prefix: str,
+        segments: int,
+        size: int,
+    ) -> None:
+        self.status_code: int = status_code
+        self.headers: List[Tuple[bytes, bytes]] = headers
+        self.prefix: str = prefix
+        self.segments: int = segments
+        self.size: int = size
+
+    def segment_keys(self) -> List[str]:
+        return [segment_key(self.prefix, index) for index in range(self.segments)]
+
+
+def segment_key(prefix: str, index: int) -> str:
+    return f"{prefix}:{index}"
@@ -1,48 +1,222 @@
+import functools
 import hashlib
-from collections import OrderedDict
-from typing import List
-from urllib.parse import quote
+import operator
+from email.utils import parsedate_to_datetime
+from typing import Iterable, List, Mapping, Optional, Tuple
 
-from starlette.datastructures import URL
 from starlette.requests import Request
 
 
 def get_cache_key(request: Request) -> str:
-    return hashlib.md5(
-        f"{request.method}.{__get_repeatable_url(request.url)}".encode("utf-8")
-    ).hexdigest()
+    return hashlib.md5(_key_material(request)).hexdigest()
+
+
+def get_fast_cache_key(request: Request) -> str:
+    """
+    Like ``get_cache_key``, but hashed with BLAKE2b, which is faster than md5 for
+    short inputs. The keys have the same length, but differ from md5 keys.
+    """
+    return hashlib.blake2b(_key_material(request), digest_size=16).hexdigest()
 
 
 def get_cache_key_including_headers(request: Request, header_keys: List[str]) -> str:
-    url = __get_repeatable_url(request.url)
-    unsafe_header_string = ""
+    material = [_key_material(request)]
     for key in header_keys:
         value = request.headers.get(key)
         if value is not None:
-            if not unsafe_header_string:
-                unsafe_header_string = f"{key}:{value}"
-            else:
-                unsafe_header_string = f"{unsafe_header_string},{key}:{value}"
+            material.append(_field(key.lower().encode("latin-1")))
+            material.append(_field(value.encode("latin-1")))
+    return hashlib.md5(b" ".join(material)).hexdigest()
 
-    header_string = quote(unsafe_header_string)
-    return hashlib.md5(
-        f"{request.method}.{url}.{header_string}".encode("utf-8")
-    ).hexdigest()
 
-
-def __get_repeatable_url(url: URL):
-    return quote(
-        f"{url.scheme}://{url.hostname}/{url.path}{'?' if url.query else ''}"
-        f"{__sorted_query_params(url.query) if url.query else ''}"
+def _key_material(request: Request) -> bytes:
+    """
+    The parts of a request that identify its response, built straight from the
+    ASGI scope. The host and path are prefixed with their length, so no value can
+    be mistaken for another field and nothing needs to be quoted.
+    """
+    scope = request.scope
+    for name, value in scope.get("headers", ()):
+        if name == b"host":
+            host = value
+            break
+    else:
+        server = scope.get("server")
+        host = b"%s:%d" % (server[0].encode("latin-1"), server[1]) if server else b""
+    path = (scope.get("root_path", "") + scope["path"]).encode(
+        "utf-8", "surrogateescape"
+    )
+    return b"%s %s %s %s %s" % (
+        scope["method"].encode("latin-1"),
+        scope.get("scheme", "http").encode("latin-1"),
+        _field(host),
+        _field(path),
+        normalize_query_string(scope.get("query_string", b"")),
     )
 
 
-def __sorted_query_params(query_parameter_string: str):
-    params = OrderedDict()
+def _field(value: bytes) -> bytes:
+    return b"%d:%s" % (len(value), value)
+
+
+@functools.lru_cache(maxsize=1024)
+def normalize_query_string(query_string: bytes) -> bytes:
+    """
+    Sort the parameters of a raw query string by name, so the order they were sent
+    in does not matter. Repeated parameters keep their relative order, since it may
+    be significant, and parameters without a value are treated as having an empty
+    one. Results are memoized, as most requests repeat a few query strings.
+    """
+    if not query_string:
+        return b""
+    params = []
+    for param in query_string.lstrip(b"?").split(b"&"):
+        if param:
+            name, _, value = param.partition(b"=")
+            params.append((name, value))
+    # The sort is stable, so repeated parameters stay in order.
+    params.sort(key=operator.itemgetter(0))
+    return b"&".join([b"%s=%s" % param for param in params])
+
+
+def get_vary_headers(vary: str) -> Tuple[str, ...]:
+    """
+    Parse a Vary header into the sorted, lower cased names of the request headers it
+    lists, or ``("*",)`` if the response varies on more than request headers.
+    """
+    names = {name.strip().lower() for name in vary.split(",")}
+    names.discard("")
+    if "*" in names:
+        return ("*",)
+    return tuple(sorted(names))
+
+
+def get_vary_cache_key(
+    cache_key: str, request_headers: Mapping[str, str], vary: Iterable[str]
+) -> str:
+    """
+    Extend a cache key with the values of the request headers a response varies on,
+    normalized so equivalent values share a key.
+    :param cache_key: The cache key of the request, ignoring headers.
+    :param request_headers: The headers of the request.
+    :param vary: The lower cased names of the headers, as from ``get_vary_headers``.
+    """
+    material = [cache_key.encode("latin-1")]
+    for name in vary:
+        value = request_headers.get(name)
+        if value is None:
+            material.append(b"%s!" % _field(name.encode("latin-1")))
+        else:
+            normalized = normalize_header_value(name, value).encode("latin-1")
+            material.append(
+                b"%s=%s" % (_field(name.encode("latin-1")), _field(normalized))
+            )
+    return hashlib.md5(b" ".join(material)).hexdigest()
+
+
+def normalize_header_value(name: str, value: str) -> str:
+    """
+    Collapse equivalent values of a request header, e.g. Accept-Encoding values
+    listing the same codings in another order.
+    :param name: The lower cased name of the header.
+    """
+    if name == "accept-encoding":
+        # Only codings the client accepts matter, in no particular order.
+        codings = {coding.strip() for coding, q in _weighted_items(value) if q > 0}
+        return ",".join(sorted(codings))
+    if name == "accept-language":
+        # Languages in order of preference, without the weights themselves.
+        languages = sorted(
+            (item for item in _weighted_items(value) if item[1] > 0),
+            key=lambda item: -item[1],
+        )
+        return ",".join(language.strip() for language, _ in languages)
+    return " ".join(value.split())
+
+
+def _weighted_items(value: str) -> List[Tuple[str, float]]:
+    items = []
+    for item in value.lower().split(","):
+        token, _, params = item.partition(";")
+        if token.strip():
+            items.append((token.strip(), __quality(params)))
+    return items
+
+
+def get_path_tags(request: Request) -> List[str]:
+    """
+    Tag a response with the path of the request, so every cached variant of the
+    path, e.g. with different query strings, can be invalidated together.
+    """
+    return [request.url.path]
+
+
+def accepts_encoding(accept_encoding: str, encoding: str) -> bool:
+    """
+    Whether an Accept-Encoding header allows a content coding, as described in
+    RFC 7231.
+    :param accept_encoding: The value of the Accept-Encoding header.
+    :param encoding: The content coding, e.g. gzip.
+    """
+    wildcard = False
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip()
+        if coding not in (encoding, "*"):
+            continue
+        accepted = __quality(params) > 0
+        if coding == encoding:
+            return accepted
+        wildcard = accepted
+    return wildcard
+
+
+def __quality(params: str) -> float:
+    for param in params.split(";"):
+        name, _, value = param.partition("=")
+        if name.strip() == "q":
+            try:
+                return float(value)
+            except ValueError:
+                return 0
+    return 1
+
+
+def get_etag(body: bytes) -> str:
+    return f'"{hashlib.md5(body).hexdigest()}"'
+
+
+def is_not_modified(
+    request_headers: Mapping[str, str],
+    etag: Optional[str],
+    last_modified: Optional[float],
+) -> bool:
+    """
+    Evaluate the If-None-Match and If-Modified-Since headers of a request against a
+    cached response, as described in RFC 7232.
+    :param request_headers: The headers of the request.
+    :param etag: The ETag of the cached response, if any.
+    :param last_modified: The timestamp the cached response was last modified, if any.
+    :return: Whether a 304 Not Modified response can be sent instead.
+    """
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        if etag is None:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        # If-None-Match uses the weak comparison function.
+        tags = {__strip_weak(tag.strip()) for tag in if_none_match.split(",")}
+        return __strip_weak(etag) in tags
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since is not None and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(last_modified) <= since
+    return False
+
 
-    param_list = query_parameter_string.lstrip("?").split("&")
-    param_list.sort(key=lambda x: x.split("=")[0])
-    for param_string in param_list:
-        param_key_and_val = param_string.split("=")
-        params[param_key_and_val[0]] = param_key_and_val[1]
-    return "&".join([f"{key}={value}" for (key, value) in params.items()])
+def __strip_weak(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
@@ -0,0 +1,42 @@
+from starlette_cache.backends.admission import CountMinSketch, TinyLFU
+
+
+def test_sketch_estimates_counts():
+    sketch = CountMinSketch(1024)
+    for _ in range(5):
+        sketch.increment("hot")
+    sketch.increment("cold")
+    assert sketch.estimate("hot") == 5
+    assert sketch.estimate("cold") == 1
+    assert sketch.estimate("unseen") == 0
+
+
+def test_sketch_counters_saturate():
+    sketch = CountMinSketch(1024, sample_size=1000)
+    for _ in range(100):
+        sketch.increment("hot")
+    assert sketch.estimate("hot") == 15
+
+
+def test_sketch_halves_counters_after_sample_size():
+    sketch = CountMinSketch(1024, sample_size=8)
+    for _ in range(7):
+        sketch.increment("hot")
+    assert sketch.estimate("hot") == 7
+    sketch.increment("hot")
+    assert sketch.estimate("hot") == 4
+    assert sketch.additions == 4
+
+
+def test_sketch_width_is_a_power_of_two():
+    assert CountMinSketch(1000).width == 1024
+    assert len(CountMinSketch(1000, depth=2).table) == 2048
+
+
+def test_tiny_lfu_admits_more_frequent_candidates():
+    policy = TinyLFU(1024)
+    policy.record("victim")
+    policy.record("candidate")
+    assert not policy.admit("candidate", "victim")
+    policy.record("candidate")
+    assert policy.admit("candidate", "victim")
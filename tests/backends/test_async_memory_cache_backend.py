@@ -0,0 +1,231 @@
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from starlette_cache.backends.admission import TinyLFU
+from starlette_cache.backends.async_memory_cache_backend import AsyncMemoryCacheBackend
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    def __init__(self):
+        super().__init__(max_workers=1)
+        self.submitted = 0
+
+    def submit(self, *args, **kwargs):
+        self.submitted += 1
+        return super().submit(*args, **kwargs)
+
+
+@pytest.mark.asyncio
+class TestAsyncMemoryCacheBackend:
+    async def test_get_from_cache(self):
+        backend = AsyncMemoryCacheBackend("test_async_get")
+        await backend.set("key", {"a": 1}, 100)
+        assert await backend.get("key") == {"a": 1}
+
+    async def test_get_expired_returns_default(self):
+        backend = AsyncMemoryCacheBackend("test_async_expired")
+        await backend.set("key", "value", -1)
+        assert await backend.get("key", "default") == "default"
+        assert backend.stats()["entries"] == 0
+
+    async def test_add_only_sets_missing_keys(self):
+        backend = AsyncMemoryCacheBackend("test_async_add")
+        assert await backend.add("key", 1)
+        assert not await backend.add("key", 2)
+        assert await backend.get("key") == 1
+
+    async def test_evicts_least_recently_used_over_max_entries(self):
+        backend = AsyncMemoryCacheBackend("test_async_max_entries", max_entries=2)
+        await backend.set("a", 1)
+        await backend.set("b", 2)
+        await backend.get("a")
+        await backend.set("c", 3)
+        assert await backend.get("b") is None
+        assert await backend.get("a") == 1
+        assert backend.stats()["evictions"] == 1
+
+    async def test_limits_are_shared_by_name(self):
+        AsyncMemoryCacheBackend("test_async_shared_limits", max_entries=2)
+        backend = AsyncMemoryCacheBackend("test_async_shared_limits")
+        for i in range(10):
+            await backend.set(str(i), i)
+        assert backend.stats()["entries"] == 2
+        assert await backend.get("9") == 9
+
+    async def test_admission_rejects_infrequent_entries(self):
+        backend = AsyncMemoryCacheBackend(
+            "test_async_admission", max_entries=1, admission=TinyLFU(1024)
+        )
+        await backend.get("a")
+        await backend.get("a")
+        await backend.set("a", 1)
+        await backend.get("b")
+        await backend.set("b", 2)
+        assert await backend.get("b") is None
+        assert await backend.get("a") == 1
+        assert backend.stats()["rejections"] == 1
+
+    async def test_sweeper_task_removes_expired_entries(self):
+        backend = AsyncMemoryCacheBackend("test_async_sweeper")
+        await backend.set("expired", 1, -1)
+        await backend.set("fresh", 1, 10000)
+        backend.start_sweeper(interval=0.01)
+        try:
+            for _ in range(500):
+                if backend.stats()["entries"] == 1:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await backend.stop_sweeper()
+        assert backend.stats()["entries"] == 1
+        assert await backend.get("fresh") == 1
+
+    async def test_offloads_serialization_of_large_payloads(self):
+        executor = CountingExecutor()
+        backend = AsyncMemoryCacheBackend(
+            "test_async_offload", offload_threshold=1024, executor=executor
+        )
+        await backend.set("small", b"a" * 10)
+        assert await backend.get("small") == b"a" * 10
+        assert executor.submitted == 0
+        await backend.set("large", b"a" * 2048)
+        assert await backend.get("large") == b"a" * 2048
+        assert executor.submitted == 2
+        executor.shutdown()
+
+    async def test_offloads_first_store_of_large_objects(self):
+        executor = CountingExecutor()
+        backend = AsyncMemoryCacheBackend(
+            "test_async_offload_objects", offload_threshold=1024, executor=executor
+        )
+        await backend.set("small", {"a": [1, 2, 3]})
+        assert executor.submitted == 0
+        await backend.set("large", {"rows": [{"name": "x" * 10} for _ in range(200)]})
+        assert executor.submitted == 1
+        executor.shutdown()
+
+    async def test_estimates_self_referencing_and_sprawling_objects(self):
+        executor = CountingExecutor()
+        backend = AsyncMemoryCacheBackend(
+            "test_async_offload_cycles", offload_threshold=10**9, executor=executor
+        )
+        cycle = []
+        cycle.append(cycle)
+        mapping = {"a": 1}
+        mapping["self"] = mapping
+        await backend.set("cycles", [cycle, mapping, mapping])
+        assert executor.submitted == 0
+        cached = await backend.get("cycles")
+        assert cached[0][0] is cached[0] and cached[1]["self"] is cached[1]
+        await backend.set("sprawling", [None] * 20_000)
+        assert executor.submitted == 1
+        executor.shutdown()
+
+    async def test_concurrent_tasks_share_entries(self):
+        backend = AsyncMemoryCacheBackend("test_async_concurrent")
+
+        async def _set_and_get(i):
+            await backend.set(f"key_{i}", i)
+            await asyncio.sleep(0)
+            return await backend.get(f"key_{i}")
+
+        results = await asyncio.gather(*(_set_and_get(i) for i in range(100)))
+        assert results == list(range(100))
+
+    async def test_soft_ttl_serves_stale_values_until_hard_ttl(self):
+        backend = AsyncMemoryCacheBackend("test_async_soft_ttl")
+        await backend.set_soft("stale", "value", -10, 10000)
+        assert await backend.get("stale") is None
+        value, staleness = await backend.get_soft("stale")
+        assert value == "value"
+        assert staleness >= 10
+        await backend.set_soft("fresh", "value", 10000, 20000)
+        assert await backend.get_soft("fresh") == ("value", None)
+
+    async def test_get_with_ttl_returns_time_until_stale(self):
+        backend = AsyncMemoryCacheBackend("test_async_get_with_ttl")
+        await backend.set("key", "value", 100)
+        await backend.set_soft("stale", "value", -10, 100)
+        value, ttl = await backend.get_with_ttl("key")
+        assert value == "value"
+        assert 99 < ttl <= 100
+        assert await backend.get_with_ttl("stale", "default") == ("default", None)
+
+    async def test_batch_operations(self):
+        backend = AsyncMemoryCacheBackend("test_async_batch")
+        await backend.set_many({"a": 1, "b": 2, "c": 3}, 100)
+        await backend.set_soft("stale", 1, -1, 100)
+        assert await backend.get_many(["a", "b", "stale", "missing"]) == {
+            "a": 1,
+            "b": 2,
+        }
+        await backend.delete_many(["a", "b"])
+        assert await backend.get_many(["a", "b", "c"]) == {"c": 3}
+
+    async def test_invalidate_tag_deletes_tagged_entries(self):
+        backend = AsyncMemoryCacheBackend("test_async_tags")
+        await backend.set_many({"a": 1, "b": 2}, 100)
+        await backend.tag("a", ["tag"])
+        assert await backend.invalidate_tag("tag") == ["a"]
+        assert await backend.get_many(["a", "b"]) == {"b": 2}
+
+    async def test_load_restores_dumped_entries(self, tmp_path):
+        path = str(tmp_path / "snapshot")
+        backend = AsyncMemoryCacheBackend("test_async_dump")
+        await backend.set_many({"a": 1, "b": 2}, 100)
+        await backend.set("expired", 3, -1)
+        await backend.tag("a", ["tag"])
+        assert await backend.dump(path) == 2
+
+        restored = AsyncMemoryCacheBackend("test_async_load")
+        await restored.set("b", "newer")
+        assert await restored.load(path, batch_size=1) == 1
+        assert await restored.get_many(["a", "b", "expired"]) == {"a": 1, "b": "newer"}
+        assert await restored.invalidate_tag("tag") == ["a"]
+
+    async def test_load_counts_only_stored_entries(self, tmp_path):
+        path = str(tmp_path / "snapshot")
+        backend = AsyncMemoryCacheBackend("test_async_dump_rejected")
+        await backend.set_many({"a": 1, "b": 2, "c": 3}, 100)
+        await backend.dump(path)
+
+        restored = AsyncMemoryCacheBackend(
+            "test_async_load_rejected", max_entries=1, admission=TinyLFU(1024)
+        )
+        assert await restored.load(path) == 1
+        assert restored.stats()["entries"] == 1
+
+    async def test_stop_snapshots_dumps_once_more(self, tmp_path):
+        path = str(tmp_path / "snapshot")
+        backend = AsyncMemoryCacheBackend("test_async_snapshots")
+        backend.start_snapshots(path, interval=60)
+        await backend.set("key", "value")
+        await backend.stop_snapshots()
+        assert (
+            await AsyncMemoryCacheBackend("test_async_snapshots_loaded").load(path) == 1
+        )
+
+
+def test_is_safe_to_use_from_several_threads():
+    # Switch threads as often as possible, so unlocked updates would interleave.
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    backend = AsyncMemoryCacheBackend("test_async_threads", max_entries=50)
+
+    async def _use(offset):
+        for i in range(2000):
+            key = str((i * 7 + offset) % 100)
+            await backend.set(key, i)
+            await backend.get(key)
+
+    try:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [executor.submit(asyncio.run, _use(n)) for n in range(8)]
+            for future in futures:
+                future.result()
+    finally:
+        sys.setswitchinterval(switch_interval)
+    assert backend.stats()["entries"] <= 50
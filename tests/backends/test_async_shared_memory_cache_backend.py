@@ -0,0 +1,74 @@
+import asyncio
+import pickle
+
+import pytest
+
+from starlette_cache.backends.async_shared_memory_cache_backend import (
+    AsyncSharedMemoryCacheBackend,
+)
+from starlette_cache.backends.shared_memory_cache_backend import (
+    SharedMemoryCacheBackend,
+)
+
+
+@pytest.fixture
+async def backend(tmp_path):
+    backend = AsyncSharedMemoryCacheBackend(
+        "test", slots=64, slot_size=256, path=str(tmp_path / "cache")
+    )
+    yield backend
+    await backend.close()
+
+
+@pytest.mark.asyncio
+class TestAsyncSharedMemoryCacheBackend:
+    async def test_get_from_cache(self, backend):
+        await backend.set("key", {"a": 1}, 100)
+        assert await backend.get("key") == {"a": 1}
+        assert await backend.get("missing", "default") == "default"
+
+    async def test_add_only_sets_missing_keys(self, backend):
+        assert await backend.add("key", 1)
+        assert not await backend.add("key", 2)
+        assert await backend.get("key") == 1
+
+    async def test_delete(self, backend):
+        await backend.set("key", 1)
+        await backend.delete("key")
+        assert await backend.get("key") is None
+
+    async def test_soft_ttl_serves_stale_values(self, backend):
+        await backend.set_soft("key", "value", -5, 100)
+        assert await backend.get("key") is None
+        value, staleness = await backend.get_soft("key")
+        assert value == "value"
+        assert staleness == pytest.approx(5, abs=1)
+
+    async def test_shares_entries_with_sync_backend(self, backend):
+        sync_backend = SharedMemoryCacheBackend(
+            "test", slots=64, slot_size=256, path=backend.path
+        )
+        sync_backend.set("key", "value")
+        assert await backend.get("key") == "value"
+        async with backend.view("key") as data:
+            assert data is not None
+        sync_backend.close()
+
+    async def test_writes_while_a_view_is_open(self, backend):
+        await backend.set("key", b"value")
+
+        async def hold_view():
+            async with backend.view("key") as data:
+                await asyncio.sleep(0.1)
+                return bytes(data)
+
+        async def write():
+            await backend.set("other", 1)
+            return await backend.get("other")
+
+        results = await asyncio.wait_for(asyncio.gather(hold_view(), write()), 5)
+        assert results == [pickle.dumps(b"value", pickle.HIGHEST_PROTOCOL), 1]
+
+    async def test_view_of_missing_key(self, backend):
+        async with backend.view("missing") as data:
+            assert data is None
@@ -0,0 +1,57 @@
+import pytest
+
+from starlette_cache.backends.async_memory_cache_backend import AsyncMemoryCacheBackend
+from starlette_cache.backends.async_two_tier_cache_backend import (
+    AsyncTwoTierCacheBackend,
+)
+
+
+@pytest.fixture
+def l2(request):
+    yield AsyncMemoryCacheBackend(f"test_async_two_tier_l2_{request.node.name}")
+
+
+@pytest.fixture
+def backend(l2, request):
+    yield AsyncTwoTierCacheBackend(
+        f"test_async_two_tier_{request.node.name}", l2, l1_ttl=60
+    )
+
+
+@pytest.mark.asyncio
+class TestAsyncTwoTierCacheBackend:
+    async def test_serves_hits_from_l1(self, backend, l2):
+        await backend.set("key", "value", 100)
+        await l2.delete("key")
+        assert await backend.get("key") == "value"
+
+    async def test_caps_l1_ttl_at_remaining_l2_ttl(self, backend, l2):
+        await l2.set("short", "value", 2)
+        assert await backend.get("short") == "value"
+        _, ttl = await backend.l1.get_with_ttl("short")
+        assert ttl <= 2
+
+    async def test_add_only_sets_missing_keys(self, backend):
+        assert await backend.add("key", 1)
+        assert not await backend.add("key", 2)
+        assert await backend.get("key") == 1
+
+    async def test_delete_awaits_invalidation_hook(self, l2, request):
+        deleted = []
+
+        async def publish(key):
+            deleted.append(key)
+
+        backend = AsyncTwoTierCacheBackend(
+            f"test_async_two_tier_{request.node.name}", l2, on_delete=publish
+        )
+        await backend.set("key", "value")
+        await backend.delete("key")
+        assert await backend.get("key") is None
+        assert deleted == ["key"]
+
+    async def test_invalidate_only_drops_l1(self, backend, l2):
+        await backend.set("key", "value", 100)
+        await l2.set("key", "changed", 100)
+        await backend.invalidate("key")
+        assert await backend.get("key") == "changed"
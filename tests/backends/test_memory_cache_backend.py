@@ -1,7 +1,10 @@
+import pickle
+import time
 from unittest.mock import patch, MagicMock
 
 import pytest
 
+from starlette_cache.backends.admission import TinyLFU
 from starlette_cache.backends.memory_cache_backend import MemoryCacheBackend
 
 
@@ -49,9 +52,9 @@ class TestMemoryCacheBackend:
         ordered_dict_mock = MagicMock()
         od_mock.return_value = ordered_dict_mock
         backend.set(self.TEST_KEY, "value", -1)
-        assert len(backend._MemoryCacheBackend__cache) == 1
+        assert len(backend._MemoryCacheBackend__store) == 1
         assert backend.get(self.TEST_KEY) is None
-        assert len(backend._MemoryCacheBackend__cache) == 0
+        assert len(backend._MemoryCacheBackend__store) == 0
 
     @patch("threading.Lock")
     def test_set_calls_lock(self, lock_mock, backend):
@@ -80,3 +83,236 @@ class TestMemoryCacheBackend:
         assert cache_value is not None
         backend.delete(self.TEST_KEY)
         assert backend.get(self.TEST_KEY) is None
+
+    def test_evicts_least_recently_used_over_max_entries(self):
+        backend = MemoryCacheBackend("test_max_entries", max_entries=2)
+        backend.set("a", 1)
+        backend.set("b", 2)
+        backend.get("a")
+        backend.set("c", 3)
+        assert backend.get("a") == 1
+        assert backend.get("b") is None
+        assert backend.get("c") == 3
+        assert backend.stats()["evictions"] == 1
+
+    def test_limits_are_shared_by_name(self):
+        MemoryCacheBackend("test_shared_limits", max_entries=2, max_bytes=10_000)
+        backend = MemoryCacheBackend("test_shared_limits")
+        for i in range(10):
+            backend.set(str(i), i)
+        assert backend.stats()["entries"] == 2
+        assert backend.get("9") == 9
+        backend.set("large", b"a" * 20_000)
+        assert backend.get("large") is None
+
+    def test_evicts_least_recently_used_over_max_bytes(self):
+        size = len(pickle.dumps("a" * 100, MemoryCacheBackend.pickle_protocol))
+        backend = MemoryCacheBackend("test_max_bytes", max_bytes=size * 2)
+        backend.set("a", "a" * 100)
+        backend.set("b", "b" * 100)
+        backend.set("c", "c" * 100)
+        assert backend.get("a") is None
+        assert backend.stats() == {"entries": 2, "bytes": size * 2, "evictions": 1}
+
+    def test_admission_keeps_frequent_entries(self):
+        backend = MemoryCacheBackend(
+            "test_admission", max_entries=2, admission=TinyLFU(1024)
+        )
+        for key in ("a", "b"):
+            for _ in range(3):
+                backend.get(key)
+            backend.set(key, key)
+        # Looked up once, so not worth evicting "a" for.
+        backend.get("scan")
+        backend.set("scan", "scan")
+        assert backend.get("scan") is None
+        assert backend.get("a") == "a"
+        assert backend.stats()["rejections"] == 1
+        for _ in range(5):
+            backend.get("new")
+        backend.set("new", "new")
+        assert backend.get("new") == "new"
+        assert backend.get("b") is None
+        assert backend.stats()["evictions"] == 1
+
+    def test_admission_does_not_reject_overwrites(self):
+        backend = MemoryCacheBackend(
+            "test_admission_overwrite", max_entries=1, admission=TinyLFU(1024)
+        )
+        backend.set("a", 1)
+        backend.set("a", 2)
+        assert backend.get("a") == 2
+
+    def test_does_not_store_value_larger_than_max_bytes(self):
+        backend = MemoryCacheBackend("test_too_large", max_bytes=10)
+        backend.set("a", "a" * 100)
+        assert backend.get("a") is None
+        assert backend.stats()["entries"] == 0
+
+    def test_overwrite_and_delete_track_bytes(self):
+        backend = MemoryCacheBackend("test_bytes")
+        backend.set("a", "a" * 100)
+        backend.set("a", "a")
+        assert backend.stats()["bytes"] == len(
+            pickle.dumps("a", MemoryCacheBackend.pickle_protocol)
+        )
+        backend.delete("a")
+        assert backend.stats()["bytes"] == 0
+
+    def test_sweep_removes_expired_entries_without_reads(self):
+        backend = MemoryCacheBackend("test_sweep")
+        for i in range(5):
+            backend.set(f"expired_{i}", i, -1)
+        backend.set("fresh", 1, 10000)
+        assert backend.sweep(limit=2) == 2
+        assert backend.stats()["entries"] == 4
+        assert backend.sweep() == 3
+        assert backend.stats()["entries"] == 1
+        assert backend.get("fresh") == 1
+
+    def test_sweep_skips_overwritten_entries(self):
+        backend = MemoryCacheBackend("test_sweep_overwritten")
+        backend.set("key", 1, -1)
+        backend.set("key", 2, 10000)
+        backend.sweep()
+        assert backend.get("key") == 2
+
+    def test_sweeper_thread_removes_expired_entries(self):
+        backend = MemoryCacheBackend("test_sweeper_thread")
+        backend.set("key", 1, -1)
+        backend.start_sweeper(interval=0.01)
+        try:
+            deadline = time.time() + 5
+            while backend.stats()["entries"] and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            backend.stop_sweeper()
+        assert backend.stats()["entries"] == 0
+
+    def test_soft_ttl_serves_stale_values_until_hard_ttl(self):
+        backend = MemoryCacheBackend("test_soft_ttl")
+        backend.set_soft("stale", "value", -10, 10000)
+        backend.set_soft("fresh", "value", 10000, 20000)
+        backend.set_soft("expired", "value", -10, -1)
+        assert backend.get("stale") is None
+        value, staleness = backend.get_soft("stale")
+        assert value == "value"
+        assert staleness >= 10
+        assert backend.get_soft("fresh") == ("value", None)
+        assert backend.get("fresh") == "value"
+        assert backend.get_soft("expired", "default") == ("default", None)
+
+    def test_add_replaces_stale_values(self):
+        backend = MemoryCacheBackend("test_soft_ttl_add")
+        backend.set_soft(self.TEST_KEY, 1, -10, 10000)
+        assert backend.add(self.TEST_KEY, 2)
+        assert backend.get(self.TEST_KEY) == 2
+
+    def test_get_with_ttl_returns_time_until_stale(self):
+        backend = MemoryCacheBackend("test_get_with_ttl")
+        backend.set("key", "value", 100)
+        backend.set_soft("soft", "value", 10, 100)
+        backend.set_soft("stale", "value", -10, 100)
+        value, ttl = backend.get_with_ttl("key")
+        assert value == "value"
+        assert 99 < ttl <= 100
+        assert 9 < backend.get_with_ttl("soft")[1] <= 10
+        assert backend.get_with_ttl("stale", "default") == ("default", None)
+
+    def test_batch_operations_take_lock_once(self):
+        backend = MemoryCacheBackend("test_batch")
+        with patch.object(backend, "_MemoryCacheBackend__lock") as lock:
+            backend.set_many({"a": 1, "b": 2, "c": 3}, 100)
+            assert backend.get_many(["a", "b", "missing"]) == {"a": 1, "b": 2}
+            backend.delete_many(["a", "b"])
+            assert lock.__enter__.call_count == 3
+        assert backend.get_many(["a", "b", "c"]) == {"c": 3}
+
+    def test_get_many_skips_expired_and_stale_values(self):
+        backend = MemoryCacheBackend("test_batch_expired")
+        backend.set_many({"expired": 1}, -1)
+        backend.set_soft("stale", 1, -1, 100)
+        assert backend.get_many(["expired", "stale"]) == {}
+        assert backend.stats()["entries"] == 1
+
+    def test_invalidate_tag_deletes_tagged_entries(self):
+        backend = MemoryCacheBackend("test_tags")
+        backend.set_many({"a": 1, "b": 2, "c": 3}, 100)
+        backend.tag("a", ["/items/1", "items"])
+        backend.tag("b", ["/items/1"])
+        backend.tag("missing", ["/items/1"])
+        assert sorted(backend.invalidate_tag("/items/1")) == ["a", "b"]
+        assert backend.get_many(["a", "b", "c"]) == {"c": 3}
+        assert backend.invalidate_tag("/items/1") == []
+        store = backend._MemoryCacheBackend__store
+        assert store.tags == {} and store.key_tags == {}
+
+    def test_evicted_entries_leave_tag_index(self):
+        backend = MemoryCacheBackend("test_tags_evicted", max_entries=1)
+        backend.set("a", 1)
+        backend.tag("a", ["tag"])
+        backend.set("b", 2)
+        store = backend._MemoryCacheBackend__store
+        assert store.tags == {} and store.key_tags == {}
+
+    def test_load_restores_dumped_entries(self, tmp_path):
+        path = str(tmp_path / "snapshot")
+        backend = MemoryCacheBackend("test_dump")
+        backend.set("a", {"a": 1}, 100)
+        backend.set_soft("stale", "value", -5, 100)
+        backend.set("expired", 1, -1)
+        backend.set("tagged", 2, 100)
+        backend.tag("tagged", ["tag"])
+        assert backend.dump(path) == 3
+
+        restored = MemoryCacheBackend("test_load")
+        assert restored.load(path) == 3
+        assert restored.get("a") == {"a": 1}
+        assert restored.get_with_ttl("a")[1] == pytest.approx(100, abs=1)
+        assert restored.get_soft("stale")[1] == pytest.approx(5, abs=1)
+        assert restored.get("expired") is None
+        assert restored.invalidate_tag("tag") == ["tagged"]
+
+    def test_load_keeps_recency_and_newer_entries(self, tmp_path):
+        path = str(tmp_path / "snapshot")
+        backend = MemoryCacheBackend("test_dump_recency")
+        backend.set_many({"a": 1, "b": 2, "c": 3}, 100)
+        backend.get("a")
+        backend.dump(path)
+
+        restored = MemoryCacheBackend("test_load_recency", max_entries=2)
+        assert restored.load(path, batch_size=1) == 3
+        assert restored.get_many(["a", "b", "c"]) == {"a": 1, "c": 3}
+        restored = MemoryCacheBackend("test_load_newer")
+        restored.set("c", "newer")
+        assert restored.load(path) == 2
+        assert restored.get("c") == "newer"
+
+    def test_load_counts_only_stored_entries(self, tmp_path):
+        path = str(tmp_path / "snapshot")
+        backend = MemoryCacheBackend("test_dump_rejected")
+        backend.set_many({"a": 1, "b": 2}, 100)
+        backend.set("large", "x" * 1000, 100)
+        backend.tag("large", ["tag"])
+        backend.dump(path)
+
+        restored = MemoryCacheBackend("test_load_too_large", max_bytes=500)
+        assert restored.load(path) == 2
+        assert restored.invalidate_tag("tag") == []
+        restored = MemoryCacheBackend(
+            "test_load_rejected", max_entries=1, admission=TinyLFU(1024)
+        )
+        assert restored.load(path) == 1
+        assert restored.stats()["entries"] == 1
+
+    def test_load_missing_snapshot(self, tmp_path):
+        backend = MemoryCacheBackend("test_load_missing")
+        assert backend.load(str(tmp_path / "missing")) == 0
+
+    def test_stop_snapshots_dumps_once_more(self, tmp_path):
+        path = str(tmp_path / "snapshot")
+        backend = MemoryCacheBackend("test_snapshots")
+        backend.start_snapshots(path, interval=60)
+        backend.set("key", "value")
+        backend.stop_snapshots()
+        assert MemoryCacheBackend("test_snapshots_loaded").load(path) == 1
@@ -0,0 +1,236 @@
+import asyncio
+import time
+import types
+
+import pytest
+
+from starlette_cache.backends import redis_cache_backend
+from starlette_cache.backends.redis_cache_backend import RedisCacheBackend
+
+
+class FakeRedis:
+    """
+    A stand-in for an aioredis 1.3 pool, backed by a dict with server-side expiry.
+    Counts round trips to the "server".
+    """
+
+    SET_IF_NOT_EXIST = "SET_IF_NOT_EXIST"
+
+    def __init__(self):
+        self.data = {}
+        self.round_trips = 0
+        self.closed = False
+
+    def _alive(self, key):
+        value, expires_at = self.data.get(key, (None, None))
+        if expires_at is not None and expires_at <= time.time():
+            del self.data[key]
+            return None
+        return value
+
+    def _set(self, key, value, pexpire=0, exist=None):
+        if exist == self.SET_IF_NOT_EXIST and self._alive(key) is not None:
+            return False
+        expires_at = time.time() + pexpire / 1000 if pexpire else None
+        self.data[key] = (value, expires_at)
+        return True
+
+    def _delete(self, *keys):
+        keys = [key.decode() if isinstance(key, bytes) else key for key in keys]
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    async def get(self, key):
+        self.round_trips += 1
+        return self._alive(key)
+
+    async def mget(self, key, *keys):
+        self.round_trips += 1
+        return [self._alive(k) for k in (key, *keys)]
+
+    async def set(self, key, value, *, pexpire=0, exist=None):
+        self.round_trips += 1
+        return self._set(key, value, pexpire, exist)
+
+    async def delete(self, key, *keys):
+        self.round_trips += 1
+        return self._delete(key, *keys)
+
+    async def eval(self, script, keys=(), args=()):
+        # Only the backend's tagging script is run through here.
+        assert script == redis_cache_backend._TAG_SCRIPT
+        self.round_trips += 1
+        key, *tag_keys = keys
+        if self._alive(key) is None:
+            return 0
+        _, expires_at = self.data[key]
+        for tag_key in tag_keys:
+            members = self._alive(tag_key)
+            if members is None:
+                members, set_expires_at = set(), 0
+            else:
+                set_expires_at = self.data[tag_key][1]
+            if expires_at is None or set_expires_at is None:
+                set_expires_at = None
+            else:
+                set_expires_at = max(set_expires_at, expires_at)
+            self.data[tag_key] = (members | {key.encode()}, set_expires_at)
+        return 1
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def multi_exec(self):
+        return FakePipeline(self)
+
+    def close(self):
+        self.closed = True
+
+    async def wait_closed(self):
+        pass
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def get(self, key):
+        self.commands.append(lambda: self.redis._alive(key))
+
+    def pttl(self, key):
+        def _pttl():
+            if self.redis._alive(key) is None:
+                return -2
+            _, expires_at = self.redis.data[key]
+            return -1 if expires_at is None else int((expires_at - time.time()) * 1000)
+
+        self.commands.append(_pttl)
+
+    def set(self, key, value, *, pexpire=0, exist=None):
+        self.commands.append(lambda: self.redis._set(key, value, pexpire, exist))
+
+    def smembers(self, key):
+        self.commands.append(lambda: list(self.redis._alive(key) or ()))
+
+    def delete(self, key, *keys):
+        self.commands.append(lambda: self.redis._delete(key, *keys))
+
+    async def execute(self):
+        self.redis.round_trips += 1
+        return [command() for command in self.commands]
+
+
+@pytest.fixture
+def redis():
+    yield FakeRedis()
+
+
+@pytest.fixture
+def backend(redis):
+    yield RedisCacheBackend(redis=redis, key_prefix="test:")
+
+
+@pytest.mark.asyncio
+class TestRedisCacheBackend:
+    async def test_get_from_cache(self, backend, redis):
+        await backend.set("key", {"a": 1}, 100)
+        assert await backend.get("key") == {"a": 1}
+        assert "test:key" in redis.data
+
+    async def test_get_missing_returns_default(self, backend):
+        assert await backend.get("missing", "default") == "default"
+
+    async def test_ttl_is_kept_by_server(self, backend, redis):
+        await backend.set("key", "value", 100)
+        _, expires_at = redis.data["test:key"]
+        assert expires_at == pytest.approx(time.time() + 100, abs=1)
+
+    async def test_set_with_expired_ttl_deletes(self, backend, redis):
+        await backend.set("key", "value", 100)
+        await backend.set("key", "value", -1)
+        assert await backend.get("key") is None
+        assert redis.data == {}
+
+    async def test_add_only_sets_missing_keys(self, backend):
+        assert await backend.add("key", 1)
+        assert not await backend.add("key", 2)
+        assert await backend.get("key") == 1
+
+    async def test_delete(self, backend):
+        await backend.set("key", 1)
+        await backend.delete("key")
+        assert await backend.get("key") is None
+
+    async def test_soft_ttl_returns_stale_values(self, backend, redis):
+        await backend.set_soft("key", "value", -5, 100)
+        assert await backend.get("key", "default") == "default"
+        value, staleness = await backend.get_soft("key")
+        assert value == "value"
+        assert staleness == pytest.approx(5, abs=1)
+        _, expires_at = redis.data["test:key"]
+        assert expires_at == pytest.approx(time.time() + 100, abs=1)
+
+    async def test_get_with_ttl_uses_one_round_trip(self, backend, redis):
+        await backend.set("key", "value", 100)
+        value, ttl = await backend.get_with_ttl("key")
+        assert redis.round_trips == 2
+        assert value == "value"
+        assert ttl == pytest.approx(100, abs=1)
+        await backend.set_soft("soft", "value", 10, 100)
+        _, ttl = await backend.get_with_ttl("soft")
+        assert ttl == pytest.approx(10, abs=1)
+        assert await backend.get_with_ttl("missing", "default") == ("default", None)
+
+    async def test_multi_key_operations_use_one_round_trip(self, backend, redis):
+        await backend.set_many({"a": 1, "b": 2, "c": 3}, 100)
+        assert redis.round_trips == 1
+        assert await backend.get_many(["a", "b", "missing"]) == {"a": 1, "b": 2}
+        assert redis.round_trips == 2
+        await backend.delete_many(["a", "b"])
+        assert redis.round_trips == 3
+        assert await backend.get_many(["a", "b", "c"]) == {"c": 3}
+
+    async def test_invalidate_tag_deletes_tagged_keys(self, backend, redis):
+        await backend.set_many({"a": 1, "b": 2, "c": 3}, 100)
+        await backend.tag("a", ["/items/1", "items"])
+        await backend.tag("b", ["/items/1"])
+        assert sorted(await backend.invalidate_tag("/items/1")) == ["a", "b"]
+        assert await backend.get_many(["a", "b", "c"]) == {"c": 3}
+        assert "test:tag:/items/1" not in redis.data
+        assert await backend.invalidate_tag("/items/1") == []
+
+    async def test_tag_sets_expire_with_their_longest_lived_key(self, backend, redis):
+        await backend.set("a", 1, 100)
+        await backend.set("b", 2, 10)
+        await backend.tag("a", ["items"])
+        await backend.tag("b", ["items"])
+        round_trips = redis.round_trips
+        await backend.tag("missing", ["items", "missing"])
+        assert redis.round_trips == round_trips + 1
+        members, expires_at = redis.data["test:tag:items"]
+        assert members == {b"test:a", b"test:b"}
+        assert expires_at == pytest.approx(time.time() + 100, abs=1)
+        assert "test:tag:missing" not in redis.data
+
+    async def test_creates_one_pool_on_first_use(self, monkeypatch):
+        pools = []
+
+        async def create_redis_pool(address, minsize, maxsize):
+            await asyncio.sleep(0.01)
+            pools.append((address, minsize, maxsize))
+            return FakeRedis()
+
+        monkeypatch.setattr(
+            redis_cache_backend,
+            "aioredis",
+            types.SimpleNamespace(create_redis_pool=create_redis_pool),
+        )
+        backend = RedisCacheBackend("redis://cache", maxsize=5)
+        await asyncio.gather(*(backend.set(str(i), i) for i in range(10)))
+        assert pools == [("redis://cache", 1, 5)]
+        assert await backend.get("3") == 3
+        await backend.close()
+
+    async def test_does_not_close_injected_client(self, backend, redis):
+        await backend.close()
+        assert not redis.closed
@@ -0,0 +1,161 @@
+import pickle
+
+import pytest
+from starlette.background import BackgroundTask
+from starlette.responses import JSONResponse, Response
+
+from starlette_cache.backends.async_memory_cache_backend import AsyncMemoryCacheBackend
+from starlette_cache.backends.memory_cache_backend import MemoryCacheBackend
+from starlette_cache.backends.serializers import (
+    JSONSerializer,
+    PassThroughSerializer,
+    PickleSerializer,
+)
+from starlette_cache.middleware.cache_entry import CacheEntry
+from starlette_cache.middleware.cached_response import CachedResponse
+
+values = [
+    1,
+    1.5,
+    "a",
+    None,
+    True,
+    {"a": [1, "b", None, {"c": 2.5}]},
+    [1, 2, 3],
+    (1, 2),
+    {1: "a"},
+    {"a": (1, 2)},
+    {1, 2},
+    b"bytes",
+]
+
+
+@pytest.mark.parametrize(
+    "serializer",
+    [
+        PickleSerializer(),
+        JSONSerializer(),
+        PassThroughSerializer(),
+        PassThroughSerializer(JSONSerializer()),
+    ],
+)
+@pytest.mark.parametrize("value", values)
+def test_round_trips_values(serializer, value):
+    assert serializer.loads(serializer.dumps(value)) == value
+
+
+def test_json_serializer_writes_compact_json():
+    assert JSONSerializer().dumps({"a": [1, "é"]}) == '{"a":[1,"é"]}'.encode("utf-8")
+
+
+def test_json_serializer_pickles_values_json_would_change():
+    serializer = JSONSerializer()
+    assert serializer.dumps((1, 2))[0] == 0x80
+    assert serializer.dumps({1: "a"})[0] == 0x80
+
+
+def test_pass_through_serializer_does_not_copy_bytes():
+    body = b"x" * 1024
+    serializer = PassThroughSerializer()
+    assert serializer.loads(serializer.dumps(body)) is body
+
+
+def test_pass_through_serializer_keeps_read_only_views():
+    body = b"x" * 1024
+    serializer = PassThroughSerializer()
+    view = memoryview(body)[10:20]
+    loaded = serializer.loads(serializer.dumps(view))
+    assert loaded.obj is body
+    assert loaded == body[10:20]
+
+
+def test_pass_through_serializer_copies_writable_buffers():
+    buffer = bytearray(b"abc")
+    serializer = PassThroughSerializer()
+    data = serializer.dumps(buffer)
+    buffer[0] = ord("z")
+    assert serializer.loads(data) == b"abc"
+
+
+def test_memory_backend_returns_stored_bytes():
+    body = b"x" * 1024
+    backend = MemoryCacheBackend(
+        "test_pass_through", max_bytes=2048, serializer=PassThroughSerializer()
+    )
+    backend.set("key", body)
+    backend.set("other", {"a": 1})
+    assert backend.get("key") is body
+    assert backend.get("other") == {"a": 1}
+    assert backend.stats()["bytes"] >= 1024
+
+
+@pytest.mark.asyncio
+async def test_async_memory_backend_uses_serializer():
+    backend = AsyncMemoryCacheBackend(
+        "test_async_json", serializer=PassThroughSerializer(JSONSerializer())
+    )
+    body = b"body"
+    await backend.set("key", body)
+    await backend.set("json", {"a": [1]})
+    assert await backend.get("key") is body
+    assert await backend.get("json") == {"a": [1]}
+
+
+serializers = [
+    PickleSerializer(),
+    JSONSerializer(),
+    PassThroughSerializer(),
+    PassThroughSerializer(JSONSerializer()),
+]
+
+
+@pytest.mark.parametrize("serializer", serializers)
+def test_encodes_cached_responses_without_pickling(serializer):
+    cached = CachedResponse(
+        200, [(b"content-type", b"text/plain")], b"body", '"etag"', 1.5, "gzip"
+    )
+    data = serializer.dumps(cached)
+    assert data[0] == 0x01
+    assert bytes(data).endswith(b"body")
+    loaded = serializer.loads(data)
+    assert (
+        loaded.status_code,
+        loaded.headers,
+        loaded.body,
+        loaded.etag,
+        loaded.stored_at,
+        loaded.encoding,
+    ) == (200, [(b"content-type", b"text/plain")], b"body", '"etag"', 1.5, "gzip")
+    empty = serializer.loads(serializer.dumps(CachedResponse(204, [], b"")))
+    assert (empty.body, empty.etag, empty.stored_at, empty.encoding) == (
+        b"",
+        None,
+        None,
+        None,
+    )
+
+
+@pytest.mark.parametrize("serializer", serializers)
+def test_encodes_cache_entries_of_bodies(serializer):
+    entry = serializer.loads(serializer.dumps(CacheEntry(b"body", '"etag"', 1.5)))
+    assert (entry.value, entry.etag, entry.stored_at) == (b"body", '"etag"', 1.5)
+
+    response = JSONResponse({"a": 1}, status_code=201, headers={"x-a": "b"})
+    data = serializer.dumps(CacheEntry(response, '"etag"', 1.5))
+    assert data[0] == 0x01
+    entry = serializer.loads(data)
+    assert isinstance(entry.value, Response)
+    assert entry.value.status_code == 201
+    assert entry.value.body == response.body
+    assert entry.value.raw_headers == response.raw_headers
+    assert (entry.etag, entry.stored_at) == ('"etag"', 1.5)
+
+
+@pytest.mark.parametrize("serializer", serializers)
+def test_pickles_cache_entries_it_cannot_encode(serializer):
+    background = Response(b"body", background=BackgroundTask(print))
+    for value in ({"a": 1}, background):
+        data = serializer.dumps(CacheEntry(value))
+        assert data[0] == 0x80
+    assert serializer.loads(serializer.dumps(CacheEntry({"a": 1}))).value == {"a": 1}
+    assert pickle.loads(pickle.dumps(CacheEntry(b"body"))).value == b"body"
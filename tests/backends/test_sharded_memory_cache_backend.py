@@ -0,0 +1,114 @@
+import hashlib
+import threading
+
+import pytest
+
+from starlette_cache.backends.sharded_memory_cache_backend import (
+    ShardedMemoryCacheBackend,
+)
+
+
+def _key(value) -> str:
+    return hashlib.md5(str(value).encode("utf-8")).hexdigest()
+
+
+class TestShardedMemoryCacheBackend:
+    def test_get_set_and_delete(self):
+        backend = ShardedMemoryCacheBackend("test_sharded", shards=4)
+        backend.set(_key(1), {"a": 1})
+        assert backend.get(_key(1)) == {"a": 1}
+        backend.delete(_key(1))
+        assert backend.get(_key(1), "default") == "default"
+
+    def test_add(self):
+        backend = ShardedMemoryCacheBackend("test_sharded_add", shards=4)
+        assert backend.add(_key(1), 1)
+        assert not backend.add(_key(1), 2)
+
+    def test_supports_non_hex_keys(self):
+        backend = ShardedMemoryCacheBackend("test_sharded_non_hex", shards=4)
+        backend.set("not a digest", 1)
+        assert backend.get("not a digest") == 1
+
+    def test_spreads_keys_across_shards(self):
+        backend = ShardedMemoryCacheBackend("test_sharded_spread", shards=4)
+        shards = {id(backend._shard(_key(i))) for i in range(100)}
+        assert len(shards) == 4
+
+    def test_max_entries_is_split_across_shards(self):
+        backend = ShardedMemoryCacheBackend(
+            "test_sharded_max_entries", shards=4, max_entries=8
+        )
+        for i in range(100):
+            backend.set(_key(i), i)
+        stats = backend.stats()
+        assert stats["entries"] <= 8
+        assert stats["evictions"] == 100 - stats["entries"]
+
+    def test_sweep_removes_expired_entries(self):
+        backend = ShardedMemoryCacheBackend("test_sharded_sweep", shards=4)
+        for i in range(10):
+            backend.set(_key(i), i, -1)
+        backend.sweep()
+        assert backend.stats()["entries"] == 0
+
+    def test_concurrent_threads(self):
+        backend = ShardedMemoryCacheBackend("test_sharded_threads", shards=4)
+        errors = []
+
+        def _work(offset):
+            for i in range(offset, offset + 200):
+                backend.set(_key(i), i)
+                if backend.get(_key(i)) != i:
+                    errors.append(i)
+
+        threads = [threading.Thread(target=_work, args=(i * 200,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not errors
+        assert backend.stats()["entries"] == 1600
+
+    def test_requires_a_shard(self):
+        with pytest.raises(ValueError):
+            ShardedMemoryCacheBackend("test_sharded_none", shards=0)
+
+    def test_batch_operations_span_shards(self):
+        backend = ShardedMemoryCacheBackend("test_sharded_batch", shards=4)
+        values = {_key(i): i for i in range(20)}
+        backend.set_many(values, 100)
+        assert backend.get_many(list(values) + ["missing"]) == values
+        backend.delete_many(list(values)[:10])
+        assert backend.get_many(values) == dict(list(values.items())[10:])
+
+    def test_invalidate_tag_spans_shards(self):
+        backend = ShardedMemoryCacheBackend("test_sharded_tags", shards=4)
+        values = {_key(i): i for i in range(20)}
+        backend.set_many(values, 100)
+        for key in list(values)[:10]:
+            backend.tag(key, ["tag"])
+        assert sorted(backend.invalidate_tag("tag")) == sorted(list(values)[:10])
+        assert backend.get_many(values) == dict(list(values.items())[10:])
+
+    def test_load_spreads_snapshot_across_shards(self, tmp_path):
+        path = str(tmp_path / "snapshot")
+        backend = ShardedMemoryCacheBackend("test_sharded_dump", shards=4)
+        values = {_key(i): i for i in range(20)}
+        backend.set_many(values, 100)
+        assert backend.dump(path) == 20
+        restored = ShardedMemoryCacheBackend("test_sharded_load", shards=3)
+        assert restored.load(path, batch_size=7) == 20
+        assert restored.get_many(values) == values
+
+    def test_load_counts_only_stored_entries(self, tmp_path):
+        path = str(tmp_path / "snapshot")
+        backend = ShardedMemoryCacheBackend("test_sharded_dump_large", shards=2)
+        backend.set_many({"a": 1, "b": 2}, 100)
+        backend.set("large", "x" * 1000, 100)
+        backend.dump(path)
+        restored = ShardedMemoryCacheBackend(
+            "test_sharded_load_large", shards=2, max_bytes=1000
+        )
+        assert restored.load(path) == 2
+        assert restored.get("large") is None
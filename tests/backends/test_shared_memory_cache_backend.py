@@ -0,0 +1,158 @@
+import multiprocessing
+import threading
+
+import pytest
+
+from starlette_cache.backends.serializers import PassThroughSerializer
+from starlette_cache.backends.shared_memory_cache_backend import (
+    SharedMemoryCacheBackend,
+)
+
+
+@pytest.fixture
+def backend(tmp_path):
+    backend = SharedMemoryCacheBackend(
+        "test", slots=64, slot_size=256, path=str(tmp_path / "cache")
+    )
+    yield backend
+    backend.close()
+
+
+def _set_in_child(path, key, value):
+    backend = SharedMemoryCacheBackend("test", slots=64, slot_size=256, path=path)
+    backend.set(key, value)
+    backend.close()
+
+
+class TestSharedMemoryCacheBackend:
+    def test_get_from_cache(self, backend):
+        backend.set("key", {"a": 1}, 100)
+        assert backend.get("key") == {"a": 1}
+        assert backend.get("missing", "default") == "default"
+
+    def test_get_expired_returns_default(self, backend):
+        backend.set("key", "value", -1)
+        assert backend.get("key", "default") == "default"
+        assert backend.stats()["entries"] == 0
+
+    def test_add_only_sets_missing_or_stale_keys(self, backend):
+        assert backend.add("key", 1)
+        assert not backend.add("key", 2)
+        assert backend.get("key") == 1
+        backend.set_soft("stale", 1, -1, 100)
+        assert backend.add("stale", 2)
+        assert backend.get("stale") == 2
+
+    def test_delete(self, backend):
+        backend.set("key", 1)
+        backend.delete("key")
+        assert backend.get("key") is None
+
+    def test_soft_ttl_serves_stale_values_until_hard_ttl(self, backend):
+        backend.set_soft("key", "value", -5, 100)
+        assert backend.get("key") is None
+        value, staleness = backend.get_soft("key")
+        assert value == "value"
+        assert staleness == pytest.approx(5, abs=1)
+        assert backend.get_with_ttl("key") == (None, None)
+
+    def test_get_with_ttl(self, backend):
+        backend.set("key", "value", 100)
+        value, ttl = backend.get_with_ttl("key")
+        assert value == "value"
+        assert ttl == pytest.approx(100, abs=1)
+
+    def test_does_not_store_values_larger_than_a_slot(self, backend):
+        backend.set("key", b"small")
+        backend.set("key", b"x" * 1024)
+        assert backend.get("key") is None
+
+    def test_evicts_entry_closest_to_expiring_when_full(self, backend):
+        for i in range(200):
+            backend.set(str(i), i, 100 + i)
+        stats = backend.stats()
+        assert stats["entries"] == 64
+        assert stats["evictions"] == 200 - 64
+        assert backend.get("199") == 199
+
+    def test_view_reads_pass_through_bodies_without_copying(self, tmp_path):
+        backend = SharedMemoryCacheBackend(
+            "test_view",
+            slots=8,
+            slot_size=256,
+            path=str(tmp_path / "view"),
+            serializer=PassThroughSerializer(),
+        )
+        backend.set("body", b"hello")
+        assert backend.get("body") == b"hello"
+        with backend.view("body") as body:
+            assert isinstance(body, memoryview)
+            assert body.readonly
+            assert body == b"hello"
+        with backend.view("missing") as body:
+            assert body is None
+        backend.close()
+
+    def test_writes_while_a_view_is_open(self, backend):
+        backend.set("key", b"value")
+        results = []
+
+        def _view_and_write():
+            try:
+                with backend.view("key"):
+                    backend.set("key", b"other")
+                    results.append(backend.get("key"))
+            except RuntimeError as error:
+                results.append(error)
+
+        # Run in a thread, so a write waiting for the view fails the test rather
+        # than hanging it.
+        thread = threading.Thread(target=_view_and_write, daemon=True)
+        thread.start()
+        thread.join(5)
+        assert not thread.is_alive()
+        assert results[0] == b"other"
+        assert isinstance(results[1], RuntimeError)
+
+    def test_views_do_not_hold_writers_off(self, backend):
+        backend.set("key", b"value")
+        written = threading.Event()
+
+        def _write():
+            backend.set("key", b"other")
+            written.set()
+
+        with pytest.raises(RuntimeError):
+            with backend.view("key"):
+                writer = threading.Thread(target=_write)
+                writer.start()
+                assert written.wait(5)
+        writer.join()
+        assert backend.get("key") == b"other"
+
+    def test_shares_entries_with_other_processes(self, backend):
+        context = multiprocessing.get_context("spawn")
+        child = context.Process(
+            target=_set_in_child, args=(backend.path, "child", {"from": "child"})
+        )
+        child.start()
+        child.join()
+        assert child.exitcode == 0
+        assert backend.get("child") == {"from": "child"}
+
+    def test_rejects_table_with_other_layout(self, backend):
+        backend.close()
+        with pytest.raises(ValueError):
+            SharedMemoryCacheBackend("test", slots=32, slot_size=256, path=backend.path)
+        SharedMemoryCacheBackend(
+            "test", slots=64, slot_size=256, path=backend.path
+        ).close()
+
+    def test_backends_of_a_process_share_the_table(self, backend):
+        other = SharedMemoryCacheBackend(
+            "test", slots=64, slot_size=256, path=backend.path
+        )
+        other.set("key", 1)
+        other.close()
+        other.close()
+        assert backend.get("key") == 1
@@ -0,0 +1,52 @@
+import time
+
+import pytest
+
+from starlette_cache.backends import snapshot
+
+
+def test_read_skips_entries_expired_since_the_snapshot(tmp_path):
+    path = str(tmp_path / "snapshot")
+    now = time.time()
+    records = [
+        ("short", b"1", 10, None, []),
+        ("long", b"2", 100, 50, ["tag"]),
+    ]
+    assert snapshot.write(path, records, now) == 2
+    ((key, data, ttl, soft_ttl, tags),) = snapshot.read(path, now + 60)
+    assert (key, data, tags) == ("long", b"2", ["tag"])
+    assert ttl == pytest.approx(40)
+    assert soft_ttl == pytest.approx(-10)
+
+
+def test_keeps_pass_through_payloads_raw(tmp_path):
+    path = str(tmp_path / "snapshot")
+    now = time.time()
+    snapshot.write(path, [("raw", memoryview(b"body"), 10, None, [])], now)
+    ((_, data, _, _, _),) = snapshot.read(path, now)
+    assert isinstance(data, memoryview)
+    assert data == b"body"
+
+
+def test_reads_in_batches(tmp_path):
+    path = str(tmp_path / "snapshot")
+    now = time.time()
+    snapshot.write(path, [(str(i), b"", 10, None, []) for i in range(5)], now)
+    batches = list(snapshot.read_batches(path, now, 2))
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+
+
+def test_replaces_snapshot_at_once(tmp_path):
+    path = str(tmp_path / "snapshot")
+    snapshot.write(path, [("a", b"1", 10, None, [])], time.time())
+    snapshot.write(path, [("b", b"2", 10, None, [])], time.time())
+    assert [record[0] for record in snapshot.read(path, time.time())] == ["b"]
+    assert [p.name for p in tmp_path.iterdir()] == ["snapshot"]
+
+
+def test_missing_and_invalid_snapshots(tmp_path):
+    assert list(snapshot.read(str(tmp_path / "missing"), time.time())) == []
+    invalid = tmp_path / "invalid"
+    invalid.write_bytes(b"not a snapshot at all")
+    with pytest.raises(ValueError):
+        list(snapshot.read(str(invalid), time.time()))
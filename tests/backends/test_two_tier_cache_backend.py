@@ -0,0 +1,94 @@
+import pytest
+
+from starlette_cache.backends.memory_cache_backend import MemoryCacheBackend
+from starlette_cache.backends.two_tier_cache_backend import TwoTierCacheBackend
+
+
+@pytest.fixture
+def l2(request):
+    yield MemoryCacheBackend(f"test_two_tier_l2_{request.node.name}")
+
+
+@pytest.fixture
+def backend(l2, request):
+    yield TwoTierCacheBackend(f"test_two_tier_{request.node.name}", l2, l1_ttl=60)
+
+
+class TestTwoTierCacheBackend:
+    def test_set_writes_both_tiers(self, backend, l2):
+        backend.set("key", "value", 100)
+        assert l2.get("key") == "value"
+        assert backend.l1.get("key") == "value"
+
+    def test_serves_hits_from_l1(self, backend, l2):
+        backend.set("key", "value", 100)
+        l2.delete("key")
+        assert backend.get("key") == "value"
+
+    def test_copies_l2_hits_into_l1(self, backend, l2):
+        l2.set("key", "value", 100)
+        assert backend.get("key") == "value"
+        assert backend.l1.get("key") == "value"
+
+    def test_caps_l1_ttl_at_remaining_l2_ttl(self, backend, l2):
+        l2.set("short", "value", 2)
+        backend.get("short")
+        _, ttl = backend.l1.get_with_ttl("short")
+        assert ttl <= 2
+        l2.set("long", "value", 1000)
+        backend.get("long")
+        _, ttl = backend.l1.get_with_ttl("long")
+        assert 59 < ttl <= 60
+
+    def test_missing_key_returns_default(self, backend):
+        assert backend.get("missing", "default") == "default"
+
+    def test_add_only_sets_missing_keys(self, backend, l2):
+        assert backend.add("key", 1)
+        assert not backend.add("key", 2)
+        assert backend.get("key") == 1
+        assert l2.get("key") == 1
+
+    def test_delete_calls_invalidation_hook(self, l2, request):
+        deleted = []
+        backend = TwoTierCacheBackend(
+            f"test_two_tier_{request.node.name}", l2, on_delete=deleted.append
+        )
+        backend.set("key", "value")
+        backend.delete("key")
+        assert backend.get("key") is None
+        assert deleted == ["key"]
+
+    def test_invalidate_only_drops_l1(self, backend, l2):
+        backend.set("key", "value", 100)
+        l2.set("key", "changed", 100)
+        backend.invalidate("key")
+        assert backend.get("key") == "changed"
+
+    def test_soft_ttl_serves_stale_values_from_l2(self, backend, l2):
+        backend.set_soft("key", "value", -10, 100)
+        assert backend.get("key") is None
+        value, staleness = backend.get_soft("key")
+        assert value == "value"
+        assert staleness >= 10
+
+    def test_batch_operations(self, backend, l2):
+        backend.set_many({"a": 1, "b": 2}, 100)
+        l2.set("c", 3, 100)
+        assert backend.l1.get_many(["a", "b"]) == {"a": 1, "b": 2}
+        assert backend.get_many(["a", "b", "c", "missing"]) == {"a": 1, "b": 2, "c": 3}
+        backend.delete_many(["a", "c"])
+        assert l2.get_many(["a", "b", "c"]) == {"b": 2}
+        assert backend.get_many(["a", "b", "c"]) == {"b": 2}
+
+    def test_invalidate_tag_drops_both_tiers(self, l2, request):
+        deleted = []
+        backend = TwoTierCacheBackend(
+            f"test_two_tier_{request.node.name}", l2, on_delete=deleted.append
+        )
+        backend.set("key", "value", 100)
+        backend.tag("key", ["tag"])
+        assert backend.invalidate_tag("tag") == ["key"]
+        assert backend.l1.get("key") is None
+        assert l2.get("key") is None
+        assert deleted == ["key"]
@@ -0,0 +1,72 @@
+from unittest.mock import MagicMock
+
+import pytest
+from starlette.requests import Request
+from starlette.responses import Response
+
+from starlette_cache.backends.async_memory_cache_backend import AsyncMemoryCacheBackend
+from starlette_cache.backends.memory_cache_backend import MemoryCacheBackend
+from starlette_cache.decorators.cache import cache_api
+
+
+@pytest.fixture
+def request_mock():
+    request_mock = MagicMock(spec=Request)
+    request_mock.method = "GET"
+    yield request_mock
+
+
+@pytest.fixture
+def response_mock():
+    response_mock = MagicMock(spec=Response)
+    response_mock.headers = {}
+    yield response_mock
+
+
+def test_requires_request_and_response_arguments():
+    with pytest.raises(ValueError):
+
+        @cache_api(300)
+        def _endpoint(request):
+            pass  # pragma: no cover
+
+
+def test_sync_endpoint_with_sync_backend(request_mock, response_mock):
+    calls = []
+
+    @cache_api(300, key_function=lambda request: "test")
+    def endpoint(request, response):
+        calls.append(request)
+        return {"value": 1}
+
+    backend = MemoryCacheBackend("test_decorator_sync")
+    assert endpoint(request_mock, response_mock, backend) == {"value": 1}
+    assert endpoint(request_mock, response_mock, backend) == {"value": 1}
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_sync_endpoint_works_inside_running_event_loop(
+    request_mock, response_mock
+):
+    @cache_api(300, key_function=lambda request: "test")
+    def endpoint(request, response):
+        return "message"
+
+    backend = MemoryCacheBackend("test_decorator_running_loop")
+    assert endpoint(request_mock, response_mock, backend) == "message"
+
+
+@pytest.mark.asyncio
+async def test_async_endpoint(request_mock, response_mock):
+    calls = []
+
+    @cache_api(300, key_function=lambda request: "test")
+    async def endpoint(request, response):
+        calls.append(request)
+        return "message"
+
+    backend = AsyncMemoryCacheBackend("test_decorator_async")
+    assert await endpoint(request_mock, response_mock, backend) == "message"
+    assert await endpoint(request_mock, response_mock, backend) == "message"
+    assert len(calls) == 1
@@ -0,0 +1,398 @@
+import gzip
+import zlib
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse
+
+from starlette_cache import utils
+from starlette_cache.backends.async_memory_cache_backend import AsyncMemoryCacheBackend
+from starlette_cache.backends.memory_cache_backend import MemoryCacheBackend
+from starlette_cache.metrics import CacheMetrics
+from starlette_cache.middleware.asgi_cache_middleware import ASGICacheMiddleware
+
+
+async def call(app, path="/", method="GET", headers=None):
+    scope = {
+        "type": "http",
+        "method": method,
+        "scheme": "http",
+        "server": ("testserver", 80),
+        "path": path,
+        "root_path": "",
+        "query_string": b"",
+        "headers": headers or [],
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages
+
+
+def body_of(messages) -> bytes:
+    return b"".join(m.get("body", b"") for m in messages[1:])
+
+
+@pytest.fixture(params=[AsyncMemoryCacheBackend, MemoryCacheBackend])
+def cache_backend(request):
+    yield request.param(f"test_asgi_{request.node.name}")
+
+
+@pytest.fixture
+def calls():
+    yield []
+
+
+@pytest.fixture
+def app(cache_backend, calls):
+    app = Starlette()
+
+    @app.route("/", methods=["GET", "HEAD", "POST"])
+    async def index(request):
+        calls.append(request)
+        return JSONResponse({"calls": len(calls)})
+
+    @app.route("/private")
+    async def private(request):
+        calls.append(request)
+        return PlainTextResponse("private", headers={"Cache-Control": "private"})
+
+    @app.route("/error")
+    async def error(request):
+        calls.append(request)
+        return PlainTextResponse("error", status_code=500)
+
+    class Stream:
+        async def __call__(self, scope, receive, send):
+            calls.append(scope)
+            start = {"type": "http.response.start", "status": 200, "headers": []}
+            await send(start)
+            await send({"type": "http.response.body", "body": b"a", "more_body": True})
+            await send({"type": "http.response.body", "body": b"b"})
+
+    app.add_route("/stream", Stream())
+
+    app.add_middleware(ASGICacheMiddleware, cache_backend=cache_backend)
+    yield app
+
+
+@pytest.mark.asyncio
+class TestASGICacheMiddleware:
+    async def test_replays_cached_response(self, app, calls):
+        first = await call(app)
+        second = await call(app)
+        assert len(calls) == 1
+        assert body_of(first) == body_of(second) == b'{"calls":1}'
+        assert second[0]["status"] == 200
+        assert dict(first[0]["headers"])[b"x-cache"] == b"MISS"
+        assert dict(second[0]["headers"])[b"x-cache"] == b"HIT"
+        assert [h for h in second[0]["headers"] if h[0] != b"x-cache"] == [
+            h for h in first[0]["headers"] if h[0] != b"x-cache"
+        ]
+
+    async def test_does_not_cache_other_methods(self, app, calls):
+        await call(app, method="POST")
+        await call(app, method="POST")
+        assert len(calls) == 2
+
+    @pytest.mark.parametrize("path", ["/private", "/error"])
+    async def test_does_not_cache_uncacheable_responses(self, app, calls, path):
+        await call(app, path)
+        await call(app, path)
+        assert len(calls) == 2
+
+    async def test_caches_streamed_body(self, app, calls):
+        await call(app, "/stream")
+        messages = await call(app, "/stream")
+        assert len(calls) == 1
+        assert body_of(messages) == b"ab"
+        assert dict(messages[0]["headers"])[b"x-cache"] == b"HIT"
+
+    async def test_abandons_streams_larger_than_max_body_size(self, calls):
+        async def stream(scope, receive, send):
+            calls.append(scope)
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            for chunk in (b"abc", b"def", b"g"):
+                await send(
+                    {"type": "http.response.body", "body": chunk, "more_body": True}
+                )
+            await send({"type": "http.response.body", "body": b""})
+
+        app = ASGICacheMiddleware(
+            stream,
+            cache_backend=MemoryCacheBackend("test_asgi_max_body_size"),
+            max_body_size=5,
+        )
+        first = await call(app)
+        second = await call(app)
+        assert len(calls) == 2
+        assert body_of(first) == body_of(second) == b"abcdefg"
+        assert dict(second[0]["headers"])[b"x-cache"] == b"MISS"
+
+    async def test_adds_validators_and_age(self, app, calls):
+        first = await call(app)
+        headers = dict(first[0]["headers"])
+        assert headers[b"etag"].startswith(b'"')
+        assert b"last-modified" in headers
+        assert headers[b"cache-control"] == b"max-age=300, public"
+        assert headers[b"age"] == b"0"
+
+    async def test_replays_not_modified_for_matching_etag(self, app, calls):
+        first = await call(app)
+        etag = dict(first[0]["headers"])[b"etag"]
+        messages = await call(app, headers=[(b"if-none-match", etag)])
+        assert len(calls) == 1
+        assert messages[0]["status"] == 304
+        assert dict(messages[0]["headers"])[b"etag"] == etag
+        assert b"content-length" not in dict(messages[0]["headers"])
+        assert body_of(messages) == b""
+
+    async def test_replays_not_modified_since_last_modified(self, app, calls):
+        first = await call(app)
+        last_modified = dict(first[0]["headers"])[b"last-modified"]
+        messages = await call(app, headers=[(b"if-modified-since", last_modified)])
+        assert messages[0]["status"] == 304
+
+    async def test_invalidates_tagged_responses(self, calls):
+        backend = MemoryCacheBackend("test_asgi_tags")
+
+        async def app(scope, receive, send):
+            calls.append(scope)
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"ok"})
+
+        middleware = ASGICacheMiddleware(
+            app, cache_backend=backend, tag_function=utils.get_path_tags
+        )
+        await call(middleware, "/items/1")
+        await call(middleware, "/items/1")
+        assert len(calls) == 1
+        assert len(backend.invalidate_tag("/items/1")) == 1
+        await call(middleware, "/items/1")
+        assert len(calls) == 2
+
+    @pytest.mark.parametrize(
+        "compression, decompress",
+        [("gzip", gzip.decompress), ("deflate", zlib.decompress)],
+    )
+    async def test_serves_compressed_body_to_accepting_clients(
+        self, compression, decompress
+    ):
+        body = b'{"items": "' + b"x" * 4096 + b'"}'
+        stored = {}
+        middleware = ASGICacheMiddleware(
+            _body_app(body),
+            cache_backend=_recording_backend(stored, f"test_asgi_{compression}"),
+            compression=compression,
+        )
+        first = await call(middleware)
+        assert body_of(first) == body
+        (cached,) = stored.values()
+        assert cached.encoding == compression
+        assert len(cached.body) < len(body)
+
+        accept = [(b"accept-encoding", f"br, {compression}".encode())]
+        messages = await call(middleware, headers=accept)
+        headers = dict(messages[0]["headers"])
+        assert headers[b"content-encoding"] == compression.encode()
+        assert headers[b"content-length"] == str(len(cached.body)).encode()
+        assert headers[b"vary"] == b"Accept-Encoding"
+        assert headers[b"etag"] != dict(first[0]["headers"])[b"etag"]
+        assert body_of(messages) == cached.body
+        assert decompress(body_of(messages)) == body
+
+        messages = await call(
+            middleware, headers=accept + [(b"if-none-match", headers[b"etag"])]
+        )
+        assert messages[0]["status"] == 304
+
+        messages = await call(middleware, headers=[(b"accept-encoding", b"identity")])
+        assert b"content-encoding" not in dict(messages[0]["headers"])
+        assert body_of(messages) == body
+
+    async def test_does_not_compress_small_or_encoded_bodies(self):
+        stored = {}
+        backend = _recording_backend(stored, "test_asgi_small")
+        middleware = ASGICacheMiddleware(
+            _body_app(b"small"), cache_backend=backend, compression="gzip"
+        )
+        await call(middleware)
+        encoded = gzip.compress(b"x" * 4096)
+        middleware = ASGICacheMiddleware(
+            _body_app(encoded, [(b"content-encoding", b"gzip")]),
+            cache_backend=backend,
+            compression="gzip",
+            compression_min_size=0,
+        )
+        await call(middleware, "/encoded")
+        assert [cached.encoding for cached in stored.values()] == [None, None]
+        assert [cached.body for cached in stored.values()] == [b"small", encoded]
+
+    async def test_stores_single_chunk_body_without_copying(self):
+        body = b"x" * 1024
+        stored = {}
+
+        class RecordingBackend(MemoryCacheBackend):
+            def set(self, key, value, ttl=MemoryCacheBackend.DEFAULT_TTL):
+                stored[key] = value
+                super().set(key, value, ttl)
+
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": body})
+
+        middleware = ASGICacheMiddleware(
+            app, cache_backend=RecordingBackend("test_asgi_no_copy")
+        )
+        await call(middleware)
+        (cached,) = stored.values()
+        assert cached.body is body
+        assert body_of(await call(middleware)) == body
+
+    async def test_stores_responses_per_vary_header_value(self, calls):
+        async def app(scope, receive, send):
+            calls.append(scope)
+            language = dict(scope["headers"]).get(b"accept-language", b"en")
+            headers = [(b"vary", b"Accept-Language")]
+            await send(
+                {"type": "http.response.start", "status": 200, "headers": headers}
+            )
+            await send({"type": "http.response.body", "body": language})
+
+        middleware = ASGICacheMiddleware(
+            app, cache_backend=MemoryCacheBackend("test_asgi_vary")
+        )
+        english = [(b"accept-language", b"en-US, fr;q=0.5")]
+        french = [(b"accept-language", b"fr")]
+        assert body_of(await call(middleware, headers=english)) == b"en-US, fr;q=0.5"
+        assert body_of(await call(middleware, headers=french)) == b"fr"
+        assert len(calls) == 2
+        same = [(b"accept-language", b"fr;q=0.1,en-us")]
+        assert body_of(await call(middleware, headers=same)) == b"en-US, fr;q=0.5"
+        assert body_of(await call(middleware, headers=french)) == b"fr"
+        assert len(calls) == 2
+        assert middleware.vary_by_path == {"/": ("accept-language",)}
+
+    async def test_does_not_cache_vary_star(self):
+        stored = {}
+        middleware = ASGICacheMiddleware(
+            _body_app(b"ok", [(b"vary", b"*")]),
+            cache_backend=_recording_backend(stored, "test_asgi_vary_star"),
+        )
+        await call(middleware)
+        await call(middleware)
+        assert stored == {}
+
+    async def test_does_not_share_authorized_responses(self, app, calls):
+        authorization = [(b"authorization", b"Bearer token")]
+        await call(app)
+        messages = await call(app, headers=authorization)
+        assert dict(messages[0]["headers"])[b"x-cache"] == b"MISS"
+        await call(app, headers=authorization)
+        assert len(calls) == 3
+        assert body_of(await call(app)) == b'{"calls":1}'
+
+        stored = {}
+        middleware = ASGICacheMiddleware(
+            _body_app(b"ok"),
+            cache_backend=_recording_backend(stored, "test_asgi_authorized"),
+        )
+        await call(middleware, headers=authorization)
+        assert stored == {}
+
+    @pytest.mark.parametrize("cache_control", [b"public, max-age=60", b"s-maxage=60"])
+    async def test_shares_authorized_responses_marked_shareable(self, cache_control):
+        stored = {}
+        middleware = ASGICacheMiddleware(
+            _body_app(b"ok", [(b"cache-control", cache_control)]),
+            cache_backend=_recording_backend(stored, "test_asgi_shareable"),
+        )
+        await call(middleware, headers=[(b"authorization", b"Bearer token")])
+        assert len(stored) == 1
+        messages = await call(middleware)
+        assert dict(messages[0]["headers"])[b"x-cache"] == b"HIT"
+        assert body_of(messages) == b"ok"
+
+    async def test_does_not_store_responses_it_marks_private(self):
+        stored = {}
+        middleware = ASGICacheMiddleware(
+            _body_app(b"ok"),
+            cache_backend=_recording_backend(stored, "test_asgi_private"),
+            cache_ttl=60,
+            private=True,
+        )
+        first = await call(middleware)
+        second = await call(middleware)
+        assert stored == {}
+        for messages in (first, second):
+            headers = dict(messages[0]["headers"])
+            assert headers[b"cache-control"] == b"max-age=60, private"
+            assert headers[b"x-cache"] == b"MISS"
+
+        middleware = ASGICacheMiddleware(
+            _body_app(b"ok", [(b"cache-control", b"public, max-age=60")]),
+            cache_backend=_recording_backend(stored, "test_asgi_private_public"),
+            private=True,
+        )
+        await call(middleware)
+        assert len(stored) == 1
+
+    async def test_reports_lookups_and_stores_to_hooks(self, cache_backend):
+        app = _body_app(b"ok")
+        app.__name__ = "endpoint"
+        metrics = CacheMetrics()
+        middleware = ASGICacheMiddleware(
+            app, cache_backend=cache_backend, hooks=metrics
+        )
+        for _ in range(3):
+            await call(middleware)
+        backend = type(cache_backend).__name__
+        stats = metrics.stats()
+        assert stats["routes"]["endpoint"]["miss"] == 1
+        assert stats["routes"]["endpoint"]["hit"] == 2
+        assert stats["routes"]["endpoint"]["stored_bytes"] == len(b"ok")
+        assert stats["backends"][backend]["get_seconds"]["count"] == 3
+        assert stats["backends"][backend]["set_seconds"]["count"] == 1
+
+    async def test_forgets_oldest_vary_paths(self, monkeypatch):
+        monkeypatch.setattr(ASGICacheMiddleware, "max_vary_paths", 2)
+        middleware = ASGICacheMiddleware(
+            _body_app(b"ok", [(b"vary", b"Accept")]),
+            cache_backend=MemoryCacheBackend("test_asgi_vary_paths"),
+        )
+        for path in ("/a", "/b", "/c"):
+            await call(middleware, path)
+        assert list(middleware.vary_by_path) == ["/b", "/c"]
+
+
+def test_rejects_unknown_compression():
+    with pytest.raises(ValueError):
+        ASGICacheMiddleware(
+            _body_app(b""), cache_backend=MemoryCacheBackend("x"), compression="br"
+        )
+
+
+def _body_app(body, headers=()):
+    async def app(scope, receive, send):
+        start_headers = [(b"content-length", str(len(body)).encode()), *headers]
+        await send(
+            {"type": "http.response.start", "status": 200, "headers": start_headers}
+        )
+        await send({"type": "http.response.body", "body": body})
+
+    return app
+
+
+def _recording_backend(stored, name):
+    class RecordingBackend(MemoryCacheBackend):
+        def set(self, key, value, ttl=MemoryCacheBackend.DEFAULT_TTL):
+            stored[key] = value
+            super().set(key, value, ttl)
+
+    return RecordingBackend(name)
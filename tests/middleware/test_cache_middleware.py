@@ -1,12 +1,20 @@
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 from starlette.requests import Request
-from starlette.responses import Response
+from starlette.responses import Response, StreamingResponse
 
 from starlette_cache.backends.async_memory_cache_backend import AsyncMemoryCacheBackend
 from starlette_cache.backends.base_async_cache_backend import BaseAsyncCacheBackend
 from starlette_cache.backends.memory_cache_backend import MemoryCacheBackend
+from starlette_cache import utils
+from starlette_cache.metrics import CacheMetrics
+from starlette_cache.middleware.cache_entry import CacheEntry
 from starlette_cache.middleware.cache_middleware import CacheMiddleware
 
 
@@ -38,6 +46,7 @@ class TestCacheMiddleware:
     def request_mock(self):
         request_mock = MagicMock(spec=Request)
         request_mock.method = "GET"
+        request_mock.headers = {}
         yield request_mock
 
     @pytest.fixture
@@ -58,8 +67,10 @@ class TestCacheMiddleware:
             if isinstance(cache_backend, BaseAsyncCacheBackend)
             else cache_backend.get("test")
         )
-        assert cache_value == "message"
-        assert response_mock.headers["cache-control"] == str(self.cache_ttl)
+        assert cache_value.value == "message"
+        assert response_mock.headers["cache-control"] == (
+            f"max-age={self.cache_ttl}, public"
+        )
 
     async def test_returns_value_from_cache(
         self, app, cache_backend, request_mock, response_mock
@@ -71,3 +82,751 @@ class TestCacheMiddleware:
         message = await middleware(request_mock, response_mock, cache_backend)
         app.assert_not_called()
         assert "message" == message
+
+    async def test_coalesces_concurrent_misses(
+        self, cache_backend, request_mock, response_mock
+    ):
+        calls = []
+
+        async def app(request, response):
+            calls.append(request)
+            await asyncio.sleep(0.01)
+            return "message"
+
+        middleware = CacheMiddleware(app, self.cache_ttl, self.key_function)
+        messages = await asyncio.gather(
+            *(middleware(request_mock, response_mock, cache_backend) for _ in range(10))
+        )
+        assert messages == ["message"] * 10
+        assert len(calls) == 1
+
+    async def test_coalesced_waiters_receive_exception(
+        self, cache_backend, request_mock, response_mock
+    ):
+        async def app(request, response):
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        middleware = CacheMiddleware(app, self.cache_ttl, self.key_function)
+        results = await asyncio.gather(
+            *(middleware(request_mock, response_mock, cache_backend) for _ in range(3)),
+            return_exceptions=True,
+        )
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert not middleware._in_flight
+
+    async def test_without_single_flight_calls_app_for_each_miss(
+        self, cache_backend, request_mock, response_mock
+    ):
+        calls = []
+
+        async def app(request, response):
+            calls.append(request)
+            await asyncio.sleep(0.01)
+            return "message"
+
+        middleware = CacheMiddleware(
+            app, self.cache_ttl, self.key_function, single_flight=False
+        )
+        await asyncio.gather(
+            *(middleware(request_mock, response_mock, cache_backend) for _ in range(3))
+        )
+        assert len(calls) == 3
+
+    async def test_waits_for_backend_lock_holder(
+        self, app, cache_backend, request_mock, response_mock
+    ):
+        await self._call(cache_backend, "add", "test.lock", True, 5)
+        middleware = CacheMiddleware(
+            app,
+            self.cache_ttl,
+            self.key_function,
+            lock_timeout=5,
+            lock_poll_interval=0.01,
+        )
+
+        async def _lock_holder():
+            await asyncio.sleep(0.05)
+            await self._call(cache_backend, "set", "test", "cached", 300)
+
+        message, _ = await asyncio.gather(
+            middleware(request_mock, response_mock, cache_backend), _lock_holder()
+        )
+        await self._call(cache_backend, "delete", "test.lock")
+        assert message == "cached"
+        app.assert_not_called()
+
+    async def test_stops_waiting_when_backend_lock_is_released_without_a_value(
+        self, app, cache_backend, request_mock, response_mock
+    ):
+        app.return_value = "message"
+        await self._call(cache_backend, "add", "test.lock", True, 5)
+        middleware = CacheMiddleware(
+            app,
+            self.cache_ttl,
+            self.key_function,
+            lock_timeout=5,
+            lock_poll_interval=0.01,
+        )
+
+        async def _failing_lock_holder():
+            await asyncio.sleep(0.05)
+            await self._call(cache_backend, "delete", "test.lock")
+
+        started = time.monotonic()
+        message, _ = await asyncio.gather(
+            middleware(request_mock, response_mock, cache_backend),
+            _failing_lock_holder(),
+        )
+        assert time.monotonic() - started < 1
+        assert message == "message"
+        app.assert_called_once()
+
+    async def test_releases_backend_lock(
+        self, app, cache_backend, request_mock, response_mock
+    ):
+        app.return_value = "message"
+        middleware = CacheMiddleware(
+            app, self.cache_ttl, self.key_function, lock_timeout=5
+        )
+        assert await middleware(request_mock, response_mock, cache_backend) == "message"
+        assert await self._call(cache_backend, "add", "test.lock", True, 5)
+        await self._call(cache_backend, "delete", "test.lock")
+
+    async def test_calls_app_when_backend_lock_times_out(
+        self, app, cache_backend, request_mock, response_mock
+    ):
+        app.return_value = "message"
+        await self._call(cache_backend, "add", "test.lock", True, 5)
+        middleware = CacheMiddleware(
+            app,
+            self.cache_ttl,
+            self.key_function,
+            lock_timeout=0.05,
+            lock_poll_interval=0.01,
+        )
+        message = await middleware(request_mock, response_mock, cache_backend)
+        await self._call(cache_backend, "delete", "test.lock")
+        assert message == "message"
+        app.assert_called_once()
+
+    @staticmethod
+    async def _call(cache_backend, method, *args):
+        result = getattr(cache_backend, method)(*args)
+        if isinstance(cache_backend, BaseAsyncCacheBackend):
+            return await result
+        return result
+
+    async def test_serves_stale_response_while_revalidating(
+        self, app, cache_backend, request_mock, response_mock
+    ):
+        app.return_value = "fresh"
+        await self._call(cache_backend, "set_soft", "test", "stale", -1, 300)
+        middleware = CacheMiddleware(
+            app, self.cache_ttl, self.key_function, stale_while_revalidate=60
+        )
+        assert await middleware(request_mock, response_mock, cache_backend) == "stale"
+        assert response_mock.headers["cache-control"] == (
+            f"max-age={self.cache_ttl}, public, stale-while-revalidate=60"
+        )
+        assert response_mock.headers["x-cache"] == "STALE"
+        for _ in range(100):
+            if await self._call(cache_backend, "get", "test") is not None:
+                break
+            await asyncio.sleep(0.01)
+        assert (await self._call(cache_backend, "get", "test")).value == "fresh"
+        app.assert_called_once()
+
+    async def test_revalidates_with_a_response_of_its_own(
+        self, app, cache_backend, request_mock, response_mock
+    ):
+        app.return_value = "fresh"
+        await self._call(cache_backend, "set_soft", "test", "stale", -1, 300)
+        middleware = CacheMiddleware(
+            app, self.cache_ttl, self.key_function, stale_while_revalidate=60
+        )
+        await middleware(request_mock, response_mock, cache_backend)
+        for _ in range(100):
+            if app.called:
+                break
+            await asyncio.sleep(0.01)
+        response = app.call_args.kwargs["response"]
+        assert isinstance(response, Response)
+        assert response is not response_mock
+
+    async def test_keeps_revalidations_referenced_until_done(
+        self, cache_backend, request_mock, response_mock
+    ):
+        release = asyncio.Event()
+
+        async def app(request, response):
+            await release.wait()
+            return "fresh"
+
+        await self._call(cache_backend, "set_soft", "test", "stale", -1, 300)
+        middleware = CacheMiddleware(
+            app, self.cache_ttl, self.key_function, stale_while_revalidate=60
+        )
+        await middleware(request_mock, response_mock, cache_backend)
+        (revalidation,) = middleware._revalidations
+        assert not revalidation.done()
+        release.set()
+        await revalidation
+        assert middleware._revalidations == set()
+
+    async def test_revalidates_sync_endpoints_on_one_loop(
+        self, request_mock, response_mock
+    ):
+        loops = []
+
+        class RecordingBackend(AsyncMemoryCacheBackend):
+            async def set_soft(self, key, value, soft_ttl, hard_ttl):
+                loops.append(asyncio.get_running_loop())
+                await super().set_soft(key, value, soft_ttl, hard_ttl)
+
+        backend = RecordingBackend("test_revalidates_sync_endpoints")
+        middleware = CacheMiddleware(
+            MagicMock(return_value="fresh"),
+            self.cache_ttl,
+            self.key_function,
+            stale_while_revalidate=60,
+        )
+        for _ in range(2):
+            await AsyncMemoryCacheBackend.set_soft(backend, "test", "stale", -1, 300)
+            await middleware(request_mock, response_mock, backend)
+            for revalidation in list(middleware._revalidations):
+                await asyncio.wrap_future(revalidation)
+        assert len(loops) == 2
+        assert loops[0] is loops[1] is middleware._revalidation_loop
+        assert loops[0] is not asyncio.get_running_loop()
+
+    async def test_serves_stale_response_on_error(
+        self, app, cache_backend, request_mock, response_mock
+    ):
+        app.side_effect = RuntimeError("boom")
+        await self._call(cache_backend, "set_soft", "test", "stale", -1, 300)
+        middleware = CacheMiddleware(
+            app, self.cache_ttl, self.key_function, stale_if_error=60
+        )
+        assert await middleware(request_mock, response_mock, cache_backend) == "stale"
+        assert response_mock.headers["cache-control"] == (
+            f"max-age={self.cache_ttl}, public, stale-if-error=60"
+        )
+        assert response_mock.headers["x-cache"] == "STALE"
+
+    async def test_raises_when_stale_response_is_too_old(
+        self, app, cache_backend, request_mock, response_mock
+    ):
+        app.side_effect = RuntimeError("boom")
+        await self._call(cache_backend, "set_soft", "test", "stale", -120, 300)
+        middleware = CacheMiddleware(
+            app, self.cache_ttl, self.key_function, stale_if_error=60
+        )
+        with pytest.raises(RuntimeError):
+            await middleware(request_mock, response_mock, cache_backend)
+
+    async def test_stores_responses_with_stale_window(
+        self, app, cache_backend, request_mock, response_mock
+    ):
+        app.return_value = "message"
+        middleware = CacheMiddleware(
+            app,
+            self.cache_ttl,
+            self.key_function,
+            stale_while_revalidate=30,
+            stale_if_error=60,
+        )
+        await middleware(request_mock, response_mock, cache_backend)
+        entry, staleness = await self._call(cache_backend, "get_soft", "test")
+        assert entry.value == "message"
+        assert staleness is None
+
+    async def test_concurrent_requests_never_share_keys_or_payloads(
+        self, cache_backend, response_mock
+    ):
+        async def app(request, response):
+            # Interleave the requests as much as possible.
+            await asyncio.sleep(random.random() / 100)
+            return {"path": request.url.path}
+
+        def key_function(request):
+            return f"stress{request.url.path}"
+
+        middleware = CacheMiddleware(app, self.cache_ttl, key_function)
+        paths = [f"/items/{i % 50}" for i in range(500)]
+        random.shuffle(paths)
+        messages = await asyncio.gather(
+            *(
+                middleware(_request(path), response_mock, cache_backend)
+                for path in paths
+            )
+        )
+        assert [message["path"] for message in messages] == paths
+        for path in set(paths):
+            cached = await self._call(cache_backend, "get", f"stress{path}")
+            assert cached.value == {"path": path}
+            await self._call(cache_backend, "delete", f"stress{path}")
+
+    async def test_computes_cache_key_once(
+        self, app, cache_backend, request_mock, response_mock
+    ):
+        app.return_value = "message"
+        key_function = MagicMock(return_value="test")
+        middleware = CacheMiddleware(app, self.cache_ttl, key_function)
+        await middleware(request_mock, response_mock, cache_backend)
+        key_function.assert_called_once_with(request_mock)
+
+    async def test_sets_validators_and_age(
+        self, app, cache_backend, request_mock, response_mock
+    ):
+        app.return_value = Response(b"message")
+        middleware = CacheMiddleware(app, self.cache_ttl, self.key_function)
+        await middleware(request_mock, response_mock, cache_backend)
+        etag = response_mock.headers["etag"]
+        assert etag == utils.get_etag(b"message")
+        assert "last-modified" in response_mock.headers
+        assert response_mock.headers["age"] == "0"
+        response_mock.headers = {}
+        await middleware(request_mock, response_mock, cache_backend)
+        assert response_mock.headers["etag"] == etag
+
+    async def test_sets_no_etag_for_values_without_a_body(
+        self, app, cache_backend, request_mock, response_mock
+    ):
+        app.return_value = {"message": "hello"}
+        middleware = CacheMiddleware(app, self.cache_ttl, self.key_function)
+        await middleware(request_mock, response_mock, cache_backend)
+        assert "etag" not in response_mock.headers
+        assert "last-modified" in response_mock.headers
+        request_mock.headers = {"if-none-match": "*"}
+        assert await middleware(request_mock, response_mock, cache_backend) == {
+            "message": "hello"
+        }
+
+    async def test_returns_not_modified_for_matching_etag(
+        self, app, cache_backend, request_mock, response_mock
+    ):
+        app.return_value = b"message"
+        middleware = CacheMiddleware(app, self.cache_ttl, self.key_function)
+        await middleware(request_mock, response_mock, cache_backend)
+        request_mock.headers = {"if-none-match": response_mock.headers["etag"]}
+        not_modified = await middleware(request_mock, response_mock, cache_backend)
+        assert isinstance(not_modified, Response)
+        assert not_modified.status_code == 304
+        assert not_modified.body == b""
+        assert not_modified.headers["etag"] == response_mock.headers["etag"]
+        app.assert_called_once()
+
+    async def test_returns_not_modified_since_last_modified(
+        self, app, cache_backend, request_mock, response_mock
+    ):
+        app.return_value = "message"
+        middleware = CacheMiddleware(app, self.cache_ttl, self.key_function)
+        await middleware(request_mock, response_mock, cache_backend)
+        request_mock.headers = {
+            "if-modified-since": response_mock.headers["last-modified"]
+        }
+        not_modified = await middleware(request_mock, response_mock, cache_backend)
+        assert not_modified.status_code == 304
+
+    async def test_returns_message_for_stale_etag(
+        self, app, cache_backend, request_mock, response_mock
+    ):
+        app.return_value = "message"
+        request_mock.headers = {"if-none-match": '"stale"'}
+        middleware = CacheMiddleware(app, self.cache_ttl, self.key_function)
+        assert await middleware(request_mock, response_mock, cache_backend) == (
+            "message"
+        )
+
+    async def test_tags_stored_responses(
+        self, app, cache_backend, request_mock, response_mock
+    ):
+        app.return_value = "message"
+        middleware = CacheMiddleware(
+            app, self.cache_ttl, self.key_function, tag_function=lambda r: ["tag"]
+        )
+        await middleware(request_mock, response_mock, cache_backend)
+        assert await self._call(cache_backend, "invalidate_tag", "tag") == ["test"]
+        assert await self._call(cache_backend, "get", "test") is None
+
+    async def test_marks_private_responses(
+        self, app, cache_backend, request_mock, response_mock
+    ):
+        app.return_value = "message"
+        middleware = CacheMiddleware(
+            app, self.cache_ttl, self.key_function, private=True
+        )
+        await middleware(request_mock, response_mock, cache_backend)
+        assert response_mock.headers["cache-control"] == (
+            f"max-age={self.cache_ttl}, private"
+        )
+
+    async def test_sets_x_cache_header(
+        self, app, cache_backend, request_mock, response_mock
+    ):
+        app.return_value = "message"
+        middleware = CacheMiddleware(app, self.cache_ttl, self.key_function)
+        await middleware(request_mock, response_mock, cache_backend)
+        assert response_mock.headers["x-cache"] == "MISS"
+        await middleware(request_mock, response_mock, cache_backend)
+        assert response_mock.headers["x-cache"] == "HIT"
+
+    async def test_reports_lookups_and_stores_to_hooks(
+        self, app, cache_backend, request_mock, response_mock
+    ):
+        app.return_value = "message"
+        app.__name__ = "endpoint"
+        metrics = CacheMetrics()
+        middleware = CacheMiddleware(
+            app, self.cache_ttl, self.key_function, hooks=metrics
+        )
+        for _ in range(3):
+            await middleware(request_mock, response_mock, cache_backend)
+        backend = type(cache_backend).__name__
+        stats = metrics.stats()
+        assert stats["routes"]["endpoint"]["miss"] == 1
+        assert stats["routes"]["endpoint"]["hit"] == 2
+        assert stats["routes"]["endpoint"]["stored_bytes"] == len("message")
+        assert stats["backends"][backend]["get_seconds"]["count"] == 3
+        assert stats["backends"][backend]["set_seconds"]["count"] == 1
+
+
+async def _read(stream: StreamingResponse) -> bytes:
+    return b"".join(
+        [
+            chunk if isinstance(chunk, bytes) else chunk.encode()
+            async for chunk in stream.body_iterator
+        ]
+    )
+
+
+@pytest.mark.asyncio
+class TestCacheMiddlewareStreams:
+    @staticmethod
+    def key_function(x):
+        return "stream"
+
+    @pytest.fixture(params=[AsyncMemoryCacheBackend, MemoryCacheBackend])
+    def cache_backend(self, request):
+        yield request.param(f"test_streams_{request.node.name}")
+
+    @pytest.fixture
+    def request_mock(self):
+        request_mock = MagicMock(spec=Request)
+        request_mock.method = "GET"
+        request_mock.headers = {}
+        yield request_mock
+
+    @pytest.fixture
+    def calls(self):
+        yield []
+
+    @pytest.fixture
+    def app(self, calls):
+        async def endpoint(request, response):
+            calls.append(request)
+
+            async def chunks():
+                for chunk in (b"abc", "def", b"ghij"):
+                    yield chunk
+
+            return StreamingResponse(chunks(), media_type="text/csv")
+
+        yield endpoint
+
+    async def test_replays_stream_from_segments(
+        self, app, calls, cache_backend, request_mock
+    ):
+        middleware = CacheMiddleware(app, 300, self.key_function, stream_segment_size=4)
+        first = await middleware(request_mock, MagicMock(), cache_backend)
+        assert first.headers["x-cache"] == "MISS"
+        assert await _read(first) == b"abcdefghij"
+        second = await middleware(request_mock, MagicMock(), cache_backend)
+        assert len(calls) == 1
+        assert isinstance(second, StreamingResponse)
+        assert second.headers["x-cache"] == "HIT"
+        assert second.headers["content-type"] == first.headers["content-type"]
+        assert second.headers["etag"] == utils.get_etag(b"abcdefghij")
+        chunks = [chunk async for chunk in second.body_iterator]
+        assert chunks == [b"abcdef", b"ghij"]
+
+    async def test_returns_not_modified_for_cached_stream(
+        self, app, cache_backend, request_mock
+    ):
+        middleware = CacheMiddleware(app, 300, self.key_function)
+        await _read(await middleware(request_mock, MagicMock(), cache_backend))
+        request_mock.headers = {"if-none-match": utils.get_etag(b"abcdefghij")}
+        response = await middleware(request_mock, MagicMock(), cache_backend)
+        assert response.status_code == 304
+
+    async def test_abandons_streams_larger_than_max_stream_size(
+        self, app, calls, cache_backend, request_mock
+    ):
+        middleware = CacheMiddleware(
+            app, 300, self.key_function, max_stream_size=8, stream_segment_size=4
+        )
+        assert await _read(
+            await middleware(request_mock, MagicMock(), cache_backend)
+        ) == (b"abcdefghij")
+        response = await middleware(request_mock, MagicMock(), cache_backend)
+        assert response.headers["x-cache"] == "MISS"
+        assert len(calls) == 2
+        # The segment stored before the stream grew too large is deleted.
+        assert cache_backend.stats()["entries"] == 0
+
+    async def test_does_not_store_unfinished_streams(
+        self, app, calls, cache_backend, request_mock
+    ):
+        middleware = CacheMiddleware(app, 300, self.key_function)
+        first = await middleware(request_mock, MagicMock(), cache_backend)
+        await first.body_iterator.__anext__()
+        await middleware(request_mock, MagicMock(), cache_backend)
+        assert len(calls) == 2
+
+    async def test_aborts_replay_of_evicted_segments(
+        self, app, calls, cache_backend, request_mock
+    ):
+        middleware = CacheMiddleware(app, 300, self.key_function, stream_segment_size=4)
+        await _read(await middleware(request_mock, MagicMock(), cache_backend))
+        cached = cache_backend.get("stream")
+        if isinstance(cache_backend, BaseAsyncCacheBackend):
+            cached = await cached
+            await cache_backend.delete(cached.value.segment_keys()[-1])
+        else:
+            cache_backend.delete(cached.value.segment_keys()[-1])
+        response = await middleware(request_mock, MagicMock(), cache_backend)
+        with pytest.raises(LookupError):
+            await _read(response)
+        await middleware(request_mock, MagicMock(), cache_backend)
+        assert len(calls) == 2
+
+    async def test_stream_entry_expires_with_its_first_segment(
+        self, calls, cache_backend, request_mock, monkeypatch
+    ):
+        clock = [time.time()]
+        monkeypatch.setattr(time, "time", lambda: clock[0])
+
+        async def endpoint(request, response):
+            calls.append(request)
+
+            async def chunks():
+                for chunk in (b"abcd", b"efgh"):
+                    clock[0] += 10
+                    yield chunk
+
+            return StreamingResponse(chunks())
+
+        middleware = CacheMiddleware(
+            endpoint, 30, self.key_function, stream_segment_size=4
+        )
+        await _read(await middleware(request_mock, MagicMock(), cache_backend))
+        # The first segment was stored 35 seconds ago and has expired.
+        clock[0] += 25
+        response = await middleware(request_mock, MagicMock(), cache_backend)
+        assert response.headers["x-cache"] == "MISS"
+        assert await _read(response) == b"abcdefgh"
+        assert len(calls) == 2
+
+    async def test_revalidates_streams(self, app, calls, cache_backend, request_mock):
+        middleware = CacheMiddleware(
+            app, 300, self.key_function, stale_while_revalidate=60
+        )
+        stale = CacheEntry("stale")
+        if isinstance(cache_backend, BaseAsyncCacheBackend):
+            await cache_backend.set_soft("stream", stale, -1, 300)
+        else:
+            cache_backend.set_soft("stream", stale, -1, 300)
+        assert await middleware(request_mock, MagicMock(), cache_backend) == "stale"
+        for _ in range(100):
+            response = await middleware(request_mock, MagicMock(), cache_backend)
+            if isinstance(response, StreamingResponse):
+                break
+            await asyncio.sleep(0.01)
+        assert await _read(response) == b"abcdefghij"
+        assert len(calls) == 1
+
+    async def test_streams_sync_endpoints_with_sync_backend(self, request_mock):
+        def endpoint(request, response):
+            return StreamingResponse(iter([b"abc", b"def"]))
+
+        backend = MemoryCacheBackend("test_streams_sync_endpoint")
+        middleware = CacheMiddleware(endpoint, 300, self.key_function)
+        first = middleware.call_sync(request_mock, MagicMock(), backend)
+        assert await _read(first) == b"abcdef"
+        second = middleware.call_sync(request_mock, MagicMock(), backend)
+        assert second.headers["x-cache"] == "HIT"
+        assert await _read(second) == b"abcdef"
+
+
+def _request(path: str) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "scheme": "http",
+            "server": ("testserver", 80),
+            "path": path,
+            "query_string": b"",
+            "headers": [],
+        }
+    )
+
+
+class TestCacheMiddlewareSync:
+    cache_ttl = 500
+
+    @staticmethod
+    def key_function(x):
+        return "test"
+
+    @pytest.fixture
+    def cache_backend(self, request):
+        yield MemoryCacheBackend(f"test_sync_{request.node.name}")
+
+    @pytest.fixture
+    def request_mock(self):
+        request_mock = MagicMock(spec=Request)
+        request_mock.method = "GET"
+        request_mock.headers = {}
+        yield request_mock
+
+    @pytest.fixture
+    def response_mock(self):
+        response_mock = MagicMock(spec=Response)
+        response_mock.headers = {}
+        yield response_mock
+
+    def test_reports_lookups_to_hooks(self, cache_backend, request_mock, response_mock):
+        metrics = CacheMetrics()
+        middleware = CacheMiddleware(
+            MagicMock(return_value="message"),
+            self.cache_ttl,
+            self.key_function,
+            hooks=metrics,
+        )
+        middleware.call_sync(request_mock, response_mock, cache_backend)
+        assert response_mock.headers["x-cache"] == "MISS"
+        middleware.call_sync(request_mock, response_mock, cache_backend)
+        assert response_mock.headers["x-cache"] == "HIT"
+        (totals,) = metrics.stats()["routes"].values()
+        assert (totals["hit"], totals["miss"], totals["stale"]) == (1, 1, 0)
+
+    def test_sets_message_from_app(self, cache_backend, request_mock, response_mock):
+        app = MagicMock(return_value="message")
+        middleware = CacheMiddleware(app, self.cache_ttl, self.key_function)
+        assert middleware.call_sync(request_mock, response_mock, cache_backend) == (
+            "message"
+        )
+        app.assert_called_once_with(request=request_mock, response=response_mock)
+        assert cache_backend.get("test").value == "message"
+        assert response_mock.headers["cache-control"] == (
+            f"max-age={self.cache_ttl}, public"
+        )
+
+    def test_returns_value_from_cache(self, cache_backend, request_mock, response_mock):
+        app = MagicMock()
+        cache_backend.set("test", "message", 300)
+        middleware = CacheMiddleware(app, self.cache_ttl, self.key_function)
+        assert middleware.call_sync(request_mock, response_mock, cache_backend) == (
+            "message"
+        )
+        app.assert_not_called()
+
+    def test_does_not_cache_other_methods(
+        self, cache_backend, request_mock, response_mock
+    ):
+        request_mock.method = "POST"
+        app = MagicMock(return_value="message")
+        middleware = CacheMiddleware(app, self.cache_ttl, self.key_function)
+        middleware.call_sync(request_mock, response_mock, cache_backend)
+        assert cache_backend.get("test") is None
+
+    def test_coalesces_concurrent_misses_across_threads(
+        self, cache_backend, request_mock, response_mock
+    ):
+        calls = []
+
+        def app(request, response):
+            calls.append(request)
+            time.sleep(0.05)
+            return "message"
+
+        middleware = CacheMiddleware(app, self.cache_ttl, self.key_function)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [
+                executor.submit(
+                    middleware.call_sync, request_mock, response_mock, cache_backend
+                )
+                for _ in range(8)
+            ]
+        assert [future.result() for future in futures] == ["message"] * 8
+        assert len(calls) == 1
+
+    def test_waits_for_backend_lock_holder(
+        self, cache_backend, request_mock, response_mock
+    ):
+        app = MagicMock(return_value="message")
+        cache_backend.add("test.lock", True, 5)
+        timer = threading.Timer(0.05, cache_backend.set, ("test", "cached", 300))
+        timer.start()
+        middleware = CacheMiddleware(
+            app,
+            self.cache_ttl,
+            self.key_function,
+            lock_timeout=5,
+            lock_poll_interval=0.01,
+        )
+        assert middleware.call_sync(request_mock, response_mock, cache_backend) == (
+            "cached"
+        )
+        app.assert_not_called()
+
+    def test_stops_waiting_when_backend_lock_is_released_without_a_value(
+        self, cache_backend, request_mock, response_mock
+    ):
+        app = MagicMock(return_value="message")
+        cache_backend.add("test.lock", True, 5)
+        timer = threading.Timer(0.05, cache_backend.delete, ("test.lock",))
+        timer.start()
+        middleware = CacheMiddleware(
+            app,
+            self.cache_ttl,
+            self.key_function,
+            lock_timeout=5,
+            lock_poll_interval=0.01,
+        )
+        started = time.monotonic()
+        assert middleware.call_sync(request_mock, response_mock, cache_backend) == (
+            "message"
+        )
+        assert time.monotonic() - started < 1
+        app.assert_called_once()
+
+    def test_serves_stale_response_while_revalidating(
+        self, cache_backend, request_mock, response_mock
+    ):
+        app = MagicMock(return_value="fresh")
+        cache_backend.set_soft("test", "stale", -1, 300)
+        middleware = CacheMiddleware(
+            app, self.cache_ttl, self.key_function, stale_while_revalidate=60
+        )
+        assert middleware.call_sync(request_mock, response_mock, cache_backend) == (
+            "stale"
+        )
+        deadline = time.time() + 5
+        while cache_backend.get("test") is None and time.time() < deadline:
+            time.sleep(0.01)
+        assert cache_backend.get("test").value == "fresh"
+
+    def test_serves_stale_response_on_error(
+        self, cache_backend, request_mock, response_mock
+    ):
+        app = MagicMock(side_effect=RuntimeError("boom"))
+        cache_backend.set_soft("test", "stale", -1, 300)
+        middleware = CacheMiddleware(
+            app, self.cache_ttl, self.key_function, stale_if_error=60
+        )
+        assert middleware.call_sync(request_mock, response_mock, cache_backend) == (
+            "stale"
+        )
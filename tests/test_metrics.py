@@ -0,0 +1,72 @@
+import pytest
+
+from starlette_cache.backends.memory_cache_backend import MemoryCacheBackend
+from starlette_cache.metrics import CacheMetrics, Histogram
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram([0.001, 0.01, 0.1])
+    for value in (0.0005, 0.001, 0.005, 0.05, 0.5):
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 1, 1]
+    assert histogram.cumulative() == [
+        ("0.001", 2),
+        ("0.01", 3),
+        ("0.1", 4),
+        ("+Inf", 5),
+    ]
+    assert histogram.quantile(0.5) == 0.01
+    assert histogram.quantile(0.99) == float("inf")
+    assert Histogram().quantile(0.5) is None
+
+
+def test_stats_per_route_and_backend():
+    metrics = CacheMetrics()
+    metrics.on_lookup("items", "memory", "MISS", 0.001)
+    metrics.on_store("items", "memory", 10, 0.002)
+    metrics.on_lookup("items", "memory", "HIT", 0.001)
+    metrics.on_lookup("users", "memory", "STALE", 0.001)
+    stats = metrics.stats()
+    assert stats["routes"]["items"]["hit"] == 1
+    assert stats["routes"]["items"]["miss"] == 1
+    assert stats["routes"]["items"]["stored_bytes"] == 10
+    assert stats["routes"]["users"]["stale"] == 1
+    assert stats["backends"]["memory"]["get_seconds"]["count"] == 3
+    assert stats["backends"]["memory"]["set_seconds"]["sum"] == 0.002
+
+
+def test_includes_stats_of_watched_backends():
+    backend = MemoryCacheBackend("test_metrics_watch", max_entries=1)
+    backend.set("a", 1)
+    backend.set("b", 2)
+    metrics = CacheMetrics()
+    metrics.watch("memory", backend)
+    assert metrics.stats()["backends"]["memory"]["evictions"] == 1
+    text = metrics.prometheus_text()
+    assert 'starlette_cache_backend_entries{backend="memory"} 1' in text
+    assert 'starlette_cache_backend_evictions_total{backend="memory"} 1' in text
+
+
+def test_prometheus_text():
+    metrics = CacheMetrics(buckets=[0.01])
+    metrics.on_lookup('say "hi"', "memory", "HIT", 0.005)
+    text = metrics.prometheus_text()
+    labels = 'route="say \\"hi\\"",backend="memory"'
+    assert f'starlette_cache_lookups_total{{{labels},result="hit"}} 1' in text
+    assert (
+        f'starlette_cache_operation_seconds_bucket{{{labels},operation="get",le="0.01"}} 1'
+        in text
+    )
+    assert (
+        f'starlette_cache_operation_seconds_count{{{labels},operation="get"}} 1' in text
+    )
+    assert text.endswith("\n")
+
+
+@pytest.mark.asyncio
+async def test_endpoint_serves_prometheus_text():
+    metrics = CacheMetrics()
+    metrics.on_lookup("items", "memory", "HIT", 0.001)
+    response = await metrics.endpoint(None)
+    assert response.media_type.startswith("text/plain")
+    assert response.body.decode() == metrics.prometheus_text()
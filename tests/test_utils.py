@@ -1,10 +1,21 @@
 import hashlib
-from urllib.parse import quote
 
 import pytest
 from starlette.requests import Request
 
-from starlette_cache.utils import get_cache_key, get_cache_key_including_headers
+from starlette_cache.utils import (
+    accepts_encoding,
+    get_cache_key,
+    get_cache_key_including_headers,
+    get_etag,
+    get_fast_cache_key,
+    get_path_tags,
+    get_vary_cache_key,
+    get_vary_headers,
+    is_not_modified,
+    normalize_header_value,
+    normalize_query_string,
+)
 
 
 @pytest.fixture
@@ -22,9 +33,7 @@ def starlette_request() -> Request:
 
 def test_default_cache_key_function(starlette_request: Request):
     key = get_cache_key(starlette_request)
-    expected = hashlib.md5(
-        f"GET.{quote('://None/test/v1/test?a=2&b=1')}".encode("utf-8")
-    ).hexdigest()
+    expected = hashlib.md5(b"GET http 0: 12:test/v1/test a=2&b=1").hexdigest()
     assert key == expected
 
 
@@ -33,8 +42,158 @@ def test_get_cache_key_with_headers(starlette_request):
         starlette_request, ["test_header", "test_header_1"]
     )
     expected = hashlib.md5(
-        f"GET.{quote('://None/test/v1/test?a=2&b=1')}.{quote('test_header:test_val,test_header_1:test_val_2')}".encode(
-            "utf-8"
-        )
+        b"GET http 0: 12:test/v1/test a=2&b=1"
+        b" 11:test_header 8:test_val 13:test_header_1 10:test_val_2"
+    ).hexdigest()
+    assert key == expected
+
+
+def test_fast_cache_key_uses_blake2b(starlette_request):
+    key = get_fast_cache_key(starlette_request)
+    expected = hashlib.blake2b(
+        b"GET http 0: 12:test/v1/test a=2&b=1", digest_size=16
     ).hexdigest()
     assert key == expected
+
+
+def _request(path="/items", query_string=b"", headers=()):
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "scheme": "http",
+            "server": ("testserver", 80),
+            "path": path,
+            "query_string": query_string,
+            "headers": list(headers),
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    "first, second, same",
+    [
+        (b"a=1&b=2", b"b=2&a=1", True),
+        (b"flag&a=1", b"a=1&flag=", True),
+        (b"a=1&&b=2", b"b=2&a=1", True),
+        (b"a=1&a=2", b"a=2&a=1", False),
+        (b"a=1&a=2&b=1", b"b=1&a=1&a=2", True),
+        (b"a=1", b"a=2", False),
+    ],
+)
+def test_cache_key_normalizes_query_string(first, second, same):
+    first_key = get_cache_key(_request(query_string=first))
+    second_key = get_cache_key(_request(query_string=second))
+    assert (first_key == second_key) is same
+
+
+def test_cache_key_depends_on_host_and_path():
+    keys = {
+        get_cache_key(_request("/a")),
+        get_cache_key(_request("/b")),
+        get_cache_key(_request("/a", headers=[(b"host", b"example.com")])),
+        # A path containing "?" is not confused with a query string.
+        get_cache_key(_request("/a?b")),
+        get_cache_key(_request("/a", b"b")),
+    }
+    assert len(keys) == 5
+
+
+def test_normalize_query_string():
+    assert normalize_query_string(b"?b=1&flag&a=2&b=0") == b"a=2&b=1&b=0&flag="
+    assert normalize_query_string(b"") == b""
+
+
+@pytest.mark.parametrize(
+    "headers, expected",
+    [
+        ({}, False),
+        ({"if-none-match": '"abc"'}, True),
+        ({"if-none-match": 'W/"abc"'}, True),
+        ({"if-none-match": '"xyz", "abc"'}, True),
+        ({"if-none-match": "*"}, True),
+        ({"if-none-match": '"xyz"'}, False),
+        ({"if-modified-since": "Thu, 01 Jan 1970 00:16:40 GMT"}, True),
+        ({"if-modified-since": "Thu, 01 Jan 1970 00:16:39 GMT"}, False),
+        ({"if-modified-since": "not a date"}, False),
+        (
+            {
+                "if-none-match": '"xyz"',
+                "if-modified-since": "Thu, 01 Jan 1970 00:16:40 GMT",
+            },
+            False,
+        ),
+    ],
+)
+def test_is_not_modified(headers, expected):
+    assert is_not_modified(headers, '"abc"', 1000.5) is expected
+
+
+def test_get_etag_is_quoted_and_stable():
+    assert get_etag(b"body") == get_etag(b"body")
+    assert get_etag(b"body").startswith('"') and get_etag(b"body").endswith('"')
+    assert get_etag(b"body") != get_etag(b"other")
+
+
+def test_get_path_tags(starlette_request):
+    assert get_path_tags(starlette_request) == ["test/v1/test"]
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip, deflate, br", True),
+        ("GZIP", True),
+        ("deflate", False),
+        ("gzip;q=0", False),
+        ("gzip;q=0.5", True),
+        ("*", True),
+        ("*;q=0", False),
+        ("*, gzip;q=0", False),
+        ("", False),
+    ],
+)
+def test_accepts_encoding(accept_encoding, expected):
+    assert accepts_encoding(accept_encoding, "gzip") is expected
+
+
+@pytest.mark.parametrize(
+    "vary, expected",
+    [
+        ("", ()),
+        ("Accept-Language", ("accept-language",)),
+        ("User-Agent, accept-encoding,", ("accept-encoding", "user-agent")),
+        ("Accept, *", ("*",)),
+    ],
+)
+def test_get_vary_headers(vary, expected):
+    assert get_vary_headers(vary) == expected
+
+
+@pytest.mark.parametrize(
+    "name, first, second",
+    [
+        ("accept-encoding", "gzip, br", "br;q=0.5,gzip"),
+        ("accept-encoding", "gzip, deflate;q=0", "GZIP"),
+        ("accept-language", "en-US,fr;q=0.8", "fr;q=0.2, en-us"),
+        ("accept-language", "de, en;q=0", "de"),
+        ("user-agent", " curl/8.0 ", "curl/8.0"),
+    ],
+)
+def test_normalize_header_value(name, first, second):
+    assert normalize_header_value(name, first) == normalize_header_value(name, second)
+
+
+def test_normalize_accept_language_keeps_preference_order():
+    assert normalize_header_value("accept-language", "fr;q=0.5, en") == "en,fr"
+
+
+def test_get_vary_cache_key():
+    vary = ("accept-encoding", "accept-language")
+    key = get_vary_cache_key("key", {"accept-encoding": "gzip, br"}, vary)
+    assert key == get_vary_cache_key("key", {"accept-encoding": "br,gzip"}, vary)
+    assert key != get_vary_cache_key("key", {"accept-encoding": "gzip"}, vary)
+    assert key != get_vary_cache_key("other", {"accept-encoding": "gzip, br"}, vary)
+    assert get_vary_cache_key("key", {}, vary) != get_vary_cache_key(
+        "key", {"accept-encoding": "", "accept-language": ""}, vary
+    )